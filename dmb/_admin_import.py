@@ -0,0 +1,840 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Direct writing of edge batches as neo4j-admin import files.
+"""
+
+import os
+import sys
+import glob
+import json
+import hashlib
+from itertools import compress, repeat
+from typing import Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dmb._logger import logger
+from dmb._manifest import file_fingerprint
+
+logger.debug(f"Loading module {__name__}.")
+
+# property types that the Neo4j batch writer writes unquoted
+_NUMERIC_TYPES = ("int", "integer", "long", "float", "double", "dbl")
+_BOOLEAN_TYPES = ("bool", "boolean")
+
+# BioCypher internals the direct writing relies on: attributes of the
+# instance, of its translator and of its Neo4j batch writer; if any is
+# missing (e.g. in another BioCypher version), edges are written with
+# `bc.write_edges`
+_BIOCYPHER_ATTRIBUTES = ("_offline", "_writer", "_get_translator")
+_TRANSLATOR_ATTRIBUTES = (
+    "_get_ontology_mapping",
+    "name_sentence_to_pascal",
+    "ontology",
+)
+_WRITER_ATTRIBUTES = (
+    "_get_all_labels",
+    "_get_edge_table_column_names",
+    "_quote_string",
+    "_write_next_part",
+    "_write_edge_headers",
+    "delim",
+    "edge_labels_order",
+    "edge_property_dict",
+    "import_call_edges",
+    "import_call_file_prefix",
+    "import_call_nodes",
+    "outdir",
+    "strict_mode",
+    "translator",
+)
+
+# manifest of the shards written in sharded mode, in the output folder
+SHARD_MANIFEST = "shards.json"
+
+SHARD_MANIFEST_VERSION = 1
+
+
+def _write_shard(path: str, rows: list) -> dict:
+    """
+    Executor: write the encoded rows of a shard and return its manifest
+    entry (file name, rows, bytes and BLAKE2b hash of the content).
+    """
+
+    data = b"".join(rows)
+
+    with open(path, "wb") as f:
+        f.write(data)
+
+    return {
+        "file": os.path.basename(path),
+        "rows": len(rows),
+        "bytes": len(data),
+        "blake2b": hashlib.blake2b(data).hexdigest(),
+    }
+
+
+def load_shard_manifest(outdir: str) -> dict:
+    """
+    Shard entries per file label (e.g. `GeneKnockoutToCellLineAssociation`)
+    of an output folder, empty if it has no (current) shard manifest.
+    """
+
+    path = os.path.join(outdir, SHARD_MANIFEST)
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r") as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != SHARD_MANIFEST_VERSION:
+        logger.warning(f"Ignoring shard manifest `{path}` of another version.")
+        return {}
+
+    return manifest["labels"]
+
+
+def verify_shards(outdir: str) -> dict:
+    """
+    Check the shards of an output folder against its shard manifest.
+
+    Returns:
+        dict of file label to the numbers of its missing or changed shards
+        (only labels with such shards), to pass to `AdminImportWriter` as
+        `regenerate`
+    """
+
+    failed = {}
+
+    for label, entry in load_shard_manifest(outdir).items():
+
+        for number, shard in enumerate(entry["shards"]):
+
+            path = os.path.join(outdir, shard["file"])
+
+            if (
+                not os.path.exists(path)
+                or os.path.getsize(path) != shard["bytes"]
+                or file_fingerprint(path)["blake2b"] != shard["blake2b"]
+            ):
+                failed.setdefault(label, []).append(number)
+
+    return failed
+
+
+def _pascal_label(writer, label: str) -> str:
+    """
+    File label (the prefix of the header and part files) that the Neo4j
+    batch writer uses for a schema label.
+    """
+
+    # the Neo4j writer cleans labels before naming files (if it can)
+    module = sys.modules[type(writer).__module__]
+    parse_label = getattr(module, "parse_label", str)
+
+    return writer.translator.name_sentence_to_pascal(parse_label(label))
+
+
+def _output_label(bc, writer, kind: str, label: str) -> Optional[str]:
+    """
+    File label of the output of an input label (`kind` "nodes" or
+    "edges"), None if the label is not mapped to a schema class written as
+    such.
+    """
+
+    translator = bc._get_translator()
+    schema = translator.ontology.mapping.extended_schema
+    schema_label = translator._get_ontology_mapping(label)
+
+    if not schema_label:
+        return None
+
+    config = schema[schema_label]
+
+    if kind == "edges":
+
+        if config.get("represented_as") != "edge":
+            return None
+
+        schema_label = config.get("label_as_edge") or schema_label
+
+    elif config.get("represented_as", "node") != "node":
+        return None
+
+    return _pascal_label(writer, schema_label)
+
+
+def reuse_output(bc, labels: dict, skipped: dict) -> dict:
+    """
+    Prepare the output folder of a BioCypher instance for writing only the
+    changed labels: add the header and part files that unchanged labels
+    wrote there in an earlier run to the import call, and delete those of
+    the other labels, as the writer would add new part files next to
+    them. Unchanged labels whose files are not in the output folder, or
+    shared with a changed label, are written again.
+
+    Args:
+        bc: offline BioCypher instance with Neo4j CSV output, writing to
+            the output folder of the earlier run
+
+        labels: dict of the selected node and edge labels
+
+        skipped: dict of the unchanged node and edge labels
+
+    Returns:
+        dict of the node and edge labels whose earlier output is reused
+    """
+
+    writer = AdminImportWriter._get_writer(bc)
+
+    if writer is None:
+        raise ValueError(
+            "Reusing earlier output needs an offline BioCypher instance "
+            "with Neo4j CSV output."
+        )
+
+    prefix = writer.import_call_file_prefix
+    reused = {}
+
+    for kind, import_call in [
+        ("nodes", writer.import_call_nodes),
+        ("edges", writer.import_call_edges),
+    ]:
+
+        files = {
+            label: _output_label(bc, writer, kind, label)
+            for label in labels[kind]
+        }
+        written = {
+            files[label]
+            for label in labels[kind]
+            if label not in skipped[kind]
+        }
+        reused[kind] = [
+            label
+            for label in skipped[kind]
+            if files[label] is not None
+            and files[label] not in written
+            and os.path.exists(
+                os.path.join(writer.outdir, f"{files[label]}-header.csv")
+            )
+        ]
+
+        for label in labels[kind]:
+
+            if label in reused[kind]:
+                continue
+
+            if label in skipped[kind]:
+                logger.info(
+                    f"Writing unchanged `{label}` again: no earlier output "
+                    f"of it to reuse in `{writer.outdir}`."
+                )
+
+            if files[label] is None:
+                continue
+
+            for path in [
+                os.path.join(writer.outdir, f"{files[label]}-header.csv")
+            ] + glob.glob(
+                os.path.join(writer.outdir, f"{files[label]}-part*.csv")
+            ):
+                if os.path.exists(path):
+                    logger.info(f"Removing earlier output `{path}`.")
+                    os.remove(path)
+
+        for file_label in dict.fromkeys(
+            files[label] for label in reused[kind]
+        ):
+            import_call.add(
+                (
+                    os.path.join(prefix, f"{file_label}-header.csv"),
+                    os.path.join(prefix, f"{file_label}-part.*"),
+                )
+            )
+
+    return reused
+
+
+def _missing(obj, attributes) -> list:
+    """
+    The attributes that an object does not have.
+    """
+
+    return [name for name in attributes if not hasattr(obj, name)]
+
+
+def _unsupported(missing: list):
+    """
+    Log the BioCypher internals that direct writing needs but are missing.
+    """
+
+    if missing:
+        logger.warning(
+            f"This BioCypher version has no `{'`, `'.join(missing)}`; "
+            "edges are written with `bc.write_edges`."
+        )
+
+
+class _EdgeKey:
+    """
+    Stand-in for a `BioCypherEdge` in the writer's duplicate check, reused
+    for all edges of a label.
+    """
+
+    __slots__ = ("label", "source", "target")
+
+    def __init__(self, label: str):
+
+        self.label = label
+        self.source = None
+        self.target = None
+
+    def get_id(self):
+
+        return None
+
+    def get_source_id(self):
+
+        return self.source
+
+    def get_target_id(self):
+
+        return self.target
+
+    def get_type(self):
+
+        return self.label
+
+    def get_label(self):
+
+        return self.label
+
+
+class _EdgeSpec:
+    """
+    How the Neo4j batch writer writes the edges of one input label: the
+    BioCypher edge label, whether an id column is written, the typed
+    properties of the header (None if taken from the first edge), the
+    `:TYPE` value and the properties excluded by the schema.
+    """
+
+    def __init__(self, label, use_id, properties, types, exclude):
+
+        self.label = label
+        self.use_id = use_id
+        self.properties = properties
+        self.types = types
+        self.exclude = exclude
+
+
+class AdminImportWriter:
+    """
+    Writes column batches of edges straight into the neo4j-admin import
+    files of a BioCypher instance, skipping the creation, translation and
+    per-row checking of `BioCypherEdge` objects.
+
+    Part files, headers and the import call are written with the
+    instance's Neo4j batch writer, so the output has the same layout and
+    content as with `bc.write_edges`: the same edge labels, property
+    columns and quoting (taken from the schema configuration), the same
+    duplicate check, and part files of `batch_size` edges. Edges of labels
+    this writer does not support (see `supports`) have to be written the
+    normal way.
+
+    In sharded mode, the part files (shards) of a label are bounded by
+    `batch_size` edges and, if given, `shard_bytes` bytes, and are written
+    by `workers` threads in parallel. The import call lists every shard
+    instead of a pattern, and the shard manifest (`SHARD_MANIFEST` in the
+    output folder) records the rows, size and hash of each, so that
+    downstream copies can be checked per shard (`verify_shards`). Shards
+    are cut at the same edges as long as the input and configuration are
+    the same, so single shards can be written again: with `regenerate`,
+    all edges of the given labels are processed, but only the given
+    shards are written (and their manifest entries updated); headers and
+    the import call are left as they are.
+
+    Args:
+        bc: BioCypher instance (offline, Neo4j, CSV output, with a batch
+            writer that provides `_WRITER_ATTRIBUTES`)
+
+        batch_size: number of edges per part file
+
+        sharded: write shards with a manifest
+
+        shard_bytes: maximum size of a shard in bytes (sharded mode; a
+            single edge larger than this gets a shard of its own)
+
+        workers: number of threads writing shards (sharded mode)
+
+        regenerate: dict of file label (the label of the part files) to
+            the numbers of the shards to write again, e.g. from
+            `verify_shards` (sharded mode)
+    """
+
+    def __init__(
+        self,
+        bc,
+        batch_size: int = int(1e6),
+        sharded: bool = False,
+        shard_bytes: Optional[int] = None,
+        workers: int = 1,
+        regenerate: Optional[dict] = None,
+    ):
+
+        self.bc = bc
+        self.batch_size = batch_size
+        self.writer = self._get_writer(bc)
+        self._specs = {}
+        self._pending = {}
+        self._written = {}
+
+        self.sharded = sharded or regenerate is not None
+        self.shard_bytes = shard_bytes
+        self.workers = max(workers, 1)
+        self.regenerate = (
+            None
+            if regenerate is None
+            else {label: set(numbers) for label, numbers in regenerate.items()}
+        )
+        self._pending_bytes = {}
+        self._shards = {}
+        self._running = set()
+        self._executor = None
+
+    @staticmethod
+    def _get_writer(bc):
+        """
+        The Neo4j CSV batch writer of a BioCypher instance, or None (also
+        if any of the BioCypher internals used here is missing).
+        """
+
+        missing = _missing(bc, _BIOCYPHER_ATTRIBUTES)
+
+        if missing or not bc._offline:
+            return _unsupported(missing)
+
+        if bc._writer is None:
+
+            initialize = getattr(bc, "_initialize_writer", None) or getattr(
+                bc, "_get_writer", None
+            )
+
+            if initialize is None:
+                return _unsupported(["_initialize_writer"])
+
+            initialize()
+
+        writer = bc._writer
+
+        if type(writer).__name__ != "_Neo4jBatchWriter":
+            return None
+
+        if (getattr(writer, "file_format", None) or "csv") != "csv":
+            return None
+
+        missing = _missing(writer, _WRITER_ATTRIBUTES)
+
+        if not missing:
+            missing = _missing(writer.translator, _TRANSLATOR_ATTRIBUTES)
+
+        if not missing:
+            translator = bc._get_translator()
+            missing = _missing(translator, _TRANSLATOR_ATTRIBUTES) or (
+                []
+                if hasattr(
+                    getattr(translator.ontology, "mapping", None),
+                    "extended_schema",
+                )
+                else ["ontology.mapping.extended_schema"]
+            )
+
+        return _unsupported(missing) if missing else writer
+
+    def supports(self, label: str) -> bool:
+        """
+        Whether edges of an input label can be written directly: they have
+        to be mapped to a schema class represented as an edge.
+        """
+
+        return self._spec(label) is not None
+
+    def _spec(self, label: str) -> Optional[_EdgeSpec]:
+
+        if label in self._specs:
+            return self._specs[label]
+
+        spec = None
+
+        if self.writer is not None:
+
+            translator = self.bc._get_translator()
+            schema = translator.ontology.mapping.extended_schema
+            schema_label = translator._get_ontology_mapping(label)
+
+            if schema_label and (
+                schema[schema_label].get("represented_as") == "edge"
+            ):
+
+                config = schema[schema_label]
+                properties = config.get("properties")
+
+                if properties:
+                    properties = dict(properties)
+                    if self.writer.strict_mode:
+                        properties["source"] = "str"
+                        properties["version"] = "str"
+                        properties["licence"] = "str"
+
+                exclude = config.get("exclude_properties") or []
+                edge_label = config.get("label_as_edge") or schema_label
+
+                spec = _EdgeSpec(
+                    label=edge_label,
+                    use_id=config.get("use_id") is not False,
+                    properties=properties or None,
+                    types=self.writer._get_all_labels(
+                        edge_label, self.writer.edge_labels_order
+                    ),
+                    exclude=(
+                        [exclude] if isinstance(exclude, str) else exclude
+                    ),
+                )
+
+        self._specs[label] = spec
+
+        return spec
+
+    def write_batch(self, batch):
+        """
+        Write an `EdgeBatch` with string (not converted) property columns,
+        writing a part file whenever `batch_size` edges are pending.
+        """
+
+        spec = self._spec(batch.label)
+
+        if spec is None:
+            raise ValueError(
+                f"Edges of `{batch.label}` cannot be written directly."
+            )
+
+        sources = batch.source_curies()
+        targets = batch.target_curies()
+
+        if spec.properties is None:
+            spec.properties = self._properties_of(batch, spec)
+
+        columns = [sources]
+
+        if spec.use_id:
+            columns.append(repeat(""))
+
+        for key, _type in spec.properties.items():
+            columns.append(self._format_column(batch, spec, key, _type))
+
+        columns.append(targets)
+        columns.append(repeat(spec.types))
+
+        delimiter = self.writer.delim
+
+        rows = [
+            delimiter.join(row) + "\n"
+            for row in compress(
+                zip(*columns), self._keep(spec, sources, targets)
+            )
+        ]
+
+        written = self._written.get(spec.label, 0)
+        self._written[spec.label] = written + len(rows)
+
+        if self.sharded:
+            self._add_to_shards(spec, rows)
+            return
+
+        pending = self._pending.setdefault(spec.label, [])
+        pending.extend(rows)
+
+        while len(pending) >= self.batch_size:
+            self._write_part(spec, pending[: self.batch_size])
+            del pending[: self.batch_size]
+
+    def finish(self) -> bool:
+        """
+        Write the remaining edges and the headers of all edge labels of
+        the writer (as the writer does, only labels with edges get one).
+        """
+
+        if self.sharded:
+            return self._finish_shards()
+
+        for label, spec in self._specs.items():
+
+            if spec is None:
+                continue
+
+            pending = self._pending.pop(spec.label, None)
+
+            if pending:
+                self._write_part(spec, pending)
+
+            if self._written.get(spec.label):
+                self.writer.edge_property_dict[spec.label] = spec.properties
+
+        if not self.writer.edge_property_dict:
+            return True
+
+        return self.writer._write_edge_headers()
+
+    def _properties_of(self, batch, spec) -> dict:
+        """
+        Properties of a label without schema properties, as the writer
+        takes them from the first edge (all strings).
+        """
+
+        keys = list(batch.properties)
+        keys.extend(key for key in batch.constants if key not in keys)
+
+        return {key: "str" for key in keys if key not in spec.exclude}
+
+    def _format_column(self, batch, spec, key, _type):
+        """
+        A property column formatted as the writer formats the values.
+        """
+
+        quote = self.writer._quote_string
+
+        if _type in _BOOLEAN_TYPES:
+            # values are bools with `coerce_types`, else strings
+            format_value = lambda value: str(value).lower()
+        elif _type in _NUMERIC_TYPES:
+            format_value = str
+        else:
+            format_value = quote
+
+        if key in spec.exclude:
+            return repeat("")
+
+        if key in batch.constants:
+            value = batch.constants[key]
+            return repeat("" if value is None else format_value(str(value)))
+
+        if key not in batch.properties:
+            return repeat("")
+
+        return [
+            "" if value is None else format_value(value)
+            for value in batch.properties[key]
+        ]
+
+    def _keep(self, spec, sources, targets) -> list:
+        """
+        Mask of the edges that the writer would write: not seen before by
+        its duplicate check, and with a source and a target.
+        """
+
+        deduplicator = getattr(self.writer, "deduplicator", None)
+        key = _EdgeKey(spec.label)
+        keep = []
+        missing = 0
+
+        for source, target in zip(sources, targets):
+
+            if deduplicator is not None:
+                key.source, key.target = source, target
+                if deduplicator.edge_seen(key):
+                    keep.append(False)
+                    continue
+
+            if not (source and target):
+                missing += 1
+                keep.append(False)
+                continue
+
+            keep.append(True)
+
+        if missing:
+            logger.error(
+                f"{missing} `{spec.label}` edges have no source or target "
+                "node and were not written."
+            )
+
+        return keep
+
+    def _write_part(self, spec, rows):
+
+        self.writer._write_next_part(
+            spec.label,
+            rows,
+            self.writer._get_edge_table_column_names(
+                spec.label, spec.properties
+            ),
+        )
+
+    def file_label(self, label: str) -> Optional[str]:
+        """
+        Label of the part files of an input label, e.g. `CRISPRKO` ->
+        `GeneKnockoutToCellLineAssociation` (None if not supported).
+        """
+
+        spec = self._spec(label)
+
+        return None if spec is None else self._file_label(spec)
+
+    def _file_label(self, spec) -> str:
+
+        return _pascal_label(self.writer, spec.label)
+
+    def _add_to_shards(self, spec, rows):
+        """
+        Add rows to the pending shard of a label, cutting a shard whenever
+        it reaches `batch_size` rows or `shard_bytes` bytes.
+        """
+
+        pending = self._pending.setdefault(spec.label, [])
+        size = self._pending_bytes.get(spec.label, 0)
+
+        for row in rows:
+
+            row = row.encode("utf-8")
+
+            if pending and (
+                len(pending) >= self.batch_size
+                or (self.shard_bytes and size + len(row) > self.shard_bytes)
+            ):
+                self._cut_shard(spec, pending)
+                pending = self._pending[spec.label] = []
+                size = 0
+
+            pending.append(row)
+            size += len(row)
+
+        self._pending_bytes[spec.label] = size
+
+    def _cut_shard(self, spec, rows):
+        """
+        Number the next shard of a label and hand it to a writer thread
+        (unless it is not to be regenerated), with at most two shards per
+        thread in flight.
+        """
+
+        label = self._file_label(spec)
+        shards = self._shards.setdefault(spec.label, [])
+        number = len(shards)
+
+        if self.regenerate is not None and number not in self.regenerate.get(
+            label, ()
+        ):
+            shards.append(None)
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        if len(self._running) >= 2 * self.workers:
+            done, self._running = wait(
+                self._running, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                future.result()
+
+        path = os.path.join(
+            self.writer.outdir, f"{label}-part{number:03d}.csv"
+        )
+        logger.info(
+            f"Writing {len(rows)} entries to {os.path.basename(path)}."
+        )
+
+        future = self._executor.submit(_write_shard, path, rows)
+        self._running.add(future)
+        shards.append(future)
+
+    def _finish_shards(self) -> bool:
+        """
+        Cut the last shard of each label, wait for the writer threads and
+        write the shard manifest, and (unless regenerating) the headers and
+        the import call entries listing every shard.
+        """
+
+        for spec in self._specs.values():
+            if spec is not None and self._pending.get(spec.label):
+                self._cut_shard(spec, self._pending.pop(spec.label))
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+        self._running = set()
+        manifest = load_shard_manifest(self.writer.outdir)
+        prefix = self.writer.import_call_file_prefix
+        passed = True
+
+        if self.regenerate is None:
+
+            for spec in self._specs.values():
+                if spec is not None and self._written.get(spec.label):
+                    self.writer.edge_property_dict[spec.label] = (
+                        spec.properties
+                    )
+
+            if self.writer.edge_property_dict:
+                passed = self.writer._write_edge_headers()
+
+        for spec in self._specs.values():
+
+            if spec is None or spec.label not in self._shards:
+                continue
+
+            label = self._file_label(spec)
+            entries = [
+                shard if shard is None else shard.result()
+                for shard in self._shards.pop(spec.label)
+            ]
+
+            if self.regenerate is not None:
+
+                old = manifest.get(label, {}).get("shards", [])
+
+                if len(old) != len(entries):
+                    logger.warning(
+                        f"`{label}` now has {len(entries)} shards instead of "
+                        f"{len(old)}; regenerate all of them."
+                    )
+
+                entries = [
+                    entry or (old[i] if i < len(old) else None)
+                    for i, entry in enumerate(entries)
+                ]
+
+            else:
+
+                header = os.path.join(prefix, f"{label}-header.csv")
+                parts = os.path.join(prefix, f"{label}-part.*")
+                self.writer.import_call_edges.discard((header, parts))
+                self.writer.import_call_edges.add(
+                    (
+                        header,
+                        ",".join(
+                            os.path.join(prefix, entry["file"])
+                            for entry in entries
+                        ),
+                    )
+                )
+
+            manifest[label] = {
+                "header": f"{label}-header.csv",
+                "rows": sum(entry["rows"] for entry in entries if entry),
+                "shards": entries,
+            }
+
+        with open(os.path.join(self.writer.outdir, SHARD_MANIFEST), "w") as f:
+            json.dump(
+                {"version": SHARD_MANIFEST_VERSION, "labels": manifest},
+                f,
+                indent=2,
+            )
+
+        return passed
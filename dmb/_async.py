@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Async iteration of the adapter's generators from an executor.
+"""
+
+import asyncio
+import threading
+from itertools import islice
+from typing import AsyncIterator, Callable, Iterator
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+# end of the producer's output
+_DONE = object()
+
+
+class _ProducerError:
+    """
+    Exception raised in the producer thread, sent through the queue.
+    """
+
+    def __init__(self, exception: BaseException):
+
+        self.exception = exception
+
+
+def _produce(
+    produce: Callable[[], Iterator],
+    batch_size: int,
+    deliver: Callable,
+    slots: threading.Semaphore,
+    stop: threading.Event,
+):
+    """
+    Executor: iterate the generator returned by `produce` and deliver its
+    items in lists of at most `batch_size`, waiting for a free queue slot
+    before each. Stops (closing the generator in this thread) as soon as
+    `stop` is set.
+    """
+
+    items = produce()
+
+    try:
+
+        while not stop.is_set():
+
+            batch = list(islice(items, batch_size))
+
+            if not batch:
+                break
+
+            while not slots.acquire(timeout=0.1):
+                if stop.is_set():
+                    return
+
+            deliver(batch)
+
+        deliver(_DONE)
+
+    except Exception as e:
+
+        deliver(_ProducerError(e))
+
+    finally:
+
+        if hasattr(items, "close"):
+            items.close()
+
+
+async def aiter_batches(
+    produce: Callable[[], Iterator],
+    batch_size: int,
+    queue_size: int,
+    executor=None,
+) -> AsyncIterator[list]:
+    """
+    Run a blocking generator in an executor and yield its items in lists of
+    at most `batch_size` without blocking the event loop.
+
+    At most `queue_size` batches are produced ahead of the consumer. If the
+    consumer stops early (or is cancelled), the generator is closed in the
+    executor thread, which runs its cleanup (e.g. stopping worker
+    processes), and the executor job is awaited.
+
+    Args:
+        produce: function returning the generator (called in the executor)
+
+        batch_size: number of items per batch
+
+        queue_size: number of batches produced ahead of the consumer
+
+        executor: `concurrent.futures` thread pool to run the generator in;
+            the loop's default executor if not given
+    """
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    slots = threading.Semaphore(queue_size)
+    stop = threading.Event()
+
+    def deliver(item):
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    job = loop.run_in_executor(
+        executor, _produce, produce, batch_size, deliver, slots, stop
+    )
+
+    try:
+
+        while True:
+
+            batch = await queue.get()
+
+            if batch is _DONE:
+                break
+
+            if isinstance(batch, _ProducerError):
+                raise batch.exception
+
+            slots.release()
+
+            yield batch
+
+    finally:
+
+        stop.set()
+        await asyncio.wait({job})
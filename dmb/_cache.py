@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Persistent binary cache of the parsed output of each label.
+"""
+
+import json
+import mmap
+import os
+import pickle
+import shutil
+from array import array
+from typing import Iterable, Iterator, Optional
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+CACHE_VERSION = 2
+
+# code of None in the code arrays
+_NONE = 0xFFFFFFFF
+
+_FLUSH_SIZE = 1 << 20
+
+# number of distinct values remembered when encoding and decoding; older
+# ones are forgotten (and stored again if they recur), so that memory does
+# not grow with the number of distinct values of a label
+_TABLE_SIZE = 1 << 17
+
+_ENCODERS = {
+    str: (b"s", lambda value: value.encode("utf-8")),
+    float: (b"f", lambda value: repr(value).encode("ascii")),
+    int: (b"i", lambda value: str(value).encode("ascii")),
+    bool: (b"b", lambda value: b"1" if value else b"0"),
+}
+
+_DECODERS = {
+    ord("s"): lambda payload: payload.decode("utf-8"),
+    ord("f"): lambda payload: float(payload),
+    ord("i"): lambda payload: int(payload),
+    ord("b"): lambda payload: payload == b"1",
+}
+
+
+class ParsedCache:
+    """
+    On-disk cache of the tuples a label yields, one folder per label.
+
+    Distinct values are stored once in a value table (`values.bin`, with
+    its offsets in `offsets.bin`), and each tuple as a fixed-width row of
+    32 bit codes into that table (`codes.bin`). All three files are written
+    as they grow and memory-mapped on read, so a cached label starts
+    streaming immediately and only the values that are actually read get
+    decoded. Only the last `_TABLE_SIZE` distinct values are remembered on
+    either side: a value seen again after that is stored (or decoded)
+    again, which keeps memory bounded however many distinct values a label
+    has.
+
+    Each label's cache records the key it was written with (the input
+    fingerprints and configuration of the label), for the caller to decide
+    whether it is still valid. `meta.json` is written last, so interrupted
+    writes are never used.
+
+    Args:
+        cache_dir: folder of the cache
+    """
+
+    def __init__(self, cache_dir: str):
+
+        self.cache_dir = cache_dir
+
+    def key(self, label: str) -> Optional[dict]:
+        """
+        Return the key the cache of a label was written with, or None if the
+        label is not cached.
+        """
+
+        meta = self._read_meta(label)
+
+        return meta["key"] if meta else None
+
+    def load(self, label: str) -> Iterator[tuple]:
+        """
+        Return an iterator over the cached tuples of a label.
+        """
+
+        meta = self._read_meta(label)
+
+        logger.info(f"Reading `{label}` from cache.")
+
+        return self._read(label, meta)
+
+    def store(
+        self, label: str, key: dict, items: Iterable[tuple]
+    ) -> Iterator[tuple]:
+        """
+        Pass the tuples of a label through while writing them to the cache.
+
+        The cache is only committed if the tuples are consumed completely;
+        tuples whose properties do not fit the layout of the first one cause
+        the cache of the label to be dropped.
+        """
+
+        folder = self._folder(label)
+        temporary = folder + ".tmp"
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+
+        table = {}
+        # start of each value, and the number of values written before
+        # the current `offsets` block
+        offsets = array("Q", [0])
+        written = 0
+        codes = array("I")
+        layout = None
+        rows = 0
+        complete = False
+
+        values_file = open(os.path.join(temporary, "values.bin"), "wb")
+        offsets_file = open(os.path.join(temporary, "offsets.bin"), "wb")
+        codes_file = open(os.path.join(temporary, "codes.bin"), "wb")
+
+        def encode(value):
+            if value is None:
+                return _NONE
+            key = (type(value), value if value == value else "nan")
+            code = table.get(key)
+            if code is None:
+                tag, encoder = _ENCODERS[type(value)]
+                payload = tag + encoder(value)
+                values_file.write(payload)
+                code = written + len(offsets) - 1
+                offsets.append(offsets[-1] + len(payload))
+                if len(table) >= _TABLE_SIZE:
+                    del table[next(iter(table))]
+                table[key] = code
+            return code
+
+        try:
+
+            for item in items:
+
+                yield item
+
+                if layout is False:
+                    continue
+
+                fixed, props = item[:-1], item[-1]
+
+                if layout is None:
+                    layout = (len(fixed), tuple(props))
+
+                if layout != (len(fixed), tuple(props)):
+                    logger.warning(f"Not caching `{label}`: varying layout.")
+                    layout = False
+                    continue
+
+                codes.extend(map(encode, fixed))
+                codes.extend(map(encode, props.values()))
+                rows += 1
+
+                if len(codes) >= _FLUSH_SIZE:
+                    codes.tofile(codes_file)
+                    del codes[:]
+
+                if len(offsets) >= _FLUSH_SIZE:
+                    # keep the last offset, the start of the next value
+                    offsets[:-1].tofile(offsets_file)
+                    written += len(offsets) - 1
+                    del offsets[:-1]
+
+            complete = layout is not False
+
+        finally:
+
+            if complete:
+                codes.tofile(codes_file)
+                offsets.tofile(offsets_file)
+
+            values_file.close()
+            offsets_file.close()
+            codes_file.close()
+
+            if complete:
+                self._commit(label, key, temporary, layout, rows)
+            else:
+                shutil.rmtree(temporary, ignore_errors=True)
+
+    def load_table(self, name: str) -> dict:
+        """
+        Return a lookup table stored with `store_table`.
+        """
+
+        with open(os.path.join(self._folder(name), "table.pickle"), "rb") as f:
+            return pickle.load(f)
+
+    def store_table(self, name: str, key: dict, table: dict):
+        """
+        Store a lookup table (a dict of plain values) under a name, with a
+        key as for labels (see `key`). Tables are read back at once rather
+        than row by row, which is faster for tables that are needed whole.
+        """
+
+        folder = self._folder(name)
+        temporary = folder + ".tmp"
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+
+        with open(os.path.join(temporary, "table.pickle"), "wb") as f:
+            pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with open(os.path.join(temporary, "meta.json"), "w") as f:
+            json.dump({"version": CACHE_VERSION, "key": key}, f)
+
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(temporary, folder)
+
+        logger.info(f"Cached table `{name}` ({len(table)} entries).")
+
+    def _commit(self, label, key, temporary, layout, rows):
+
+        width, columns = layout or (0, ())
+
+        with open(os.path.join(temporary, "meta.json"), "w") as f:
+            json.dump(
+                {
+                    "version": CACHE_VERSION,
+                    "key": key,
+                    "rows": rows,
+                    "width": width,
+                    "columns": columns,
+                },
+                f,
+            )
+
+        folder = self._folder(label)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(temporary, folder)
+
+        logger.info(f"Cached {rows} rows of `{label}`.")
+
+    def _read(self, label, meta) -> Iterator[tuple]:
+
+        if not meta["rows"]:
+            return
+
+        folder = self._folder(label)
+        width = meta["width"]
+        columns = meta["columns"]
+        stride = width + len(columns)
+
+        with open(os.path.join(folder, "values.bin"), "rb") as v, open(
+            os.path.join(folder, "offsets.bin"), "rb"
+        ) as o, open(os.path.join(folder, "codes.bin"), "rb") as c:
+
+            values = mmap.mmap(v.fileno(), 0, access=mmap.ACCESS_READ)
+            offsets = memoryview(
+                mmap.mmap(o.fileno(), 0, access=mmap.ACCESS_READ)
+            ).cast("Q")
+            codes = memoryview(
+                mmap.mmap(c.fileno(), 0, access=mmap.ACCESS_READ)
+            ).cast("I")
+
+            decoded = {}
+
+            def decode(code):
+                if code == _NONE:
+                    return None
+                value = decoded.get(code, decoded)
+                if value is decoded:
+                    start, end = offsets[code], offsets[code + 1]
+                    value = _DECODERS[values[start]](values[start + 1 : end])
+                    if len(decoded) >= _TABLE_SIZE:
+                        del decoded[next(iter(decoded))]
+                    decoded[code] = value
+                return value
+
+            for start in range(0, meta["rows"] * stride, stride):
+                row = list(map(decode, codes[start : start + stride]))
+                yield (*row[:width], dict(zip(columns, row[width:])))
+
+    def _read_meta(self, label):
+
+        path = os.path.join(self._folder(label), "meta.json")
+
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "r") as f:
+            meta = json.load(f)
+
+        if meta.get("version") != CACHE_VERSION:
+            return None
+
+        return meta
+
+    def _folder(self, label):
+
+        return os.path.join(self.cache_dir, label)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Chunked parallel parsing of single large CSV files.
+"""
+
+import csv
+import io
+import os
+import mmap
+import locale
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+# bytes after which a field starts (and a quote opens a quoted field)
+_FIELD_STARTS = b",\r\n"
+
+# adapter instance of a chunk worker process, set by `_init_worker`
+_worker_adapter = None
+
+
+def _quoted_field_end(data, start: int) -> int:
+    """
+    Position after the closing quote of a quoted field whose content starts
+    at `start` (doubled quotes are escaped quotes); the end of the data if
+    the field is not closed.
+    """
+
+    while True:
+
+        quote = data.find(b'"', start)
+
+        if quote == -1:
+            return len(data)
+
+        if data[quote + 1 : quote + 2] != b'"':
+            return quote + 1
+
+        start = quote + 2
+
+
+def find_record_boundaries(path: str, chunk_size: int) -> List[int]:
+    """
+    Split a CSV file into byte ranges of roughly `chunk_size` bytes that
+    start and end on record boundaries.
+
+    A newline only ends a record if it is not inside a quoted field. As in
+    `csv.reader`, a quote only opens a quoted field at the start of a field
+    (at the start of a record or after a delimiter); quotes elsewhere, e.g.
+    in `5'3" tall`, are part of the value. The file is memory-mapped and
+    only its quotes, and the newlines at the chunk targets, are looked at;
+    no fields are parsed.
+
+    Args:
+        path: path to the CSV file
+
+        chunk_size: approximate size of the byte ranges
+
+    Returns:
+        offsets `[header_end, ..., file_size]`; the header record spans
+        `[0, header_end)` and each pair of consecutive offsets one chunk
+    """
+
+    size = os.path.getsize(path)
+    boundaries = []
+
+    if not size:
+        return [size]
+
+    with open(path, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+
+        # the header is the first chunk; the first target is its first
+        # newline
+        target = 0
+        quote = data.find(b'"')
+
+        while True:
+
+            newline = data.find(b"\n", target)
+
+            # skip the quoted fields opened before the newline, and the
+            # newline itself if it is inside one of them
+            while newline != -1 and quote != -1 and quote < newline:
+
+                if quote and data[quote - 1] not in _FIELD_STARTS:
+                    quote = data.find(b'"', quote + 1)
+                    continue
+
+                end = _quoted_field_end(data, quote + 1)
+                quote = data.find(b'"', end)
+
+                if end > newline:
+                    newline = data.find(b"\n", end)
+
+            if newline == -1:
+                break
+
+            boundaries.append(newline + 1)
+            target = newline + 1 + chunk_size
+
+    if not boundaries or boundaries[-1] != size:
+        boundaries.append(size)
+
+    return boundaries
+
+
+def _read_records(path: str, start: int, end: int):
+    """
+    Parse the records in a byte range of a CSV file, with the same newline
+    translation as reading the file in text mode.
+    """
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    text = data.decode(locale.getpreferredencoding(False))
+
+    return csv.reader(io.StringIO(text, newline=None))
+
+
+def _init_worker(adapter):
+
+    global _worker_adapter
+    _worker_adapter = adapter
+
+
+def _parse_chunk(method, label, path, start, end, header, export):
+
+    rows = _read_records(path, start, end)
+    items = list(getattr(_worker_adapter, method)(label, header, rows))
+    state = getattr(_worker_adapter, export)(label) if export else None
+
+    return items, state
+
+
+def iter_chunked(
+    adapter,
+    method: str,
+    label: str,
+    path: str,
+    workers: int,
+    chunk_size: int,
+    export: Optional[str] = None,
+    merge: Optional[str] = None,
+) -> Iterator:
+    """
+    Parse one large CSV file in record-aligned byte-range chunks, each in a
+    worker process, and yield the results in file order.
+
+    At most `2 * workers` chunks are parsed or waiting to be consumed at any
+    time, so memory stays bounded if the consumer is slow.
+
+    Args:
+        adapter: picklable adapter instance, sent once to each worker
+
+        method: name of the adapter method turning `(label, header, rows)`
+            into output items
+
+        label: input label of the file
+
+        path: path to the CSV file
+
+        workers: number of worker processes
+
+        chunk_size: approximate size of the chunks in bytes
+
+        export: name of an adapter method called with the label in the
+            worker after each chunk, e.g. to hand over metrics
+
+        merge: name of an adapter method called with the result of
+            `export` in the consuming process
+    """
+
+    boundaries = find_record_boundaries(path, chunk_size)
+    header = next(_read_records(path, 0, boundaries[0]))
+    ranges = iter(zip(boundaries, boundaries[1:]))
+
+    logger.info(
+        f"Parsing `{label}` in {len(boundaries) - 1} chunks "
+        f"with {workers} workers."
+    )
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(adapter,),
+    ) as executor:
+
+        pending = deque()
+
+        def submit():
+            chunk = next(ranges, None)
+            if chunk:
+                pending.append(
+                    executor.submit(
+                        _parse_chunk,
+                        method,
+                        label,
+                        path,
+                        *chunk,
+                        header,
+                        export,
+                    )
+                )
+
+        for _ in range(2 * workers):
+            submit()
+
+        try:
+
+            while pending:
+                items, state = pending.popleft().result()
+                submit()
+
+                if merge:
+                    getattr(adapter, merge)(state)
+
+                yield from items
+
+        finally:
+
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Conversion of property values to the types declared in the schema config.
+"""
+
+from array import array
+from collections import Counter
+from typing import Callable, Dict, Iterable
+
+from dmb._logger import logger
+from dmb._columnar import NAN
+
+logger.debug(f"Loading module {__name__}.")
+
+# values that are missing rather than invalid: converted to None (NaN in
+# arrays of doubles) without counting as failures
+NA_VALUES = frozenset(("", "NA", "N/A", "NaN", "nan", "null", "None"))
+
+# schema property types (names as in BioCypher) that are converted, and
+# the type they are converted to; all others, e.g. `str` or `str[]`, are
+# kept as strings
+PROPERTY_TYPES = {
+    "int": "int",
+    "integer": "int",
+    "long": "int",
+    "float": "float",
+    "double": "float",
+    "dbl": "float",
+    "bool": "bool",
+    "boolean": "bool",
+}
+
+_TRUE = frozenset(("true", "t", "yes", "y", "1"))
+_FALSE = frozenset(("false", "f", "no", "n", "0"))
+
+
+def read_property_types(path: str) -> Dict[str, Dict[str, str]]:
+    """
+    Read the property types of a BioCypher schema config: per input label
+    (`label_in_input`), the properties of a type in `PROPERTY_TYPES` and
+    the type they are converted to.
+    """
+
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError(
+            "Reading the schema config requires PyYAML: install `pyyaml`."
+        )
+
+    with open(path) as f:
+        schema = yaml.safe_load(f) or {}
+
+    types = {}
+
+    for entry in schema.values():
+
+        if not isinstance(entry, dict) or not entry.get("properties"):
+            continue
+
+        labels = entry.get("label_in_input")
+
+        if isinstance(labels, str):
+            labels = [labels]
+
+        converted = {
+            key: PROPERTY_TYPES[str(_type).lower()]
+            for key, _type in entry["properties"].items()
+            if str(_type).lower() in PROPERTY_TYPES
+        }
+
+        for label in labels or []:
+            types.setdefault(label, {}).update(converted)
+
+    return types
+
+
+def _parse_int(value: str) -> int:
+
+    try:
+        return int(value)
+    except ValueError:
+        number = float(value)
+
+    if not number.is_integer():
+        raise ValueError(f"Not an integer: {value}")
+
+    return int(number)
+
+
+def _parse_bool(value: str) -> bool:
+
+    lowered = value.strip().lower()
+
+    if lowered in _TRUE:
+        return True
+
+    if lowered in _FALSE:
+        return False
+
+    raise ValueError(f"Not a boolean: {value}")
+
+
+_PARSERS = {"int": _parse_int, "float": float, "bool": _parse_bool}
+
+
+def compile_parser(_type: str, key: str, failures: Counter) -> Callable:
+    """
+    Parse function of a column of type `_type` (one of the values of
+    `PROPERTY_TYPES`): quotes are removed, missing values (`NA_VALUES`)
+    become None, and values that cannot be converted become None and are
+    counted in `failures[key]`.
+    """
+
+    parse = _PARSERS[_type]
+
+    def convert(value):
+
+        if '"' in value:
+            value = value.replace('"', "")
+
+        if value in NA_VALUES:
+            return None
+
+        try:
+            return parse(value)
+        except ValueError:
+            failures[key] += 1
+            return None
+
+    return convert
+
+
+def coerce_float_column(
+    values: Iterable[str], key: str, failures: Counter
+) -> array:
+    """
+    Convert a whole column of CSV values into a typed array of doubles:
+    missing values become NaN, as do values that cannot be converted,
+    which are counted in `failures[key]`.
+    """
+
+    column = array("d")
+    append = column.append
+    failed = 0
+
+    for value in values:
+
+        try:
+            append(float(value))
+            continue
+        except ValueError:
+            pass
+
+        if '"' in value:
+            value = value.replace('"', "")
+
+            try:
+                append(float(value))
+                continue
+            except ValueError:
+                pass
+
+        if value not in NA_VALUES:
+            failed += 1
+
+        append(NAN)
+
+    if failed:
+        failures[key] += failed
+
+    return column
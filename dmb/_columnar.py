@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Column batches of edges.
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+NAN = float("nan")
+
+
+def to_float(value: str) -> float:
+    """
+    Convert a CSV value to float, ignoring quotes (as `get_edges` strips
+    them from scores); empty and unparseable values (e.g. "NA") become NaN.
+    """
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    if '"' in value:
+        try:
+            return float(value.replace('"', ""))
+        except ValueError:
+            pass
+
+    return NAN
+
+
+def float_column(values: Iterable[str]) -> array:
+    """
+    Convert a column of CSV values into a typed array of doubles.
+    """
+
+    return array("d", map(to_float, values))
+
+
+def map_column(function, values: Sequence[str]) -> List:
+    """
+    Apply an id processing function to a column, calling it only once per
+    distinct value.
+    """
+
+    mapping = {value: function(value) for value in set(values)}
+
+    return list(map(mapping.__getitem__, values))
+
+
+class EdgeBatch:
+    """
+    A block of edges of one label, stored by column.
+
+    Args:
+        label: input label of the edges
+
+        source_ids: normalised source ids
+
+        target_ids: normalised target ids
+
+        properties: property columns by name; numeric columns are typed
+            arrays of doubles, all others lists of strings
+
+        constants: properties that are the same for all edges of the batch
+            (and take precedence over columns of the same name)
+
+        registry: if given, `source_ids` and `target_ids` are arrays of
+            integer handles of this `IdRegistry` instead of CURIEs
+    """
+
+    def __init__(
+        self,
+        label: str,
+        source_ids: Union[List[Optional[str]], array],
+        target_ids: Union[List[Optional[str]], array],
+        properties: Dict[str, Union[array, list]],
+        constants: Optional[dict] = None,
+        registry=None,
+    ):
+
+        self.label = label
+        self.source_ids = source_ids
+        self.target_ids = target_ids
+        self.properties = properties
+        self.constants = constants or {}
+        self.registry = registry
+
+    def __len__(self):
+
+        return len(self.source_ids)
+
+    def select(self, indices: Sequence[int]) -> "EdgeBatch":
+        """
+        Return a new batch with only the edges at the given positions.
+        """
+
+        def take(column):
+            if isinstance(column, array):
+                return array(column.typecode, (column[i] for i in indices))
+            return [column[i] for i in indices]
+
+        return EdgeBatch(
+            self.label,
+            take(self.source_ids),
+            take(self.target_ids),
+            {name: take(column) for name, column in self.properties.items()},
+            self.constants,
+            self.registry,
+        )
+
+    def source_curies(self) -> List[Optional[str]]:
+        """
+        Source ids as CURIEs (resolving handles).
+        """
+
+        if self.registry is not None:
+            return self.registry.curies(self.source_ids)
+
+        return self.source_ids
+
+    def target_curies(self) -> List[Optional[str]]:
+        """
+        Target ids as CURIEs (resolving handles).
+        """
+
+        if self.registry is not None:
+            return self.registry.curies(self.target_ids)
+
+        return self.target_ids
+
+    def rows(self):
+        """
+        Yield the edges of the batch as (source, target, label, properties)
+        tuples, as `DepMapAdapter.get_edges` does.
+        """
+
+        names = list(self.properties)
+        columns = [self.properties[name] for name in names]
+
+        for i, (_src, _tar) in enumerate(
+            zip(self.source_curies(), self.target_curies())
+        ):
+            _props = {name: column[i] for name, column in zip(names, columns)}
+            _props.update(self.constants)
+            yield _src, _tar, self.label, _props
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Streaming elimination of duplicate nodes and edges.
+"""
+
+import math
+from hashlib import blake2b
+
+from dmb._logger import logger
+from dmb._registry import IdRegistry
+
+logger.debug(f"Loading module {__name__}.")
+
+DEDUPLICATION_MODES = ("exact", "bloom")
+
+# what to do with the second and further rows of a key
+DUPLICATE_POLICIES = ("drop", "merge", "keep")
+
+
+class BloomFilter:
+    """
+    Set of byte strings with a fixed memory footprint that may report a
+    new key as seen (with probability about `error_rate` once `capacity`
+    keys are added), but never a seen key as new.
+
+    Args:
+        capacity: expected number of distinct keys
+
+        error_rate: false positive rate at `capacity` keys
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError(
+                "Bloom filter capacity must be positive and error rate "
+                "between 0 and 1."
+            )
+
+        self.size = max(
+            8, int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key: bytes) -> bool:
+        """
+        Add a key; return whether it was (probably) new.
+        """
+
+        digest = blake2b(key, digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+
+        new = False
+
+        for i in range(self.hashes):
+
+            bit = (first + i * second) % self.size
+            byte, mask = bit >> 3, 1 << (bit & 7)
+
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                new = True
+
+        return new
+
+    @property
+    def nbytes(self) -> int:
+
+        return len(self._bits)
+
+
+class Deduplicator:
+    """
+    Seen keys per label: node ids, or (source, target) pairs of edges.
+
+    In `exact` mode, ids are interned in an `IdRegistry` and keys are
+    stored as integers in a set per label; the registry is released with
+    the keys once no label is in progress. In `bloom` mode, each label has
+    a `BloomFilter`, so memory is fixed but a small fraction of distinct
+    rows may be taken for duplicates.
+
+    Args:
+        mode: `exact` or `bloom`
+
+        capacity: expected number of distinct keys per label (bloom mode)
+
+        error_rate: false positive rate at `capacity` keys (bloom mode)
+    """
+
+    def __init__(
+        self,
+        mode: str = "exact",
+        capacity: int = int(1e7),
+        error_rate: float = 1e-4,
+    ):
+
+        if mode not in DEDUPLICATION_MODES:
+            raise ValueError(
+                f"Unknown deduplication mode `{mode}`; use one of "
+                f"{', '.join(DEDUPLICATION_MODES)}."
+            )
+
+        self.mode = mode
+        self.registry = IdRegistry()
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._seen = {}
+
+    def add(self, label: str, *ids) -> bool:
+        """
+        Add the key of a row of `label`; return whether it is new.
+        """
+
+        return self._add(label, ids, self.registry.handle)
+
+    def add_handles(self, label: str, *handles) -> bool:
+        """
+        Add the key of a row of `label` whose ids are handles of another
+        `IdRegistry` (all rows of the label have to be added this way);
+        return whether it is new.
+        """
+
+        return self._add(label, handles)
+
+    def _add(self, label, ids, handle=None) -> bool:
+
+        seen = self._seen.get(label)
+
+        if seen is None:
+            seen = self._seen[label] = (
+                set()
+                if self.mode == "exact"
+                else BloomFilter(self.capacity, self.error_rate)
+            )
+
+        if self.mode == "exact":
+
+            key = 0
+
+            # handles are < 2^31 and NO_HANDLE is -1, so shifted by one
+            # they pack into one integer
+            for _id in ids:
+                key = key << 32 | (handle(_id) if handle else _id) + 1
+
+            if key in seen:
+                return False
+
+            seen.add(key)
+            return True
+
+        return seen.add("\x1f".join(map(str, ids)).encode())
+
+    def forget(self, label: str):
+        """
+        Release the keys of a label.
+        """
+
+        self._seen.pop(label, None)
+
+        if not self._seen:
+            self.registry = IdRegistry()
+
+
+def merge_properties(kept: dict, duplicate: dict) -> dict:
+    """
+    Fill the empty (missing, `None` or "") properties of a kept row with
+    those of a duplicate. Returns a new dict if anything changes.
+    """
+
+    merged = kept
+
+    for key, value in duplicate.items():
+
+        if value is None or value == "":
+            continue
+
+        current = kept.get(key)
+
+        if current is None or current == "":
+
+            if merged is kept:
+                merged = dict(kept)
+
+            merged[key] = value
+
+    return merged
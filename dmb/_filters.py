@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Filters on the raw columns of CSV rows, applied before any processing.
+"""
+
+import operator
+from heapq import heapify, heappush, heapreplace
+from typing import Iterable, List, Optional, Sequence
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+FILTER_OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "in": lambda value, values: value in values,
+}
+
+
+def describe_filter(column: str, op: str, value) -> str:
+    """
+    Readable form of a filter, e.g. `depScoreNorm < -0.5`.
+    """
+
+    return f"{column} {op} {value!r}"
+
+
+def _compile_test(op: str, value):
+    """
+    Test of a raw CSV value against a constant: numeric if the constant
+    is a number (or, for `in`, a collection of numbers), in which case
+    values that are not numbers (e.g. empty or "NA") never pass; else on
+    the value without surrounding quotes.
+    """
+
+    compare = FILTER_OPERATORS[op]
+
+    if op == "in":
+        value = frozenset(value)
+        numeric = bool(value) and all(
+            isinstance(v, (int, float)) and not isinstance(v, bool)
+            for v in value
+        )
+    else:
+        numeric = isinstance(value, (int, float)) and not isinstance(
+            value, bool
+        )
+
+    if numeric:
+
+        def test(raw):
+            try:
+                number = float(raw)
+            except ValueError:
+                return False
+            return number == number and compare(number, value)
+
+    else:
+
+        def test(raw):
+            return compare(raw.strip('"'), value)
+
+    return test
+
+
+class RowFilter:
+    """
+    Conjunction of column filters on CSV rows (sequences of strings),
+    counting for each filter the rows it was applied to and the rows that
+    passed it (filters are applied in order, until one fails).
+
+    Args:
+        filters: (column index, column name, operator, value) tuples
+    """
+
+    def __init__(self, filters: Sequence[tuple]):
+
+        self.descriptions = [
+            describe_filter(column, op, value)
+            for _, column, op, value in filters
+        ]
+        self._tests = [
+            (index, _compile_test(op, value))
+            for index, _, op, value in filters
+        ]
+        self.counts = [[0, 0] for _ in filters]
+
+    def __call__(self, row) -> bool:
+
+        for (index, test), counts in zip(self._tests, self.counts):
+
+            counts[0] += 1
+
+            if not test(row[index]):
+                return False
+
+            counts[1] += 1
+
+        return True
+
+
+def compile_row_filter(
+    filters: Sequence[tuple], header: Sequence[str], label: str
+) -> Optional[RowFilter]:
+    """
+    Compile (column name, operator, value) filters of a label against the
+    header row of its file.
+    """
+
+    if not filters:
+        return None
+
+    compiled = []
+
+    for column, op, value in filters:
+
+        if column not in header:
+            raise ValueError(
+                f"Cannot filter `{label}` edges on `{column}`: no such "
+                "column in the edge file."
+            )
+
+        compiled.append((list(header).index(column), column, op, value))
+
+    return RowFilter(compiled)
+
+
+def add_filter_counts(total: List[list], counts: List[list]) -> List[list]:
+    """
+    Add the counts of a `RowFilter` to accumulated counts.
+    """
+
+    if not total:
+        return [list(pair) for pair in counts]
+
+    for pair, added in zip(total, counts):
+        pair[0] += added[0]
+        pair[1] += added[1]
+
+    return total
+
+
+class TopKSelection:
+    """
+    Streaming top-k selection of rows by a score column: for each id in
+    the first column (the source), the rows of the `k` ids in the second
+    column (its neighbours) with the highest scores are kept. Each
+    neighbour takes one of the `k` places, with the best score of its rows
+    (earlier rows win ties); of several rows of the same pair, the best one
+    is kept.
+
+    With `symmetric`, pairs are undirected: the rows (a, b) and (b, a) are
+    one pair, which competes for the top k of both a and b and is kept if
+    it is among either. Every kept pair is returned in both directions:
+    the rows of both directions in the input, or if one is missing, the
+    row of the other with source and target swapped (counted in
+    `mirrored`).
+
+    Rows without a numeric score are dropped. One pass over the rows, in
+    which each id has a min-heap of at most `k` neighbours, so that memory
+    is bounded by the rows kept rather than by the size of the input.
+    Counts of rows read and kept are in `rows` and `kept`.
+
+    Args:
+        score_index: index of the score column
+
+        k: number of neighbours kept per id
+
+        symmetric: select undirected pairs and return both directions
+    """
+
+    def __init__(self, score_index: int, k: int, symmetric: bool = False):
+
+        if k < 1:
+            raise ValueError("Top-k selection needs k of at least 1.")
+
+        self.score_index = score_index
+        self.k = k
+        self.symmetric = symmetric
+        self.rows = 0
+        self.kept = 0
+        self.mirrored = 0
+
+    def select(self, rows: Iterable) -> list:
+        """
+        Consume the rows and return those kept, in their original order
+        (mirrored rows right after the row they mirror).
+        """
+
+        # per id: a min-heap of [score, -position, neighbour, rows] entries
+        # (rows of the pair by direction, True for rows from the id), and
+        # the entry of each neighbour in it
+        heaps = {}
+        index = self.score_index
+
+        for position, row in enumerate(rows):
+
+            self.rows += 1
+
+            try:
+                score = float(row[index])
+            except ValueError:
+                continue
+
+            if score != score:
+                continue
+
+            self._offer(heaps, row[0], row[1], score, position, row, True)
+
+            if self.symmetric and row[0] != row[1]:
+                self._offer(heaps, row[1], row[0], score, position, row, False)
+
+        pairs = {}
+
+        for _id, (heap, _) in heaps.items():
+            for _, _, neighbour, by_direction in heap:
+
+                key = (_id, neighbour)
+
+                if self.symmetric:
+                    if _id > neighbour:
+                        key = (neighbour, _id)
+                        by_direction = {
+                            not forward: row
+                            for forward, row in by_direction.items()
+                        }
+                    pairs.setdefault(key, {}).update(by_direction)
+                else:
+                    pairs[key] = {True: by_direction[True]}
+
+        kept = []
+        mirrored = 0
+
+        for by_direction in pairs.values():
+
+            forward = by_direction.get(True)
+            backward = by_direction.get(False)
+
+            if forward and backward:
+                kept.append((forward[0], forward[1]))
+                kept.append((backward[0], backward[1]))
+            else:
+                row = forward or backward
+                kept.append((row[0], row[1]))
+
+                if self.symmetric and row[1][0] != row[1][1]:
+                    swapped = list(row[1])
+                    swapped[0], swapped[1] = row[1][1], row[1][0]
+                    kept.append((row[0] + 0.5, swapped))
+                    mirrored += 1
+
+        kept.sort(key=lambda item: item[0])
+        self.kept += len(kept) - mirrored
+        self.mirrored += mirrored
+
+        return [row for _, row in kept]
+
+    def _offer(self, heaps, _id, neighbour, score, position, row, forward):
+        """
+        Offer a row to the top k neighbours of `_id`.
+        """
+
+        heap, entries = heaps.get(_id) or heaps.setdefault(_id, ([], {}))
+        entry = entries.get(neighbour)
+
+        if entry is not None:
+
+            # another row of a pair in the top k: keep the best of each
+            # direction, and the best score of the pair
+            best = entry[3].get(forward)
+            if best is None or score > float(best[1][self.score_index]):
+                entry[3][forward] = (position, row)
+
+            if score > entry[0]:
+                entry[0], entry[1] = score, -position
+                heapify(heap)
+
+            return
+
+        entry = [score, -position, neighbour, {forward: (position, row)}]
+
+        if len(heap) < self.k:
+            heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            del entries[heapreplace(heap, entry)[2]]
+        else:
+            return
+
+        entries[neighbour] = entry
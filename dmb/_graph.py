@@ -0,0 +1,726 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+In-memory graph in compressed sparse row form, for neighbourhood queries
+without a database.
+"""
+
+import os
+import ast
+import sys
+import json
+import mmap
+import struct
+import importlib.util
+from array import array
+from itertools import chain, repeat
+from typing import Collection, Dict, Iterable, List, Optional, Sequence
+
+from dmb._logger import logger
+from dmb._columnar import NAN
+from dmb._registry import HANDLE_TYPECODE, IdRegistry
+
+logger.debug(f"Loading module {__name__}.")
+
+# version of the saved graph format
+GRAPH_FORMAT_VERSION = 1
+
+# file with the node ids, node labels and layers of a saved graph
+GRAPH_META = "graph.json"
+
+DIRECTIONS = ("out", "in", "both")
+
+# typecodes of the arrays of a graph: offsets (64 bit), node indices (those
+# of the id registry), node label codes, and numeric edge properties
+OFFSET_TYPECODE = "q"
+LABEL_TYPECODE = "h"
+FLOAT_TYPECODE = "d"
+
+# arrays of a layer and their typecodes
+LAYER_ARRAYS = {
+    "out_offsets": OFFSET_TYPECODE,
+    "out_targets": HANDLE_TYPECODE,
+    "in_offsets": OFFSET_TYPECODE,
+    "in_sources": HANDLE_TYPECODE,
+    "in_edges": OFFSET_TYPECODE,
+}
+
+# .npy type descriptors of the typecodes
+_NPY_DESCR = {"q": "<i8", "i": "<i4", "h": "<i2", "d": "<f8"}
+_NPY_TYPECODES = {descr: code for code, descr in _NPY_DESCR.items()}
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+# number of edges whose properties are added to the columns at once
+_PROPERTY_BLOCK_SIZE = 1 << 16
+
+
+def _numpy_installed() -> bool:
+
+    return importlib.util.find_spec("numpy") is not None
+
+
+def _save_npy(path: str, values: array):
+    """
+    Write an array as a one-dimensional little-endian .npy file (version
+    1.0), without NumPy.
+    """
+
+    header = (
+        f"{{'descr': '{_NPY_DESCR[values.typecode]}', 'fortran_order': "
+        f"False, 'shape': ({len(values)},), }}"
+    )
+    # the data starts at a multiple of 64 bytes, as written by NumPy
+    padding = -(len(_NPY_MAGIC) + 2 + len(header) + 1) % 64
+    header = (header + " " * padding + "\n").encode("latin1")
+
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+
+    with open(path, "wb") as f:
+        f.write(_NPY_MAGIC + struct.pack("<H", len(header)) + header)
+        values.tofile(f)
+
+
+def _load_npy(path: str, use_numpy: bool):
+    """
+    Memory-map a one-dimensional .npy file written by `_save_npy`: as a
+    read-only NumPy array, or else as a typed memoryview of the file.
+    """
+
+    if use_numpy:
+        import numpy as np
+
+        return np.load(path, mmap_mode="r")
+
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    length = struct.unpack_from("<H", mapped, len(_NPY_MAGIC))[0]
+    start = len(_NPY_MAGIC) + 2
+    header = ast.literal_eval(mapped[start : start + length].decode("latin1"))
+    typecode = _NPY_TYPECODES[header["descr"]]
+
+    if sys.byteorder == "big":
+        values = array(typecode, mapped[start + length :])
+        values.byteswap()
+        return memoryview(values)
+
+    return memoryview(mapped)[start + length :].cast(typecode)
+
+
+def _csr(sources: array, targets: array, size: int):
+    """
+    Compressed sparse rows of edges (source and target indices): the
+    offsets of the edges of each of `size` nodes, their targets, and the
+    position of each row in the input (edges of a node keep their order).
+    """
+
+    counts = [0] * (size + 1)
+
+    for source in sources:
+        counts[source + 1] += 1
+
+    for i in range(size):
+        counts[i + 1] += counts[i]
+
+    offsets = array(OFFSET_TYPECODE, counts)
+    order = array(OFFSET_TYPECODE, bytes(8 * len(sources)))
+    slots = counts[:-1]
+
+    for position, source in enumerate(sources):
+        order[slots[source]] = position
+        slots[source] += 1
+
+    indices = array(HANDLE_TYPECODE, map(targets.__getitem__, order))
+
+    return offsets, indices, order
+
+
+class StringColumn:
+    """
+    Column of edge property values that are not numbers, stored as codes
+    into the list of distinct values (which are few for most properties,
+    e.g. the source database of an edge). Saved as a .npy file of codes
+    and a JSON file of values, which is only read on first access.
+
+    Args:
+        codes: index of the value of each edge in `values`
+
+        values: distinct values, or the path of their JSON file
+    """
+
+    def __init__(self, codes, values):
+
+        self.codes = codes
+        self._values = values
+
+    @classmethod
+    def from_values(cls, values: Iterable) -> "StringColumn":
+
+        distinct = {}
+        codes = array(
+            HANDLE_TYPECODE,
+            (distinct.setdefault(value, len(distinct)) for value in values),
+        )
+
+        return cls(codes, list(distinct))
+
+    @property
+    def values(self) -> list:
+
+        if isinstance(self._values, str):
+            with open(self._values) as f:
+                self._values = json.load(f)
+
+        return self._values
+
+    def __len__(self):
+
+        return len(self.codes)
+
+    def __getitem__(self, position: int):
+
+        return self.values[self.codes[position]]
+
+
+def _float(value) -> float:
+
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+
+class _ColumnBuilder:
+    """
+    Typed column of an edge property, filled in blocks of edges with
+    `extend`: an array of doubles for numeric properties (NaN for missing
+    values and values that are not numbers), else the codes and distinct
+    values of a `StringColumn`.
+
+    Args:
+        numeric: whether the property is numeric
+
+        missing: number of edges before the first with the property
+    """
+
+    def __init__(self, numeric: bool, missing: int = 0):
+
+        self.numeric = numeric
+
+        if numeric:
+            self.values = array(FLOAT_TYPECODE, [NAN]) * missing
+        else:
+            self.codes = array(HANDLE_TYPECODE, [0]) * missing
+            self.distinct = {None: 0} if missing else {}
+
+    def extend(self, values: list):
+
+        if self.numeric:
+
+            try:
+                block = array(FLOAT_TYPECODE, map(float, values))
+            except (TypeError, ValueError):
+                block = array(FLOAT_TYPECODE, map(_float, values))
+
+            self.values.extend(block)
+            return
+
+        distinct = self.distinct
+
+        for value in dict.fromkeys(values):
+            if value not in distinct:
+                distinct[value] = len(distinct)
+
+        self.codes.extend(map(distinct.__getitem__, values))
+
+    def column(self, order: array):
+        """
+        The column, with the values in `order`.
+        """
+
+        if self.numeric:
+            return array(FLOAT_TYPECODE, map(self.values.__getitem__, order))
+
+        return StringColumn(
+            array(HANDLE_TYPECODE, map(self.codes.__getitem__, order)),
+            list(self.distinct),
+        )
+
+
+def _add_properties(layer: dict):
+    """
+    Add the properties of the pending edges of a layer to its columns.
+    """
+
+    pending = layer["pending"]
+    properties = layer["properties"]
+    done = len(layer["sources"]) - len(pending)
+
+    for name in dict.fromkeys(chain.from_iterable(pending)):
+        if name not in properties:
+            properties[name] = _ColumnBuilder(name in layer["numeric"], done)
+
+    for name, column in properties.items():
+        column.extend(list(map(dict.get, pending, repeat(name))))
+
+    pending.clear()
+
+
+class CsrLayer:
+    """
+    Edges of one edge type in compressed sparse row form, in both
+    directions: `out_offsets[i]:out_offsets[i + 1]` are the positions of
+    the edges of node `i` in `out_targets` and in the property columns;
+    `in_offsets` and `in_sources` are the same for incoming edges, with
+    `in_edges` the position of each incoming edge in the outgoing order.
+    """
+
+    def __init__(
+        self,
+        out_offsets,
+        out_targets,
+        in_offsets,
+        in_sources,
+        in_edges,
+        properties: Dict[str, Sequence],
+    ):
+
+        self.out_offsets = out_offsets
+        self.out_targets = out_targets
+        self.in_offsets = in_offsets
+        self.in_sources = in_sources
+        self.in_edges = in_edges
+        self.properties = properties
+
+    def __len__(self):
+
+        return len(self.out_targets)
+
+    def neighbours(self, index: int, direction: str) -> List[int]:
+
+        if direction == "out":
+            start, end = self.out_offsets[index], self.out_offsets[index + 1]
+            return self.out_targets[start:end].tolist()
+
+        start, end = self.in_offsets[index], self.in_offsets[index + 1]
+        return self.in_sources[start:end].tolist()
+
+    def edges(self, index: int, direction: str) -> List[int]:
+        """
+        Positions of the edges of a node in the property columns.
+        """
+
+        if direction == "out":
+            return list(
+                range(self.out_offsets[index], self.out_offsets[index + 1])
+            )
+
+        start, end = self.in_offsets[index], self.in_offsets[index + 1]
+        return self.in_edges[start:end].tolist()
+
+    def degree(self, index: int, direction: str) -> int:
+
+        offsets = self.out_offsets if direction == "out" else self.in_offsets
+
+        return int(offsets[index + 1] - offsets[index])
+
+
+class CsrGraph:
+    """
+    Graph of DepMap nodes and edges for neighbourhood queries without a
+    database: nodes have integer indices (those of an `IdRegistry`), and
+    the edges of each edge type are a `CsrLayer` with typed property
+    columns (arrays of doubles for numeric properties).
+
+    Build from the output of `get_nodes` and `get_edges` with `build`,
+    store with `save` and open with `load`, which memory-maps the arrays
+    (as NumPy arrays if NumPy is installed), so that loading takes about
+    as long as reading the node ids.
+
+    Args:
+        node_ids: id of each node index
+
+        node_labels: label of each node (None for nodes that only occur
+            as edge endpoints)
+
+        layers: `CsrLayer` per edge type
+    """
+
+    def __init__(
+        self,
+        node_ids: List[str],
+        node_labels: List[Optional[str]],
+        layers: Dict[str, CsrLayer],
+    ):
+
+        self.node_ids = node_ids
+        self.node_labels = node_labels
+        self.layers = layers
+        self._indices = {_id: i for i, _id in enumerate(node_ids)}
+
+    def __len__(self):
+
+        return len(self.node_ids)
+
+    @classmethod
+    def build(
+        cls,
+        nodes: Iterable[tuple],
+        edges: Iterable[tuple],
+        numeric: Optional[Dict[str, Collection[str]]] = None,
+    ):
+        """
+        Build the graph in one pass over (id, label, properties) node
+        tuples and (source, target, label, properties) edge tuples. Edge
+        endpoints that are not among the nodes become nodes without label;
+        edges with a missing endpoint are skipped.
+
+        Args:
+            nodes: node tuples
+
+            edges: edge tuples
+
+            numeric: per edge label, the properties stored as arrays of
+                doubles; all others are stored as strings
+        """
+
+        numeric = numeric or {}
+        registry = IdRegistry()
+        labels = {}
+
+        for _id, _label, _ in nodes:
+            labels[registry.handle(_id)] = _label
+
+        columns = {}
+
+        for _src, _tar, _label, _props in edges:
+
+            if _src is None or _tar is None:
+                continue
+
+            layer = columns.get(_label)
+
+            if layer is None:
+                layer = columns[_label] = {
+                    "sources": array(HANDLE_TYPECODE),
+                    "targets": array(HANDLE_TYPECODE),
+                    "properties": {},
+                    "numeric": numeric.get(_label, ()),
+                    # properties of the edges not yet in the columns
+                    "pending": [],
+                }
+
+            layer["sources"].append(registry.handle(_src))
+            layer["targets"].append(registry.handle(_tar))
+            layer["pending"].append(_props or {})
+
+            if len(layer["pending"]) >= _PROPERTY_BLOCK_SIZE:
+                _add_properties(layer)
+
+        for layer in columns.values():
+            _add_properties(layer)
+
+        size = len(registry)
+        layers = {}
+
+        for _label, layer in columns.items():
+
+            offsets, targets, order = _csr(
+                layer["sources"], layer["targets"], size
+            )
+            # the out-edges of each target, as positions in `order`
+            in_offsets, in_edges, _ = _csr(
+                array(
+                    HANDLE_TYPECODE, map(layer["targets"].__getitem__, order)
+                ),
+                array(HANDLE_TYPECODE, range(len(order))),
+                size,
+            )
+            sources = layer["sources"]
+
+            layers[_label] = CsrLayer(
+                offsets,
+                targets,
+                in_offsets,
+                array(
+                    HANDLE_TYPECODE,
+                    (sources[order[edge]] for edge in in_edges),
+                ),
+                array(OFFSET_TYPECODE, in_edges),
+                {
+                    name: column.column(order)
+                    for name, column in layer["properties"].items()
+                },
+            )
+
+        graph = cls(
+            [registry.curie(i) for i in range(size)],
+            [labels.get(i) for i in range(size)],
+            layers,
+        )
+
+        logger.info(
+            f"Built graph of {size} nodes and "
+            + ", ".join(
+                f"{len(layer)} {_label}" for _label, layer in layers.items()
+            )
+            + " edges."
+        )
+
+        return graph
+
+    def save(self, path: str):
+        """
+        Save the graph in a directory: node ids and labels in `GRAPH_META`,
+        arrays as .npy files per layer (string properties as JSON).
+        """
+
+        os.makedirs(path, exist_ok=True)
+
+        label_names = sorted({_l for _l in self.node_labels if _l})
+        codes = {_label: i for i, _label in enumerate(label_names)}
+        _save_npy(
+            os.path.join(path, "node_labels.npy"),
+            array(
+                LABEL_TYPECODE,
+                (codes.get(_label, -1) for _label in self.node_labels),
+            ),
+        )
+
+        meta = {
+            "version": GRAPH_FORMAT_VERSION,
+            "nodes": self.node_ids,
+            "labels": label_names,
+            "layers": {},
+        }
+
+        for number, (_label, layer) in enumerate(self.layers.items()):
+
+            directory = f"layer_{number}"
+            os.makedirs(os.path.join(path, directory), exist_ok=True)
+
+            for name, typecode in LAYER_ARRAYS.items():
+                _save_npy(
+                    os.path.join(path, directory, f"{name}.npy"),
+                    array(typecode, getattr(layer, name)),
+                )
+
+            properties = {}
+
+            for i, (name, column) in enumerate(layer.properties.items()):
+
+                file = os.path.join(path, directory, f"property_{i}")
+
+                if isinstance(column, StringColumn):
+                    properties[name] = "str"
+                    _save_npy(
+                        f"{file}.npy", array(HANDLE_TYPECODE, column.codes)
+                    )
+                    with open(f"{file}.json", "w") as f:
+                        json.dump(column.values, f)
+                else:
+                    properties[name] = "float64"
+                    _save_npy(f"{file}.npy", array(FLOAT_TYPECODE, column))
+
+            meta["layers"][_label] = {
+                "directory": directory,
+                "edges": len(layer),
+                "properties": properties,
+            }
+
+        with open(os.path.join(path, GRAPH_META), "w") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, path: str, use_numpy: Optional[bool] = None):
+        """
+        Open a graph saved with `save`, memory-mapping its arrays.
+
+        Args:
+            path: directory of the graph
+
+            use_numpy: map arrays as NumPy arrays (default: if NumPy is
+                installed) or as memoryviews
+        """
+
+        if use_numpy is None:
+            use_numpy = _numpy_installed()
+
+        with open(os.path.join(path, GRAPH_META)) as f:
+            meta = json.load(f)
+
+        if meta.get("version") != GRAPH_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported graph format version `{meta.get('version')}` "
+                f"in {path}."
+            )
+
+        label_names = meta["labels"]
+        codes = _load_npy(os.path.join(path, "node_labels.npy"), use_numpy)
+        layers = {}
+
+        for _label, entry in meta["layers"].items():
+
+            directory = os.path.join(path, entry["directory"])
+            arrays = {
+                name: _load_npy(
+                    os.path.join(directory, f"{name}.npy"), use_numpy
+                )
+                for name in LAYER_ARRAYS
+            }
+            properties = {}
+
+            for i, (name, kind) in enumerate(entry["properties"].items()):
+
+                file = os.path.join(directory, f"property_{i}")
+                column = _load_npy(f"{file}.npy", use_numpy)
+
+                if kind == "str":
+                    column = StringColumn(column, f"{file}.json")
+
+                properties[name] = column
+
+            layers[_label] = CsrLayer(properties=properties, **arrays)
+
+        return cls(
+            meta["nodes"],
+            [label_names[code] if code >= 0 else None for code in codes],
+            layers,
+        )
+
+    def index(self, _id: str) -> int:
+        """
+        Index of a node id (KeyError if it is not in the graph).
+        """
+
+        return self._indices[_id]
+
+    def _layers(self, edge_types):
+
+        if edge_types is None:
+            return list(self.layers.values())
+
+        if isinstance(edge_types, str):
+            edge_types = [edge_types]
+
+        return [
+            self.layers[_type] for _type in edge_types if _type in self.layers
+        ]
+
+    def _directions(self, direction):
+
+        if direction not in DIRECTIONS:
+            raise ValueError(
+                f"Unknown direction `{direction}`; use one of "
+                f"{', '.join(DIRECTIONS)}."
+            )
+
+        return ("out", "in") if direction == "both" else (direction,)
+
+    def neighbours(
+        self,
+        _id: str,
+        edge_types: Optional[Sequence[str]] = None,
+        direction: str = "out",
+    ) -> List[str]:
+        """
+        Ids of the neighbours of a node, once per edge (e.g. the genes that
+        a compound targets: `neighbours(compound, "compoundTarget")`).
+
+        Args:
+            _id: node id
+
+            edge_types: edge type or types (all if not given)
+
+            direction: `out` (targets), `in` (sources) or `both`
+        """
+
+        index = self.index(_id)
+        ids = self.node_ids
+
+        return [
+            ids[neighbour]
+            for layer in self._layers(edge_types)
+            for _direction in self._directions(direction)
+            for neighbour in layer.neighbours(index, _direction)
+        ]
+
+    def edge_values(
+        self, _id: str, edge_type: str, name: str, direction: str = "out"
+    ) -> List:
+        """
+        Values of an edge property for the edges of a node of one edge
+        type, in the order of `neighbours(_id, edge_type, direction)`.
+        """
+
+        index = self.index(_id)
+        layer = self.layers[edge_type]
+        column = layer.properties[name]
+
+        return [
+            column[edge]
+            for _direction in self._directions(direction)
+            for edge in layer.edges(index, _direction)
+        ]
+
+    def degree(
+        self,
+        _id: str,
+        edge_types: Optional[Sequence[str]] = None,
+        direction: str = "out",
+    ) -> int:
+        """
+        Number of edges of a node (see `neighbours`).
+        """
+
+        index = self.index(_id)
+
+        return sum(
+            layer.degree(index, _direction)
+            for layer in self._layers(edge_types)
+            for _direction in self._directions(direction)
+        )
+
+    def k_hop(
+        self,
+        _id: str,
+        k: int,
+        edge_types: Optional[Sequence[str]] = None,
+        direction: str = "out",
+    ) -> Dict[str, int]:
+        """
+        Nodes within `k` hops of a node (breadth first), with the number of
+        hops to reach them; the node itself is left out.
+        """
+
+        start = self.index(_id)
+        layers = self._layers(edge_types)
+        directions = self._directions(direction)
+        hops = {start: 0}
+        frontier = [start]
+
+        for hop in range(1, k + 1):
+
+            reached = []
+
+            for index in frontier:
+                for layer in layers:
+                    for _direction in directions:
+                        for neighbour in layer.neighbours(index, _direction):
+                            if neighbour not in hops:
+                                hops[neighbour] = hop
+                                reached.append(neighbour)
+
+            if not reached:
+                break
+
+            frontier = reached
+
+        del hops[start]
+
+        return {self.node_ids[index]: hop for index, hop in hops.items()}
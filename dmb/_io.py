@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Opening of plain and compressed input files.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import threading
+from typing import Optional
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+READ_BUFFER_SIZE = 1 << 20
+
+# number of decompressed blocks the decompression thread may read ahead
+_READ_AHEAD = 8
+
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".xz", ".zst")
+
+
+def _open_zstd(path):
+    """
+    Open a zstd file with whichever zstd module is installed.
+    """
+
+    try:
+        from compression import zstd
+    except ImportError:
+        try:
+            from backports import zstd
+        except ImportError:
+            try:
+                import zstandard as zstd
+            except ImportError:
+                raise ImportError(
+                    f"Reading `{path}` requires zstd support: install "
+                    "`backports.zstd` or `zstandard` (or use Python 3.14)."
+                )
+
+    return zstd.open(path, "rb")
+
+
+_OPENERS = {
+    ".gz": lambda path: gzip.open(path, "rb"),
+    ".bz2": lambda path: bz2.open(path, "rb"),
+    ".xz": lambda path: lzma.open(path, "rb"),
+    ".zst": _open_zstd,
+}
+
+
+def resolve_input(path: str) -> str:
+    """
+    Return the path of an input file as it exists on disk: the path itself,
+    or else the first compressed variant of it (`path` + one of
+    `COMPRESSED_SUFFIXES`) that exists. Returns `path` if none exists.
+    """
+
+    if os.path.exists(path):
+        return path
+
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(path + suffix):
+            return path + suffix
+
+    return path
+
+
+def is_compressed(path: str) -> bool:
+
+    return path.endswith(COMPRESSED_SUFFIXES)
+
+
+def open_binary(path: str):
+    """
+    Open an input file (or its compressed variant, see `resolve_input`) as
+    a binary stream of its (decompressed) bytes.
+    """
+
+    path = resolve_input(path)
+
+    if not is_compressed(path):
+        return open(path, "rb")
+
+    return _OPENERS[os.path.splitext(path)[1]](path)
+
+
+def open_input(path: str, threaded: bool = True):
+    """
+    Open an input file (or its compressed variant, see `resolve_input`) as
+    a text stream with a large read buffer.
+
+    Compressed files are decompressed as a stream. With `threaded`, the
+    decompression runs in a separate thread that reads ahead of the parser
+    (zlib, bz2, lzma and zstd release the GIL while decompressing, so both
+    overlap).
+
+    Args:
+        path: path to the (uncompressed) input file
+
+        threaded: decompress in a separate thread
+    """
+
+    path = resolve_input(path)
+
+    if not is_compressed(path):
+        return open(path, "r", buffering=READ_BUFFER_SIZE)
+
+    stream = _OPENERS[os.path.splitext(path)[1]](path)
+
+    if threaded:
+        stream = io.BufferedReader(
+            _ThreadedReader(stream), buffer_size=READ_BUFFER_SIZE
+        )
+
+    return io.TextIOWrapper(stream)
+
+
+class _ThreadedReader(io.RawIOBase):
+    """
+    Raw binary stream whose data is read from another stream in a separate
+    thread, at most `_READ_AHEAD` blocks ahead of the consumer.
+    """
+
+    def __init__(self, stream, block_size: int = READ_BUFFER_SIZE):
+
+        self._stream = stream
+        self._block_size = block_size
+        self._queue = queue.Queue(maxsize=_READ_AHEAD)
+        self._stop = threading.Event()
+        self._block: Optional[memoryview] = None
+        self._position = 0
+        self._eof = False
+
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def _fill(self):
+
+        try:
+            while True:
+                block = self._stream.read(self._block_size)
+                if not self._put(block) or not block:
+                    return
+        except Exception as e:
+            self._put(e)
+
+    def readable(self):
+
+        return True
+
+    def readinto(self, buffer):
+
+        if self._block is None or self._position >= len(self._block):
+
+            if self._eof:
+                return 0
+
+            item = self._queue.get()
+
+            if isinstance(item, Exception):
+                raise item
+
+            if not item:
+                self._eof = True
+                return 0
+
+            self._block = memoryview(item)
+            self._position = 0
+
+        size = min(len(buffer), len(self._block) - self._position)
+        buffer[:size] = self._block[self._position : self._position + size]
+        self._position += size
+
+        return size
+
+    def close(self):
+
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._stream.close()
+
+        super().close()
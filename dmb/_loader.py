@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Online loading of nodes and edges into a running Neo4j database.
+"""
+
+import time
+import threading
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Optional
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+_NODE_QUERY = """
+UNWIND $rows AS row
+MERGE (n:`{label}` {{id: row.id}})
+SET n += row.properties
+"""
+
+_NODE_LABELS_QUERY = "SET n{labels}\n"
+
+_EDGE_QUERY = """
+UNWIND $rows AS row
+MATCH (s{source} {{id: row.source}})
+MATCH (t{target} {{id: row.target}})
+CREATE (s)-[r:`{type}`]->(t)
+SET r = row.properties
+"""
+
+_INDEX_QUERY = "CREATE INDEX IF NOT EXISTS FOR (n:`{label}`) ON (n.id)"
+
+_DELETE_QUERY = """
+MATCH ()-[r:`{type}`]->()
+WITH r LIMIT $limit
+DELETE r
+RETURN count(*) AS deleted
+"""
+
+
+def _transient_errors() -> tuple:
+    """
+    Exceptions of the Neo4j driver after which a batch is retried (none
+    if the driver package is not installed, e.g. with a stub driver).
+    """
+
+    try:
+        from neo4j.exceptions import (
+            TransientError,
+            SessionExpired,
+            ServiceUnavailable,
+        )
+    except ImportError:
+        return ()
+
+    return (TransientError, SessionExpired, ServiceUnavailable)
+
+
+def biocypher_labels(bc, input_labels: Iterable[str]) -> dict:
+    """
+    Neo4j labels that BioCypher gives the input labels of a schema
+    configuration, so that online loading writes to the same labels as
+    `neo4j-admin import` of BioCypher output: the relationship type of
+    edges, e.g. `response` -> `SequenceVariantModulatesTreatmentAssociation`,
+    and the label hierarchy of nodes, from the most specific label to the
+    most generic (BioCypher's default `labels_order`), e.g. `gene` ->
+    `["Gene", "NamedThing", "Entity"]`. Input labels without a schema
+    mapping are left out.
+    """
+
+    translator = bc._get_translator()
+    schema = translator.ontology.mapping.extended_schema
+    labels = {}
+
+    for input_label in input_labels:
+
+        schema_label = translator._get_ontology_mapping(input_label)
+
+        if not schema_label:
+            continue
+
+        if schema[schema_label].get("represented_as") == "node":
+            labels[input_label] = list(
+                dict.fromkeys(
+                    translator.name_sentence_to_pascal(label)
+                    for label in _ancestors(translator.ontology, schema_label)
+                )
+            )
+        else:
+            labels[input_label] = translator.name_sentence_to_pascal(
+                schema[schema_label].get("label_as_edge") or schema_label
+            )
+
+    return labels
+
+
+def _ancestors(ontology, schema_label) -> list:
+    """
+    Ontology class of a schema label and its ancestors (the class alone if
+    it is not in the ontology).
+    """
+
+    import networkx
+
+    try:
+        return ontology.get_ancestors(schema_label)
+    except networkx.exception.NetworkXError:
+        return [schema_label]
+
+
+class Neo4jLoader:
+    """
+    Loads nodes and edges into a running Neo4j database with parameterised
+    `UNWIND` queries: nodes are merged on their `id` property, edges are
+    created between the nodes with their source and target ids. As with
+    `neo4j-admin import`, every edge becomes a relationship of its own, so
+    that parallel edges (e.g. of several screens) are kept; loading the
+    same edges again adds them again, unless the label is replaced.
+
+    Rows are sent in batches of `batch_size`, with up to `concurrency`
+    transactions of the same label in flight (each in its own session of
+    the driver's connection pool). Batches that fail with a transient
+    error (e.g. a deadlock between concurrent transactions, or a lost
+    connection) are retried up to `max_retries` times with exponential
+    backoff. Per label, rows, batches, retries and seconds are recorded in
+    `stats`.
+
+    Requires the `neo4j` driver package (or a `driver` object with the
+    same interface).
+
+    Args:
+        uri: bolt URI of the database, e.g. `bolt://localhost:7687`
+
+        auth: (user, password)
+
+        database: name of the database (the default database if not given)
+
+        batch_size: number of rows per transaction
+
+        concurrency: number of concurrent transactions per label
+
+        max_retries: number of retries of a batch after transient errors
+
+        labels: Neo4j label, list of labels (nodes, the first of which
+            identifies them) or relationship type per input label, e.g.
+            from `biocypher_labels`; input labels are used as they are if
+            not given
+
+        driver: driver to use instead of creating one from `uri`
+    """
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        auth: Optional[tuple] = None,
+        database: Optional[str] = None,
+        batch_size: int = int(1e4),
+        concurrency: int = 4,
+        max_retries: int = 5,
+        labels: Optional[dict] = None,
+        driver=None,
+    ):
+
+        if driver is None:
+
+            try:
+                import neo4j
+            except ImportError:
+                raise ImportError(
+                    "Online loading requires the Neo4j driver: install "
+                    "`neo4j`."
+                )
+
+            driver = neo4j.GraphDatabase.driver(
+                uri, auth=auth, max_connection_pool_size=max(concurrency, 1)
+            )
+
+        self.driver = driver
+        self.database = database
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.labels = labels or {}
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._indexed = set()
+
+    def close(self):
+
+        self.driver.close()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc):
+
+        self.close()
+
+    def label(self, input_label: str) -> str:
+        """
+        Neo4j label (the first, if several) of an input label.
+        """
+
+        return self.node_labels(input_label)[0]
+
+    def node_labels(self, input_label: str) -> list:
+        """
+        All Neo4j labels of an input label.
+        """
+
+        labels = self.labels.get(input_label, input_label)
+
+        return [labels] if isinstance(labels, str) else list(labels)
+
+    def load_nodes(self, input_label: str, nodes: Iterable[tuple]) -> int:
+        """
+        Merge (id, label, properties) node tuples of one input label on
+        their first Neo4j label, and set the others.
+
+        Returns:
+            number of nodes sent
+        """
+
+        label, *others = self.node_labels(input_label)
+        self._create_index(label)
+        query = _NODE_QUERY.format(label=label)
+
+        if others:
+            query += _NODE_LABELS_QUERY.format(
+                labels="".join(f":`{other}`" for other in others)
+            )
+
+        return self._load(
+            input_label,
+            query,
+            ({"id": _id, "properties": _props} for _id, _, _props in nodes),
+        )
+
+    def load_edges(
+        self,
+        input_label: str,
+        edges: Iterable[tuple],
+        source_label: Optional[str] = None,
+        target_label: Optional[str] = None,
+        replace: bool = False,
+    ) -> int:
+        """
+        Create (source, target, label, properties) edge tuples of one input
+        label between existing nodes (edges whose nodes do not exist are
+        skipped by the query).
+
+        Args:
+            source_label: input label of the source nodes (matched by id
+                alone if not given, which is not backed by an index)
+
+            target_label: input label of the target nodes
+
+            replace: delete all relationships of this type first, to
+                refresh a label instead of adding to it
+
+        Returns:
+            number of edges sent
+        """
+
+        _type = self.label(input_label)
+
+        if replace:
+            self._delete_relationships(_type)
+
+        query = _EDGE_QUERY.format(
+            source=f":`{self.label(source_label)}`" if source_label else "",
+            target=f":`{self.label(target_label)}`" if target_label else "",
+            type=_type,
+        )
+
+        return self._load(
+            input_label,
+            query,
+            (
+                {"source": _src, "target": _tar, "properties": _props}
+                for _src, _tar, _, _props in edges
+            ),
+        )
+
+    def _load(self, input_label, query, rows) -> int:
+        """
+        Send rows in batches, with at most `concurrency` transactions in
+        flight.
+        """
+
+        stats = self.stats.setdefault(
+            input_label,
+            {"rows": 0, "batches": 0, "retries": 0, "seconds": 0.0},
+        )
+        start = time.perf_counter()
+        sent = 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+
+            running = set()
+
+            while True:
+
+                batch = list(islice(rows, self.batch_size))
+
+                if not batch:
+                    break
+
+                if len(running) >= self.concurrency:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+
+                running.add(executor.submit(self._write, query, batch, stats))
+                sent += len(batch)
+
+            for future in running:
+                future.result()
+
+        seconds = time.perf_counter() - start
+
+        with self._lock:
+            stats["rows"] += sent
+            stats["seconds"] += seconds
+            stats["rows_per_second"] = (
+                stats["rows"] / stats["seconds"] if stats["seconds"] else None
+            )
+
+        logger.info(
+            f"Loaded {sent} `{input_label}` rows in {seconds:.2f} s "
+            f"({sent / seconds if seconds else 0:.0f} rows/s)."
+        )
+
+        return sent
+
+    def _write(self, query, batch, stats):
+        """
+        Run one batch in its own transaction, retrying transient errors.
+        """
+
+        transient = _transient_errors()
+
+        for attempt in range(self.max_retries + 1):
+
+            try:
+
+                with self.driver.session(database=self.database) as session:
+                    with session.begin_transaction() as tx:
+                        tx.run(query, rows=batch).consume()
+                        tx.commit()
+
+                break
+
+            except transient as e:
+
+                if attempt == self.max_retries:
+                    raise
+
+                with self._lock:
+                    stats["retries"] += 1
+
+                logger.warning(
+                    f"Retrying a batch after a transient error: {e}"
+                )
+                time.sleep(min(2**attempt * 0.1, 10))
+
+        with self._lock:
+            stats["batches"] += 1
+
+    def _create_index(self, label):
+
+        if label in self._indexed:
+            return
+
+        with self.driver.session(database=self.database) as session:
+            session.run(_INDEX_QUERY.format(label=label)).consume()
+
+        self._indexed.add(label)
+
+    def _delete_relationships(self, _type):
+        """
+        Delete all relationships of a type, in batches.
+        """
+
+        deleted = 0
+
+        with self.driver.session(database=self.database) as session:
+
+            while True:
+
+                count = session.run(
+                    _DELETE_QUERY.format(type=_type), limit=self.batch_size
+                ).single()["deleted"]
+
+                deleted += count
+
+                if count < self.batch_size:
+                    break
+
+        logger.info(f"Deleted {deleted} `{_type}` relationships.")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Logger of the adapter modules that imports `biocypher` only when needed.
+"""
+
+import sys
+import logging
+
+# module whose import configures the BioCypher logger (and imports the
+# whole `biocypher` package)
+_BIOCYPHER_LOGGER = "biocypher._logger"
+
+
+class _LazyLogger:
+    """
+    Stand-in for the BioCypher logger. Importing `biocypher._logger`
+    imports all of BioCypher, which takes longer than the adapter itself,
+    so it is deferred until something is logged above debug level (or
+    BioCypher has been imported anyway). Debug records before that are
+    kept, with their origin, and handed to the BioCypher logger then.
+    """
+
+    _logger = None
+
+    def __init__(self):
+
+        self._pending = []
+
+    def _resolve(self) -> logging.Logger:
+
+        if self._logger is None:
+
+            from biocypher._logger import logger
+
+            for record in self._pending:
+                if logger.isEnabledFor(record.levelno):
+                    logger.handle(record)
+
+            self._pending = []
+            self._logger = logger
+
+        return self._logger
+
+    def debug(self, msg, *args, **kwargs):
+
+        if self._logger is not None:
+            self._logger.debug(msg, *args, stacklevel=2, **kwargs)
+            return
+
+        frame = sys._getframe(1)
+
+        self._pending.append(
+            logging.LogRecord(
+                "biocypher",
+                logging.DEBUG,
+                frame.f_code.co_filename,
+                frame.f_lineno,
+                msg,
+                args,
+                None,
+                frame.f_code.co_name,
+            )
+        )
+
+        if _BIOCYPHER_LOGGER in sys.modules:
+            self._resolve()
+
+    def __getattr__(self, name):
+
+        return getattr(self._resolve(), name)
+
+
+logger = _LazyLogger()
+
+logger.debug(f"Loading module {__name__}.")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Input file fingerprints for incremental imports.
+"""
+
+import hashlib
+import json
+import os
+from typing import Optional
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+MANIFEST_VERSION = 2
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_fingerprint(path: str, previous: Optional[dict] = None) -> dict:
+    """
+    Size, modification time and content hash (BLAKE2b) of a file.
+
+    If a previous fingerprint with the same size and modification time is
+    given, its hash is reused instead of reading the file again.
+
+    Args:
+        path: path to the file
+
+        previous: fingerprint of the file from an earlier run
+    """
+
+    stat = os.stat(path)
+    fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+    if (
+        previous
+        and previous.get("size") == fingerprint["size"]
+        and previous.get("mtime") == fingerprint["mtime"]
+    ):
+        fingerprint["blake2b"] = previous["blake2b"]
+        return fingerprint
+
+    digest = hashlib.blake2b()
+
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+
+    fingerprint["blake2b"] = digest.hexdigest()
+
+    return fingerprint
+
+
+def same_content(a: Optional[dict], b: Optional[dict]) -> bool:
+    """
+    Whether two fingerprints describe the same file content (a changed
+    modification time alone does not count as a change).
+    """
+
+    if not a or not b:
+        return False
+
+    return a["size"] == b["size"] and a["blake2b"] == b["blake2b"]
+
+
+def load_manifest(path: str) -> dict:
+    """
+    Load a manifest; a missing or outdated manifest is treated as empty, so
+    everything is regenerated.
+    """
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r") as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        logger.warning(f"Ignoring manifest `{path}` of another version.")
+        return {}
+
+    return manifest
+
+
+def save_manifest(path: str, manifest: dict):
+    """
+    Write a manifest, creating its folder if needed.
+    """
+
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    manifest["version"] = MANIFEST_VERSION
+
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
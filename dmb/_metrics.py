@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Per-label counters and timings of the adapter's row loops.
+"""
+
+import json
+import time
+from collections import Counter
+from typing import Optional
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+# rows between two checks whether a progress message is due
+PROGRESS_CHECK_ROWS = 10000
+
+
+class LabelMetrics:
+    """
+    Counters and timings of one label.
+
+    Timings are split into parsing the CSV (`parse`), id normalisation
+    (`normalise`), property processing (`properties`) and the time spent
+    waiting for the consumer to ask for the next row (`consumer`).
+    """
+
+    def __init__(self, label: str, kind: str):
+
+        self.label = label
+        self.kind = kind
+
+        self.rows_read = 0
+        self.rows_emitted = 0
+        self.dropped = Counter()
+        self.warnings = Counter()
+
+        self.parse = 0.0
+        self.normalise = 0.0
+        self.properties = 0.0
+        self.consumer = 0.0
+
+        self.normaliser_hits = 0
+        self.normaliser_misses = 0
+
+        self.from_cache = False
+
+    def merge(self, other: "LabelMetrics"):
+        """
+        Add the counts and timings of another part of the same label (e.g.
+        from a worker process).
+        """
+
+        self.rows_read += other.rows_read
+        self.rows_emitted += other.rows_emitted
+        self.dropped.update(other.dropped)
+        self.warnings.update(other.warnings)
+
+        self.parse += other.parse
+        self.normalise += other.normalise
+        self.properties += other.properties
+        self.consumer += other.consumer
+
+        self.normaliser_hits += other.normaliser_hits
+        self.normaliser_misses += other.normaliser_misses
+
+        self.from_cache = self.from_cache or other.from_cache
+
+    def as_dict(self) -> dict:
+
+        lookups = self.normaliser_hits + self.normaliser_misses
+
+        return {
+            "kind": self.kind,
+            "rows_read": self.rows_read,
+            "rows_emitted": self.rows_emitted,
+            "rows_dropped": dict(self.dropped),
+            "warnings": dict(self.warnings),
+            "seconds": {
+                "parse": self.parse,
+                "normalise": self.normalise,
+                "properties": self.properties,
+                "consumer": self.consumer,
+            },
+            "normaliser": {
+                "hits": self.normaliser_hits,
+                "misses": self.normaliser_misses,
+                "hit_rate": (
+                    self.normaliser_hits / lookups if lookups else None
+                ),
+            },
+            "from_cache": self.from_cache,
+        }
+
+
+class AdapterMetrics:
+    """
+    Metrics of all labels of an adapter run.
+
+    Args:
+        progress_interval: if given, log the progress of the current label
+            at most every this many seconds
+    """
+
+    def __init__(self, progress_interval: Optional[float] = None):
+
+        self.progress_interval = progress_interval
+        self.labels = {}
+        self._last_progress = time.monotonic()
+
+    def label(self, label: str, kind: str) -> LabelMetrics:
+        """
+        Get (or create) the metrics of a label.
+        """
+
+        if label not in self.labels:
+            self.labels[label] = LabelMetrics(label, kind)
+
+        return self.labels[label]
+
+    def pop(self, label: str) -> Optional[LabelMetrics]:
+        """
+        Remove and return the metrics of a label, to be merged elsewhere.
+        """
+
+        return self.labels.pop(label, None)
+
+    def merge(self, metrics: Optional[LabelMetrics]):
+        """
+        Merge the metrics of (part of) a label collected elsewhere.
+        """
+
+        if metrics:
+            self.label(metrics.label, metrics.kind).merge(metrics)
+
+    def progress(self, metrics: LabelMetrics):
+        """
+        Log the progress of a label if the progress interval has passed.
+        """
+
+        if self.progress_interval is None:
+            return
+
+        now = time.monotonic()
+
+        if now - self._last_progress >= self.progress_interval:
+            self._last_progress = now
+            logger.info(
+                f"{metrics.label}: {metrics.rows_read} rows read, "
+                f"{metrics.rows_emitted} emitted, "
+                f"{sum(metrics.dropped.values())} dropped."
+            )
+
+    def as_dict(self) -> dict:
+
+        return {label: m.as_dict() for label, m in self.labels.items()}
+
+    def to_json(self, path: Optional[str] = None, **extra) -> str:
+        """
+        Serialise the metrics (and any extra entries) as JSON, optionally
+        writing them to a file.
+        """
+
+        text = json.dumps({"labels": self.as_dict(), **extra}, indent=2)
+
+        if path:
+            with open(path, "w") as f:
+                f.write(text)
+
+        return text
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Memoised CURIE normalisation for node and edge identifiers.
+"""
+
+from typing import Iterable, Optional
+
+from dmb._logger import logger
+from dmb._readers import CsvRows
+
+logger.debug(f"Loading module {__name__}.")
+
+DEFAULT_CACHE_SIZE = int(1e6)
+
+# prefixes that are not registered in bioregistry and are only prepended
+PLAIN_PREFIXES = ("compoundname", "variant")
+
+
+class CurieNormaliser:
+    """
+    Normalise (prefix, raw id) pairs into CURIEs.
+
+    Each prefix is resolved against bioregistry only once. Normalised CURIEs
+    are kept in a bounded cache (oldest entries are evicted first), and
+    optionally in unbounded per-prefix tables that are prebuilt from the
+    source files. Hits and misses are counted for both.
+
+    Args:
+        cache_size: maximum number of entries in the bounded cache
+
+        plain_prefixes: prefixes that are simply prepended to the id instead
+            of being normalised by bioregistry
+    """
+
+    def __init__(
+        self,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        plain_prefixes: Iterable[str] = PLAIN_PREFIXES,
+    ):
+
+        self.cache_size = cache_size
+        self.plain_prefixes = set(plain_prefixes)
+
+        self.hits = 0
+        self.misses = 0
+
+        self._resolved_prefixes = {}
+        self._tables = {}
+        self._cache = {}
+
+    def normalise(self, prefix: str, _id: str) -> Optional[str]:
+        """
+        Return the normalised CURIE for an id, or None if it cannot be
+        normalised.
+        """
+
+        table = self._tables.get(prefix)
+        if table is not None and _id in table:
+            self.hits += 1
+            return table[_id]
+
+        key = (prefix, _id)
+        if key in self._cache:
+            self.hits += 1
+            return self._cache[key]
+
+        self.misses += 1
+        curie = self._normalise_uncached(prefix, _id)
+
+        if len(self._cache) >= self.cache_size:
+            del self._cache[next(iter(self._cache))]
+        self._cache[key] = curie
+
+        return curie
+
+    def table(self, prefix: str) -> dict:
+        """
+        Return the prebuilt raw id to CURIE table of a prefix (empty if it
+        has not been built).
+        """
+
+        return self._tables.get(prefix, {})
+
+    def prebuild(self, prefix: str, ids: Iterable[str]):
+        """
+        Normalise all ids of a prefix up front and keep them in an unbounded
+        table, so that lookups in the row loop never reach bioregistry.
+        """
+
+        table = self._tables.setdefault(prefix, {})
+
+        for _id in ids:
+            if _id not in table:
+                table[_id] = self._normalise_uncached(prefix, _id)
+
+        logger.info(f"Prebuilt {len(table)} identifiers for `{prefix}`.")
+
+    def prebuild_from_csv(
+        self,
+        prefix: str,
+        path: str,
+        column: int = 0,
+        engine: Optional[str] = None,
+    ):
+        """
+        Prebuild the table of a prefix from one column of a CSV file (header
+        row skipped, quotes removed as in node id processing), read with
+        the given reader engine.
+        """
+
+        with CsvRows(path, engine) as reader:
+
+            next(reader)
+
+            self.prebuild(
+                prefix, (row[column].replace('"', "") for row in reader)
+            )
+
+    def cache_info(self) -> dict:
+        """
+        Cache statistics.
+        """
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cache_size": len(self._cache),
+            "max_cache_size": self.cache_size,
+            "prebuilt": {
+                prefix: len(table) for prefix, table in self._tables.items()
+            },
+        }
+
+    def _resolve_prefix(self, prefix: str) -> Optional[str]:
+        """
+        Resolve a prefix against bioregistry once.
+        """
+
+        if prefix not in self._resolved_prefixes:
+
+            if prefix in self.plain_prefixes:
+                resolved = prefix
+            else:
+                from bioregistry import normalize_prefix
+
+                resolved = normalize_prefix(prefix)
+
+                if not resolved:
+                    logger.warning(f"Prefix `{prefix}` is not in bioregistry.")
+
+            self._resolved_prefixes[prefix] = resolved
+
+        return self._resolved_prefixes[prefix]
+
+    def _normalise_uncached(self, prefix: str, _id: str) -> Optional[str]:
+
+        resolved = self._resolve_prefix(prefix)
+
+        if not resolved:
+            return None
+
+        if prefix in self.plain_prefixes:
+            return prefix + ":" + _id
+
+        from bioregistry import normalize_curie
+
+        return normalize_curie(resolved + ":" + _id)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Parallel per-label parsing in worker processes.
+"""
+
+import multiprocessing
+import traceback
+from collections import deque
+from itertools import islice
+from queue import Empty
+from typing import Iterable, Iterator, Optional
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+# seconds the consumer waits for a chunk before checking that the worker
+# is still alive
+_POLL_INTERVAL = 1.0
+
+
+class _WorkerError:
+    """
+    Traceback of an exception raised in a worker, sent through the queue.
+    """
+
+    def __init__(self, label: str, formatted: str):
+
+        self.label = label
+        self.formatted = formatted
+
+
+class _LabelDone:
+    """
+    End of a label, with the state the worker hands over to the consumer.
+    """
+
+    def __init__(self, state):
+
+        self.state = state
+
+
+def _produce(
+    adapter,
+    method: str,
+    label: str,
+    queue,
+    chunk_size: int,
+    export: Optional[str],
+):
+    """
+    Worker: run one label generator of the adapter and put its output into
+    the queue in lists of at most `chunk_size` items, followed by a
+    `_LabelDone` with the result of `adapter.<export>(label)`. `queue.put`
+    blocks when the queue is full, so a worker never runs more than the
+    queue size ahead of the consumer.
+    """
+
+    try:
+
+        chunk = []
+
+        for item in getattr(adapter, method)(label):
+
+            chunk.append(item)
+
+            if len(chunk) >= chunk_size:
+                queue.put(chunk)
+                chunk = []
+
+        if chunk:
+            queue.put(chunk)
+
+        queue.put(
+            _LabelDone(getattr(adapter, export)(label) if export else None)
+        )
+
+    except Exception:
+
+        queue.put(_WorkerError(label, traceback.format_exc()))
+
+
+def _receive(queue, process, label: str):
+    """
+    Next chunk of a worker's queue, checking while waiting that the worker
+    is still alive: a worker that exits without a `_LabelDone` or
+    `_WorkerError` (e.g. killed by the OOM killer, or in `os._exit`) would
+    otherwise leave the consumer waiting forever.
+    """
+
+    while True:
+
+        try:
+            return queue.get(timeout=_POLL_INTERVAL)
+        except Empty:
+            pass
+
+        if not process.is_alive():
+
+            # whatever the worker put before exiting is still readable
+            try:
+                return queue.get(timeout=_POLL_INTERVAL)
+            except Empty:
+                raise RuntimeError(
+                    f"Worker for label `{label}` exited with code "
+                    f"{process.exitcode} before finishing the label."
+                )
+
+
+def iter_parallel(
+    adapter,
+    method: str,
+    labels: Iterable[str],
+    workers: int,
+    chunk_size: int,
+    queue_size: int,
+    export: Optional[str] = None,
+    merge: Optional[str] = None,
+) -> Iterator:
+    """
+    Run `getattr(adapter, method)(label)` for each label in its own process,
+    at most `workers` at a time, and yield the results label by label in
+    input order (and in file order within each label).
+
+    Every worker streams its output back through a queue of at most
+    `queue_size` chunks, so memory is bounded by roughly
+    `workers * queue_size * chunk_size` items, however slow the consumer is.
+    A worker that fails or dies raises a RuntimeError in the consumer.
+
+    Args:
+        adapter: picklable adapter instance
+
+        method: name of the adapter method yielding the items of a label
+
+        labels: labels to process, in output order
+
+        workers: maximum number of worker processes
+
+        chunk_size: number of items sent through the queue at once
+
+        queue_size: number of chunks a worker may have queued
+
+        export: name of an adapter method called with the label in the
+            worker after the label is done, e.g. to hand over metrics
+
+        merge: name of an adapter method called with the result of
+            `export` in the consuming process
+    """
+
+    context = multiprocessing.get_context()
+    labels = iter(labels)
+    running = deque()
+
+    def start(label):
+        queue = context.Queue(maxsize=queue_size)
+        process = context.Process(
+            target=_produce,
+            args=(adapter, method, label, queue, chunk_size, export),
+            daemon=True,
+        )
+        process.start()
+        running.append((label, queue, process))
+
+    for label in islice(labels, workers):
+        start(label)
+
+    try:
+
+        while running:
+
+            label, queue, process = running[0]
+
+            while True:
+
+                chunk = _receive(queue, process, label)
+
+                if isinstance(chunk, _LabelDone):
+                    if merge:
+                        getattr(adapter, merge)(chunk.state)
+                    break
+
+                if isinstance(chunk, _WorkerError):
+                    raise RuntimeError(
+                        f"Worker for label `{chunk.label}` failed:\n"
+                        f"{chunk.formatted}"
+                    )
+
+                yield from chunk
+
+            process.join()
+            running.popleft()
+
+            for label in islice(labels, 1):
+                start(label)
+
+    finally:
+
+        for _, queue, process in running:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+            queue.close()
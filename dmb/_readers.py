@@ -0,0 +1,445 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+CSV reader engines that yield the same rows as `csv.reader`.
+"""
+
+import codecs
+import csv
+import importlib.util
+import locale
+from itertools import islice
+from typing import Iterator, Optional
+
+from dmb._logger import logger
+from dmb._io import (
+    COMPRESSED_SUFFIXES,
+    is_compressed,
+    open_binary,
+    open_input,
+    resolve_input,
+)
+
+logger.debug(f"Loading module {__name__}.")
+
+# rows (or bytes, for pyarrow) parsed at once by the block engines
+BLOCK_ROWS = 1 << 16
+BLOCK_BYTES = 1 << 22
+
+READER_ENGINES = ("stdlib", "pyarrow", "polars", "pandas")
+
+# compressed files each engine reads
+_COMPRESSIONS = {
+    "stdlib": COMPRESSED_SUFFIXES,
+    "pyarrow": (".gz", ".bz2", ".zst"),
+    "polars": (),
+    "pandas": COMPRESSED_SUFFIXES,
+}
+
+# engines that decode UTF-8 rather than the locale encoding
+_UTF8_ENGINES = ("pyarrow", "polars")
+
+# engines that pad rows with too few fields instead of failing
+_PADDING_ENGINES = ("polars", "pandas")
+
+# bytes read at once when checking a file for the block engines
+SCAN_BLOCK_BYTES = 1 << 22
+
+
+def _installed(engine: str) -> bool:
+
+    return engine == "stdlib" or importlib.util.find_spec(engine) is not None
+
+
+def resolve_engine(engine: Optional[str] = None) -> str:
+    """
+    Return the reader engine to use: `engine` itself (which has to be
+    installed), or `stdlib` if None. `csv.reader` turns out as fast as
+    the block engines on DepMap files once their rows are converted back
+    to Python tuples, so these are only used if asked for.
+    """
+
+    if engine is None:
+        return "stdlib"
+
+    if engine not in READER_ENGINES:
+        raise ValueError(
+            f"Unknown reader engine `{engine}`; use one of "
+            f"{', '.join(READER_ENGINES)}."
+        )
+
+    if not _installed(engine):
+        raise ImportError(f"Reader engine `{engine}` is not installed.")
+
+    return engine
+
+
+def _utf8_locale() -> bool:
+
+    return codecs.lookup(locale.getpreferredencoding(False)).name == "utf-8"
+
+
+class _FieldCounter:
+    """
+    Counts the fields of the records of a file fed to it in blocks of
+    bytes, with NumPy, as `csv.reader` splits them, for files where quotes
+    only open at the start of a field and close at its end (a doubled
+    quote in a quoted field is a quote closing it and one opening it again)
+    and no carriage return is in quotes. `feed` and `finish` return False
+    if the file breaks these rules or has a record without `width` fields.
+    """
+
+    def __init__(self, np, width: int):
+
+        self.np = np
+        self.width = width
+        # state after the last block: whether it ended in quotes, its last
+        # byte, whether that closed quotes, the separators of the record
+        # it ended in, and whether that record has any bytes yet
+        self.quoted = False
+        self.last = ord("\n")
+        self.closed = False
+        self.commas = 0
+        self.empty = True
+
+    def feed(self, block: bytes) -> bool:
+
+        np = self.np
+        data = np.frombuffer(block, dtype=np.uint8)
+        quotes = np.flatnonzero(data == ord('"'))
+
+        if self.closed and data[0] not in _FIELD_ENDS:
+            return False
+
+        if quotes.size or self.quoted:
+
+            # a quote opens a field if an even number of quotes precede it
+            opening = quotes[(np.arange(quotes.size) + self.quoted) % 2 == 0]
+            closing = quotes[(np.arange(quotes.size) + self.quoted) % 2 == 1]
+
+            before = data[opening[opening > 0] - 1]
+
+            if opening.size and opening[0] == 0:
+                before = np.append(before, self.last)
+
+            if not np.isin(before, _FIELD_STARTS).all():
+                return False
+
+            after = data[closing[closing < data.size - 1] + 1]
+
+            if not np.isin(after, _FIELD_ENDS).all():
+                return False
+
+            # bytes outside quoted fields follow an even number of quotes
+            quote = np.zeros(data.size, dtype=np.int8)
+            quote[quotes] = 1
+            outside = (np.cumsum(quote) - quote + self.quoted) % 2 == 0
+
+            if (data[~outside] == ord("\r")).any():
+                return False
+
+            commas = np.cumsum((data == ord(",")) & outside)
+            ends = np.flatnonzero((data == ord("\n")) & outside)
+
+            self.quoted = bool((quotes.size + self.quoted) % 2)
+            self.closed = bool(closing.size and closing[-1] == data.size - 1)
+
+        else:
+            commas = np.cumsum(data == ord(","))
+            ends = np.flatnonzero(data == ord("\n"))
+            self.closed = False
+
+        if ends.size:
+
+            fields = np.diff(commas[ends], prepend=0) + 1
+            fields[0] += self.commas
+
+            if (fields != self.width).any():
+                return False
+
+            self.commas = int(commas[-1] - commas[ends[-1]])
+            self.empty = bool(ends[-1] == data.size - 1)
+
+        else:
+            self.commas += int(commas[-1])
+            self.empty = False
+
+        self.last = data[-1]
+
+        return True
+
+    def finish(self) -> bool:
+
+        if self.quoted:
+            return False
+
+        return self.empty or self.commas == self.width - 1
+
+
+# bytes a quote that opens a quoted field may follow, and that may follow a
+# quote that closes one
+_FIELD_STARTS = tuple(map(ord, ',\n"'))
+_FIELD_ENDS = tuple(map(ord, ',\n\r"'))
+
+
+def _is_regular(path: str, width: int, count_fields: bool) -> bool:
+    """
+    Whether the block engines read a file exactly as `csv.reader`: it has
+    no blank lines (which they drop or turn into rows of empty fields), no
+    byte order mark (which they remove) and no carriage returns other than
+    in line breaks. pyarrow keeps carriage returns in quoted fields, so for
+    it a file with quotes has none at all. With `count_fields`, for the
+    engines that pad rows with too few fields, also every record has
+    `width` fields, counted with `_FieldCounter` (files are not regular
+    without NumPy). One pass over the bytes of the file, far faster than
+    parsing it.
+    """
+
+    if count_fields:
+        try:
+            import numpy as np
+        except ImportError:
+            return False
+
+        counter = _FieldCounter(np, width)
+
+    with open_binary(path) as f:
+
+        # line break before the file, so that a blank first line counts
+        previous = b"\n"
+        quotes = returns = False
+        start = True
+
+        while True:
+
+            block = f.read(SCAN_BLOCK_BYTES)
+
+            if not block:
+                break
+
+            if start and block.startswith(codecs.BOM_UTF8):
+                return False
+
+            window = previous[-2:] + block
+
+            if b"\n\n" in window or b"\n\r\n" in window:
+                return False
+
+            quotes = quotes or b'"' in block
+            returns = returns or b"\r" in block
+
+            if returns:
+
+                # a carriage return at the end of the block is checked with
+                # the next one
+                window = window[1:]
+                lone = window.count(b"\r") - window.count(b"\r\n")
+
+                if lone > window.endswith(b"\r"):
+                    return False
+
+                if quotes and not count_fields:
+                    return False
+
+            if count_fields and not counter.feed(block):
+                return False
+
+            previous = block
+            start = False
+
+    if previous.endswith(b"\r"):
+        return False
+
+    return not count_fields or counter.finish()
+
+
+class CsvRows:
+    """
+    Rows of a CSV file (header first) as sequences of strings, with the
+    semantics of `csv.reader` with the default dialect: fields in double
+    quotes may contain delimiters, doubled quotes and line breaks, empty
+    fields are empty strings and no value is converted. Use as a context
+    manager to close the file.
+
+    Engines:
+        stdlib: `csv.reader` over the (decompressed) text stream
+
+        pyarrow: `pyarrow.csv` streaming reader, which parses blocks of
+            `BLOCK_BYTES` in parallel threads
+
+        polars: `polars.scan_csv` collected in batches of `BLOCK_ROWS`
+            rows (uncompressed files only; compressed files are read with
+            `stdlib`)
+
+        pandas: `pandas.read_csv` in chunks of `BLOCK_ROWS` rows
+
+    The block engines differ from `csv.reader` on some input: blank lines,
+    carriage returns and byte order marks (all engines), rows with too few
+    fields (padded by polars and pandas), other encodings than UTF-8
+    (pyarrow and polars) and compressed files (pyarrow reads only `.gz`,
+    `.bz2` and `.zst`, polars none). Before one is used, the whole file is
+    checked for all of these, and read with `stdlib` if it has any (see
+    `engine`). pyarrow fails on rows with too few or too many fields, and
+    then reads on with `stdlib` from the failing block. With `rows`, only
+    a prefix of the file is read, always with `stdlib` and unchecked.
+
+    Args:
+        path: path to the (uncompressed) input file; compressed variants
+            are found as by `open_input`
+
+        engine: reader engine, see `resolve_engine`
+
+        rows: number of rows to read after the header (all if None)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        engine: Optional[str] = None,
+        rows: Optional[int] = None,
+    ):
+
+        self.path = resolve_input(path)
+        self.engine = resolve_engine(engine)
+        self._file = None
+        # rows read with `stdlib`, header included
+        self._limit = None if rows is None else rows + 1
+
+        if self.engine != "stdlib" and (
+            rows is not None or not self._reads_as_stdlib()
+        ):
+            logger.debug(
+                f"Reading `{self.path}` with `stdlib` rather than "
+                f"`{self.engine}`."
+            )
+            self.engine = "stdlib"
+
+        self._rows = getattr(self, f"_{self.engine}_rows")()
+
+    def _reads_as_stdlib(self) -> bool:
+        """
+        Whether the engine reads the file with the same rows as `stdlib`.
+        """
+
+        if is_compressed(self.path) and not self.path.endswith(
+            _COMPRESSIONS[self.engine]
+        ):
+            return False
+
+        if self.engine in _UTF8_ENGINES and not _utf8_locale():
+            return False
+
+        with open_input(self.path) as f:
+            self._width = len(next(csv.reader(f), []))
+
+        return self._width > 0 and _is_regular(
+            self.path, self._width, self.engine in _PADDING_ENGINES
+        )
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc):
+
+        self.close()
+
+    def __iter__(self):
+
+        return self
+
+    def __next__(self):
+
+        return next(self._rows)
+
+    def close(self):
+
+        self._rows.close()
+
+        if self._file is not None:
+            self._file.close()
+
+    def _stdlib_rows(self) -> Iterator:
+
+        self._file = open_input(self.path)
+
+        yield from islice(csv.reader(self._file), self._limit)
+
+    def _pyarrow_rows(self) -> Iterator:
+
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+
+        names = [f"f{i}" for i in range(self._width)]
+        self._file = pa.input_stream(self.path, compression="detect")
+        rows = 0
+
+        try:
+
+            reader = pa_csv.open_csv(
+                self._file,
+                read_options=pa_csv.ReadOptions(
+                    column_names=names, block_size=BLOCK_BYTES
+                ),
+                parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={name: pa.string() for name in names},
+                    null_values=[],
+                    strings_can_be_null=False,
+                    quoted_strings_can_be_null=False,
+                ),
+            )
+
+            for batch in reader:
+                yield from zip(
+                    *(column.to_pylist() for column in batch.columns)
+                )
+                rows += batch.num_rows
+
+        except pa.ArrowInvalid as error:
+
+            # e.g. a row with another number of fields
+            logger.debug(
+                f"Reading `{self.path}` with `stdlib` from row {rows} on: "
+                f"{error}"
+            )
+            self._file.close()
+            self.engine = "stdlib"
+
+            yield from islice(self._stdlib_rows(), rows, None)
+
+    def _polars_rows(self) -> Iterator:
+
+        import polars as pl
+
+        frame = pl.scan_csv(
+            self.path,
+            has_header=False,
+            infer_schema=False,
+            quote_char='"',
+            empty_string_is_null=False,
+        )
+
+        for batch in frame.collect_batches(chunk_size=BLOCK_ROWS):
+            yield from batch.iter_rows()
+
+    def _pandas_rows(self) -> Iterator:
+
+        import pandas as pd
+
+        self._file = open_input(self.path)
+
+        for chunk in pd.read_csv(
+            self._file,
+            header=None,
+            dtype=str,
+            na_filter=False,
+            keep_default_na=False,
+            quotechar='"',
+            doublequote=True,
+            chunksize=BLOCK_ROWS,
+        ):
+            yield from zip(*(chunk[column].tolist() for column in chunk))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Interned node ids with dense integer handles.
+"""
+
+from array import array
+from typing import Callable, Iterable, Optional, Sequence
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+# handle of a missing (None) id
+NO_HANDLE = -1
+
+# typecode of handle arrays (32 bit: up to 2^31 distinct ids)
+HANDLE_TYPECODE = "i"
+
+
+class IdRegistry:
+    """
+    Registry that stores every node CURIE once and assigns it a dense
+    integer handle (0, 1, 2, ... in order of first appearance). Handles
+    can be kept in compact arrays instead of lists of strings, and turned
+    back into CURIEs when writing.
+    """
+
+    def __init__(self):
+
+        self._handles = {None: NO_HANDLE}
+        self._curies = []
+
+    def __len__(self):
+
+        return len(self._curies)
+
+    def __contains__(self, curie):
+
+        return curie is not None and curie in self._handles
+
+    def handle(self, curie: Optional[str]) -> int:
+        """
+        Return the handle of a CURIE, registering it if it is new.
+        """
+
+        handle = self._handles.get(curie)
+
+        if handle is None:
+            handle = self._handles[curie] = len(self._curies)
+            self._curies.append(curie)
+
+        return handle
+
+    def get(self, curie: Optional[str]) -> int:
+        """
+        Return the handle of a CURIE without registering it (`NO_HANDLE`
+        if it is unknown).
+        """
+
+        return self._handles.get(curie, NO_HANDLE)
+
+    def handles(self, curies: Iterable[Optional[str]]) -> array:
+        """
+        Return the handles of a column of CURIEs as an array, registering
+        new ones.
+        """
+
+        curies = list(curies)
+
+        for curie in dict.fromkeys(curies):
+            if curie not in self._handles:
+                self.handle(curie)
+
+        return array(HANDLE_TYPECODE, map(self._handles.__getitem__, curies))
+
+    def intern_column(
+        self, function: Callable, values: Sequence[str], memo: dict
+    ) -> array:
+        """
+        Return the handles of a column of raw ids, calling the id
+        processing `function` and registering its CURIE only for ids not
+        in `memo` (raw id -> handle), so that each CURIE is built once
+        however many columns an id occurs in.
+        """
+
+        for value in set(values).difference(memo):
+            memo[value] = self.handle(function(value))
+
+        return array(HANDLE_TYPECODE, map(memo.__getitem__, values))
+
+    def curie(self, handle: int) -> Optional[str]:
+        """
+        Return the CURIE of a handle.
+        """
+
+        return self._curies[handle] if handle != NO_HANDLE else None
+
+    def curies(self, handles: Iterable[int]) -> list:
+        """
+        Return the CURIEs of a column of handles.
+        """
+
+        curies = self._curies
+
+        return [
+            curies[handle] if handle != NO_HANDLE else None
+            for handle in handles
+        ]
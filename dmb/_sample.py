@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Seeded samples of node ids, and the edge rows between sampled nodes.
+"""
+
+import random
+from typing import Callable, Iterable, Optional
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+
+def check_sample_size(
+    fraction: Optional[float] = None, count: Optional[int] = None
+):
+    """
+    Check that at most one of a sample fraction (in (0, 1]) and a sample
+    count (at least 1) is given.
+    """
+
+    if fraction is not None and count is not None:
+        raise ValueError("Give either a sample fraction or a sample count.")
+
+    if fraction is not None and not 0 < fraction <= 1:
+        raise ValueError("The sample fraction has to be in (0, 1].")
+
+    if count is not None and count < 1:
+        raise ValueError("The sample count has to be at least 1.")
+
+
+def draw_sample(
+    ids: Iterable[str],
+    seed: str,
+    fraction: Optional[float] = None,
+    count: Optional[int] = None,
+) -> frozenset:
+    """
+    Random sample of the distinct ids, of `fraction` of them (rounded) or
+    `count` (all if there are fewer). The same ids in the same order and
+    the same seed give the same sample.
+
+    Args:
+        ids: ids to sample from
+
+        seed: seed of the random generator, e.g. the seed of the adapter
+            and the node type, so that node types are sampled independently
+
+        fraction: share of the ids in the sample
+
+        count: number of ids in the sample
+    """
+
+    ids = list(dict.fromkeys(ids))
+    size = count if count is not None else round(fraction * len(ids))
+
+    return frozenset(random.Random(seed).sample(ids, min(size, len(ids))))
+
+
+def compile_sample_filter(
+    sources: Optional[frozenset], targets: Optional[frozenset]
+) -> Optional[Callable]:
+    """
+    Test of edge rows (source id first, target id second) whose sampled
+    endpoints are in the sample; None if neither endpoint is sampled.
+
+    Args:
+        sources: sampled source ids (None if sources are not sampled)
+
+        targets: sampled target ids (None if targets are not sampled)
+    """
+
+    if sources is not None and targets is not None:
+        return lambda row: row[0] in sources and row[1] in targets
+
+    if sources is not None:
+        return lambda row: row[0] in sources
+
+    if targets is not None:
+        return lambda row: row[1] in targets
+
+    return None
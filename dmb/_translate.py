@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Translation of ids through one-to-many id tables.
+"""
+
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from dmb._logger import logger
+
+logger.debug(f"Loading module {__name__}.")
+
+# what to do with ids that translate to more than one id
+MULTI_MAPPING_POLICIES = ("first", "all", "drop")
+
+
+class IdTable:
+    """
+    Table of ids to one or more ids, e.g. gene symbols to Ensembl gene ids.
+    Each id maps to a tuple of its distinct targets in the order they were
+    added, so that no mapping is lost when an id occurs more than once.
+
+    Args:
+        mapping: dict of id to tuple of target ids
+    """
+
+    def __init__(self, mapping: Optional[dict] = None):
+
+        self.mapping = mapping if mapping is not None else {}
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[str, str]]) -> "IdTable":
+        """
+        Build a table from (id, target id) pairs; empty targets are left
+        out.
+        """
+
+        mapping = {}
+
+        for _id, target in pairs:
+
+            if not target:
+                continue
+
+            targets = mapping.get(_id)
+
+            if targets is None:
+                mapping[_id] = (target,)
+            elif target not in targets:
+                mapping[_id] = targets + (target,)
+
+        return cls(mapping)
+
+    def __len__(self):
+
+        return len(self.mapping)
+
+    def ambiguous(self) -> int:
+        """
+        Number of ids with more than one target.
+        """
+
+        return sum(len(targets) > 1 for targets in self.mapping.values())
+
+    def resolve(
+        self, policy: str = "first", convert: Optional[Callable] = None
+    ) -> dict:
+        """
+        Compile the table into a dict for lookups: each id maps to its
+        (converted) target, or for ids with several targets, to the first
+        one (`first`), a tuple of all (`all`), or not at all (`drop`).
+        Targets that `convert` turns into None are left out.
+
+        Args:
+            policy: one of `MULTI_MAPPING_POLICIES`
+
+            convert: function applied once to every target, e.g. to
+                normalise it into a CURIE
+        """
+
+        if policy not in MULTI_MAPPING_POLICIES:
+            raise ValueError(
+                f"Unknown multi-mapping policy `{policy}`; use one of "
+                f"{', '.join(MULTI_MAPPING_POLICIES)}."
+            )
+
+        converted = {}
+        resolved = {}
+
+        for _id, targets in self.mapping.items():
+
+            if convert:
+                for target in targets:
+                    if target not in converted:
+                        converted[target] = convert(target)
+                targets = tuple(
+                    dict.fromkeys(filter(None, map(converted.get, targets)))
+                )
+
+            if len(targets) == 1 or (targets and policy == "first"):
+                resolved[_id] = targets[0]
+            elif targets and policy == "all":
+                resolved[_id] = targets
+
+        return resolved
+
+
+def translate_column(resolved: dict, values: Sequence[str]) -> List:
+    """
+    Translate a column of ids with a table compiled by `IdTable.resolve`
+    (None for ids without translation).
+    """
+
+    return list(map(resolved.get, values))
+
+
+def expand_column(values: Sequence) -> Tuple[List, Optional[List[int]]]:
+    """
+    Flatten a translated column in which some values are tuples (ids with
+    several targets under the `all` policy).
+
+    Returns:
+        the flat column, and the position in `values` of each of its
+        entries (None if nothing was expanded)
+    """
+
+    if not any(type(value) is tuple for value in values):
+        return values, None
+
+    flat = []
+    positions = []
+
+    for i, value in enumerate(values):
+
+        if type(value) is tuple:
+            flat.extend(value)
+            positions.extend([i] * len(value))
+        else:
+            flat.append(value)
+            positions.append(i)
+
+    return flat, positions
@@ -5,13 +5,59 @@
 BioCypher - Dependency Map adapter prototype
 """
 
-import csv
+import os
+import json
+import time
 from enum import Enum
 from typing import Optional
-from bioregistry import normalize_curie
-from itertools import chain, islice
-
-from biocypher._logger import logger
+from operator import itemgetter
+from collections import Counter
+from itertools import chain, islice, groupby
+
+from dmb._logger import logger
+from dmb._cache import ParsedCache
+from dmb._chunks import iter_chunked
+from dmb._dedup import (
+    DUPLICATE_POLICIES,
+    Deduplicator,
+    merge_properties,
+)
+from dmb._columnar import EdgeBatch, map_column, float_column
+from dmb._manifest import (
+    same_content,
+    load_manifest,
+    save_manifest,
+    file_fingerprint,
+)
+from dmb._io import is_compressed, resolve_input
+from dmb._readers import CsvRows, resolve_engine
+from dmb._filters import (
+    FILTER_OPERATORS,
+    describe_filter,
+    TopKSelection,
+    add_filter_counts,
+    compile_row_filter,
+)
+from dmb._registry import NO_HANDLE, IdRegistry
+from dmb._coerce import (
+    compile_parser,
+    read_property_types,
+    coerce_float_column,
+)
+from dmb._sample import (
+    draw_sample,
+    check_sample_size,
+    compile_sample_filter,
+)
+from dmb._translate import (
+    MULTI_MAPPING_POLICIES,
+    IdTable,
+    expand_column,
+    translate_column,
+)
+from dmb._metrics import PROGRESS_CHECK_ROWS, AdapterMetrics
+from dmb._normalise import DEFAULT_CACHE_SIZE, CurieNormaliser
+from dmb._parallel import iter_parallel
 
 logger.debug(f"Loading module {__name__}.")
 
@@ -286,6 +332,124 @@ class DepMapCompoundToGeneEdgeField(Enum):
     LITERATURE = "targetAnnotSource"
 
 
+NODE_FILES = {
+    DepMapNodeType.GENE.value: "data/v0.5/genes/gene_all.csv",
+    DepMapNodeType.COMPOUND.value: "data/v0.5/compounds/compounds_all.csv",
+    DepMapNodeType.CELL_LINE.value: "data/v0.5/cellModels/cellModels_all.csv",
+    DepMapNodeType.SEQUENCE_VARIANT.value: "data/v0.5/cellModels/CFE_all.csv",
+}
+
+EDGE_FILES = {
+    DepMapEdgeType.GENE_TO_GENE.value: "data/v0.5/genes/gene_int_all.csv",
+    DepMapEdgeType.GENE_TO_CELL_LINE.value: "data/v0.5/cellModels/CRISPRKO_all.csv",
+    DepMapEdgeType.SEQUENCE_VARIANT_TO_GENE.value: "data/v0.5/cellModels/CFEinv_all.csv",
+    DepMapEdgeType.SEQUENCE_VARIANT_TO_CELL_LINE.value: "data/v0.5/cellModels/CFEobs_all.csv",
+    DepMapEdgeType.CELL_LINE_TO_COMPOUND.value: "data/v0.5/compounds/response_all.csv",
+    DepMapEdgeType.COMPOUND_TO_COMPOUND.value: "data/v0.5/compounds/compound_Tsim_ALL.csv",
+    DepMapEdgeType.COMPOUND_TO_GENE.value: "data/v0.5/compounds/compoundTarget_lit.csv",
+}
+
+NODE_ID_PREFIXES = {
+    DepMapNodeType.GENE.value: "hgnc.symbol",
+    DepMapNodeType.CELL_LINE.value: "cosmic.cell",
+    DepMapNodeType.COMPOUND.value: "compoundname",
+    DepMapNodeType.SEQUENCE_VARIANT.value: "variant",
+}
+
+# node types of the sources and targets of each edge type
+EDGE_NODE_TYPES = {
+    DepMapEdgeType.GENE_TO_GENE.value: (
+        DepMapNodeType.GENE.value,
+        DepMapNodeType.GENE.value,
+    ),
+    DepMapEdgeType.GENE_TO_CELL_LINE.value: (
+        DepMapNodeType.GENE.value,
+        DepMapNodeType.CELL_LINE.value,
+    ),
+    DepMapEdgeType.SEQUENCE_VARIANT_TO_GENE.value: (
+        DepMapNodeType.SEQUENCE_VARIANT.value,
+        DepMapNodeType.GENE.value,
+    ),
+    DepMapEdgeType.SEQUENCE_VARIANT_TO_CELL_LINE.value: (
+        DepMapNodeType.SEQUENCE_VARIANT.value,
+        DepMapNodeType.CELL_LINE.value,
+    ),
+    DepMapEdgeType.CELL_LINE_TO_COMPOUND.value: (
+        DepMapNodeType.CELL_LINE.value,
+        DepMapNodeType.COMPOUND.value,
+    ),
+    DepMapEdgeType.COMPOUND_TO_COMPOUND.value: (
+        DepMapNodeType.COMPOUND.value,
+        DepMapNodeType.COMPOUND.value,
+    ),
+    DepMapEdgeType.COMPOUND_TO_GENE.value: (
+        DepMapNodeType.COMPOUND.value,
+        DepMapNodeType.GENE.value,
+    ),
+}
+
+# id prefixes of the sources and targets of each edge type, those of their
+# node types
+EDGE_SOURCE_ID_PREFIXES = {
+    label: NODE_ID_PREFIXES[source]
+    for label, (source, _) in EDGE_NODE_TYPES.items()
+}
+
+EDGE_TARGET_ID_PREFIXES = {
+    label: NODE_ID_PREFIXES[target]
+    for label, (_, target) in EDGE_NODE_TYPES.items()
+}
+
+NODE_FIELD_ENUMS = {
+    DepMapNodeType.GENE.value: DepMapGeneNodeField,
+    DepMapNodeType.CELL_LINE.value: DepMapCellLineNodeField,
+    DepMapNodeType.COMPOUND.value: DepMapCompoundNodeField,
+    DepMapNodeType.SEQUENCE_VARIANT.value: DepMapSequenceVariantNodeField,
+}
+
+EDGE_FIELD_ENUMS = {
+    DepMapEdgeType.GENE_TO_GENE.value: DepMapGeneToGeneEdgeField,
+    DepMapEdgeType.GENE_TO_CELL_LINE.value: DepMapGeneToCellLineEdgeField,
+    DepMapEdgeType.SEQUENCE_VARIANT_TO_GENE.value: DepMapSequenceVariantToGeneEdgeField,
+    DepMapEdgeType.SEQUENCE_VARIANT_TO_CELL_LINE.value: DepMapSequenceVariantToCellLineEdgeField,
+    DepMapEdgeType.CELL_LINE_TO_COMPOUND.value: DepMapCellLineToCompoundEdgeField,
+    DepMapEdgeType.COMPOUND_TO_COMPOUND.value: DepMapCompoundToCompoundEdgeField,
+    DepMapEdgeType.COMPOUND_TO_GENE.value: DepMapCompoundToGeneEdgeField,
+}
+# rows read of each input file in test mode
+TEST_MODE_ROWS = 100
+
+# schema config with the property types used by `coerce_types`
+SCHEMA_CONFIG = "config/schema_config.yaml"
+
+# name of the gene symbol -> ENSG table in the parsed cache
+ENSG_TABLE_NAME = "symbol_to_ensg"
+
+# node types that are sampled in sample mode (all nodes of the others are
+# kept)
+SAMPLED_NODE_TYPES = (
+    DepMapNodeType.GENE.value,
+    DepMapNodeType.CELL_LINE.value,
+    DepMapNodeType.COMPOUND.value,
+)
+
+# node type whose ids carry a prefix
+PREFIX_NODE_TYPES = {
+    prefix: _type for _type, prefix in NODE_ID_PREFIXES.items()
+}
+
+# how duplicates are reported per duplicate policy
+_DUPLICATE_OUTCOMES = {"drop": "dropped", "merge": "merged", "keep": "kept"}
+
+# edge properties that are converted to floats in column batches
+NUMERIC_EDGE_FIELDS = {
+    DepMapGeneToCellLineEdgeField.DEPENDENCY_SCORE_BINARY.value,
+    DepMapGeneToCellLineEdgeField.DEPENDENCY_SCORE_NORMALISED.value,
+    DepMapCellLineToCompoundEdgeField.IC_50.value,
+    DepMapCompoundToCompoundEdgeField.TANIMOTO_SIMILARITY_SCORE.value,
+}
+
+
 class DepMapAdapter:
     def __init__(
         self,
@@ -295,291 +459,2167 @@ class DepMapAdapter:
         edge_types: Optional[list] = None,
         edge_fields: Optional[list] = None,
         test_mode: bool = False,
+        id_cache_size: int = DEFAULT_CACHE_SIZE,
+        prebuild_id_tables: bool = False,
+        workers: int = 1,
+        worker_chunk_size: int = int(1e4),
+        worker_queue_size: int = 4,
+        file_chunk_size: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        metrics: bool = False,
+        progress_interval: Optional[float] = None,
+        check_references: bool = False,
+        deduplicate: Optional[str] = None,
+        duplicate_policy: Optional[dict] = None,
+        bloom_capacity: int = int(1e7),
+        bloom_error_rate: float = 1e-4,
+        reader_engine: Optional[str] = None,
+        ensg_edge_types: Optional[list] = None,
+        ensg_policy: str = "first",
+        edge_filters: Optional[list] = None,
+        similarity_cutoff: Optional[float] = None,
+        similarity_top_k: Optional[int] = None,
+        symmetric_similarity: bool = False,
+        sample_fraction: Optional[float] = None,
+        sample_count: Optional[int] = None,
+        sample_seed: int = 0,
+        coerce_types: bool = False,
+        schema_config: str = SCHEMA_CONFIG,
     ):
 
         self.id_batch_size = id_batch_size
 
+        # CSV reader engine (see `dmb._readers`): `stdlib` unless given;
+        # chunks of split files are always read with `csv`
+        self.reader_engine = resolve_engine(reader_engine)
+
+        self.normaliser = CurieNormaliser(cache_size=id_cache_size)
+
+        # gene symbol -> ENSG table, read on first use (see `symbol_to_ensg`)
+        self._ensg_table = None
+        self._symbol_to_ensg = None
+
         self._set_up_types_and_fields(
             node_types, node_fields, edge_types, edge_fields
         )
 
+        # edge types whose source gene symbols are translated to ENSG ids
+        # (with the ENSG pseudo field selected), and what to do with
+        # symbols of several ENSG ids
+        self.ensg_policy = ensg_policy
+        self.ensg_edge_types = self._set_up_ensg_translation(
+            ensg_edge_types, ensg_policy
+        )
+
+        # sparsification of the compound similarity edges: a cutoff on the
+        # Tanimoto similarity (a filter like any other), and of the pairs
+        # that pass it, the top k most similar compounds of each compound
+        if similarity_cutoff is not None:
+            edge_filters = list(edge_filters or []) + [
+                (
+                    DepMapCompoundToCompoundEdgeField.TANIMOTO_SIMILARITY_SCORE,
+                    ">=",
+                    float(similarity_cutoff),
+                )
+            ]
+
+        if similarity_top_k is not None and similarity_top_k < 1:
+            raise ValueError("`similarity_top_k` has to be at least 1.")
+
+        self.similarity_top_k = similarity_top_k
+        self.symmetric_similarity = symmetric_similarity
+
+        # filters on the raw columns of edge files, applied to the rows
+        # before any processing; rows tested and passed per filter
+        self.edge_filters = self._set_up_edge_filters(edge_filters)
+        self.filter_report = {}
+
         self.test_mode = test_mode
 
+        # conversion of properties to the types of the schema config (per
+        # input label, the properties that are not strings), with the
+        # values that could not be converted counted per label and column
+        self.property_types = (
+            read_property_types(schema_config) if coerce_types else None
+        )
+        self.coercion_failures = {}
+
+        # sample mode: a seeded sample of the genes, cell lines and
+        # compounds (a fraction or a number of each), and only the edges
+        # between sampled nodes, for small graphs without dangling edges
+        check_sample_size(sample_fraction, sample_count)
+        self.sample_fraction = sample_fraction
+        self.sample_count = sample_count
+        self.sample_seed = sample_seed
+        self.sample = None
+
+        if sample_fraction is not None or sample_count is not None:
+            self._draw_sample()
+
+        # parallel parsing of labels in worker processes (opt-in)
+        self.workers = workers
+        self.worker_chunk_size = worker_chunk_size
+        self.worker_queue_size = worker_queue_size
+
+        # edge files larger than this (in bytes) are split into chunks that
+        # are parsed in parallel (only with workers > 1)
+        self.file_chunk_size = file_chunk_size
+
+        # binary cache of the parsed output of each label
+        self.cache = ParsedCache(cache_dir) if cache_dir else None
+
+        # per-label counters and timings (opt-in, see `get_metrics`)
+        self.metrics = AdapterMetrics(progress_interval) if metrics else None
+
+        # drop edges whose endpoints are not among the nodes of the input
+        self.check_references = check_references
+        self.reference_report = {}
+        self._node_index = None
+
+        # drop (or merge) rows whose normalised ids were seen before in the
+        # same label: `exact` (set of interned ids) or `bloom` (fixed memory)
+        self.deduplicator = (
+            Deduplicator(
+                deduplicate,
+                capacity=bloom_capacity,
+                error_rate=bloom_error_rate,
+            )
+            if deduplicate
+            else None
+        )
+        self.duplicate_policy = self._set_up_duplicate_policy(duplicate_policy)
+        self.duplicate_report = {}
+
         self.data_source = "DepMap"
         self.data_version = "v0.5"
         self.data_licence = "None"
 
+        if prebuild_id_tables:
+            self._prebuild_id_tables()
+
     def get_nodes(self):
         """
         Get nodes from CSV and yield them to the batch writer.
 
-        Args:
-            label: input label of nodes to be read
+        With `workers` > 1, labels are parsed in parallel worker processes;
+        nodes are still yielded label by label in the order of `node_types`.
+
+        With `deduplicate`, nodes whose id was already yielded for the same
+        node type are handled according to `duplicate_policy` and counted
+        in `duplicate_report`.
+        Memory is bounded by the keys of one node type (a fixed size with
+        `bloom`), except with the `merge` policy, which holds all nodes of
+        the type until it is done.
 
         Returns:
             generator of tuples representing nodes
         """
 
-        loc_dict = {
-            DepMapNodeType.GENE.value: "data/v0.5/genes/gene_all.csv",
-            DepMapNodeType.COMPOUND.value: "data/v0.5/compounds/compounds_all.csv",
-            DepMapNodeType.CELL_LINE.value: "data/v0.5/cellModels/cellModels_all.csv",
-            DepMapNodeType.SEQUENCE_VARIANT.value: "data/v0.5/cellModels/CFE_all.csv",
-        }
+        self._reset_coercion_failures(self.node_types)
+        nodes = self._iter_labels("_get_label_nodes", self.node_types)
 
-        for label in self.node_types:
-            # read csv for each label
+        if self.deduplicator:
+            nodes = self._deduplicate(nodes, "nodes")
 
-            with (open(loc_dict[label], "r")) as f:
+        try:
+            yield from nodes
+        finally:
+            self._report_coercion(self.node_types)
 
-                reader = csv.reader(f)
-                prop_items = next(reader)
+    def get_edges(self):
+        """
+        Get edges from CSV and yield them to the batch writer.
+
+        With `workers` > 1, labels are parsed in parallel worker processes;
+        edges are still yielded label by label in the order of `edge_types`.
+        If `file_chunk_size` is also set, files larger than it are split into
+        chunks of that many bytes, which are parsed in parallel and yielded
+        in file order.
+
+        With `check_references`, edges whose source or target id is not
+        the id of a node in the node files are dropped, and counted per
+        edge label in `reference_report`.
+
+        With `deduplicate`, edges whose source and target were already
+        yielded for the same edge type are handled according to
+        `duplicate_policy` and counted in `duplicate_report`.
+        Memory is bounded by the keys of one edge type (a fixed size with
+        `bloom`), except with the `merge` policy, which holds all edges of
+        the type until it is done.
+
+        Returns:
+            generator of tuples representing edges
+        """
+
+        self.filter_report = {}
+        self._reset_coercion_failures(self.edge_types)
+
+        yield from self._get_edges(self.edge_types)
+
+    def _get_edges(self, edge_types):
+        """
+        Yield the edges of the given edge types, with the reference check
+        and deduplication applied.
+        """
+
+        edges = self._read_edges(edge_types)
 
-                if self.test_mode:
-                    reader = islice(reader, 0, 100)
+        if self.check_references:
+            edges = self._filter_dangling_edges(edges)
 
-                for row in reader:
-                    _id = _process_node_id(row[0], label)
-                    _label = label
-                    _props = self._process_properties(
-                        dict(zip(prop_items[1:], row[1:]))
+        if self.deduplicator:
+            edges = self._deduplicate(edges, "edges")
+
+        try:
+            yield from edges
+        finally:
+            self._report_filters(edge_types)
+            self._report_coercion(edge_types)
+
+    def _read_edges(self, edge_types):
+        """
+        Yield the edges of the given edge types, sequentially or in
+        parallel.
+        """
+
+        if self.workers > 1 and self.ensg_edge_types:
+            # read once here rather than in every worker process
+            self._translate_symbol_to_ensg()
+
+        if self.workers > 1 and self.file_chunk_size and not self.test_mode:
+
+            for large, labels in groupby(
+                edge_types, key=self._is_large_edge_file
+            ):
+
+                if large:
+
+                    for label in labels:
+                        yield from self._cached(
+                            "edges",
+                            label,
+                            lambda: iter_chunked(
+                                self,
+                                "_process_edge_rows",
+                                label,
+                                resolve_input(EDGE_FILES[label]),
+                                workers=self.workers,
+                                chunk_size=self.file_chunk_size,
+                                export="_export_metrics",
+                                merge="_merge_metrics",
+                            ),
+                        )
+
+                else:
+
+                    yield from self._iter_labels(
+                        "_get_label_edges", list(labels)
                     )
-                    yield _id, _label, _props
 
-    def get_edges(self):
+        else:
+
+            yield from self._iter_labels("_get_label_edges", edge_types)
+
+    def write_edges(
+        self,
+        bc,
+        fast_edge_types: Optional[list] = None,
+        batch_size: int = int(1e6),
+        read_batch_size: int = int(1e5),
+        sharded: bool = False,
+        shard_bytes: Optional[int] = None,
+        shard_workers: int = 4,
+        regenerate_shards: Optional[dict] = None,
+    ) -> bool:
         """
-        Get edges from CSV and yield them to the batch writer.
+        Write the edges with a BioCypher instance, writing the edge types in
+        `fast_edge_types` (all selected edge types if not given) directly
+        as neo4j-admin import files from column batches.
+
+        The direct path produces the same part files, headers and import
+        call (`bc.write_import_call()`) as `bc.write_edges(get_edges())`,
+        without creating a tuple and a `BioCypherEdge` per row, and with
+        ids interned (see `get_edge_batches`) until they are written. It
+        needs an offline Neo4j BioCypher instance with CSV output; edge
+        types it cannot write (e.g. without a schema mapping) are passed to
+        `bc.write_edges` as usual. Parallel parsing and the parsed cache are
+        not used on the direct path; the `merge` duplicate policy drops
+        duplicates there.
+
+        With `sharded`, the direct path writes shards of at most
+        `batch_size` edges and `shard_bytes` bytes in `shard_workers`
+        threads, lists every shard in the import call and records rows and
+        checksums in a shard manifest (see `AdminImportWriter`). Shards
+        that `dmb._admin_import.verify_shards` reports as missing or
+        changed can be written again on their own by passing its result as
+        `regenerate_shards`, with a BioCypher instance writing to the same
+        output folder and the same adapter configuration; only those edge
+        types are read then.
 
         Args:
-            label: input label of edges to be read
+            bc: BioCypher instance
+
+            fast_edge_types: edge types to write directly
+
+            batch_size: number of edges per part file
+
+            read_batch_size: number of rows parsed into a column batch
+
+            sharded: write shards with a shard manifest
+
+            shard_bytes: maximum size of a shard in bytes
+
+            shard_workers: number of threads writing shards
+
+            regenerate_shards: dict of file label to numbers of the shards
+                to write again
 
         Returns:
-            generator of tuples representing edges
+            whether all edges were written
         """
 
-        loc_dict = {
-            DepMapEdgeType.GENE_TO_GENE.value: "data/v0.5/genes/gene_int_all.csv",
-            DepMapEdgeType.GENE_TO_CELL_LINE.value: "data/v0.5/cellModels/CRISPRKO_all.csv",
-            DepMapEdgeType.SEQUENCE_VARIANT_TO_GENE.value: "data/v0.5/cellModels/CFEinv_all.csv",
-            DepMapEdgeType.SEQUENCE_VARIANT_TO_CELL_LINE.value: "data/v0.5/cellModels/CFEobs_all.csv",
-            DepMapEdgeType.CELL_LINE_TO_COMPOUND.value: "data/v0.5/compounds/response_all.csv",
-            DepMapEdgeType.COMPOUND_TO_COMPOUND.value: "data/v0.5/compounds/compound_Tsim_ALL.csv",
-            DepMapEdgeType.COMPOUND_TO_GENE.value: "data/v0.5/compounds/compoundTarget_lit.csv",
-        }
+        from dmb._admin_import import AdminImportWriter
+
+        writer = AdminImportWriter(
+            bc,
+            batch_size,
+            sharded=sharded,
+            shard_bytes=shard_bytes,
+            workers=shard_workers,
+            regenerate=regenerate_shards,
+        )
 
-        for label in self.edge_types:
+        if fast_edge_types is not None:
+            fast_edge_types = [
+                _type.value if isinstance(_type, Enum) else _type
+                for _type in fast_edge_types
+            ]
 
-            # read csv for each label
-            with (open(loc_dict[label], "r")) as f:
+        fast = [
+            label
+            for label in self.edge_types
+            if (fast_edge_types is None or label in fast_edge_types)
+            and writer.supports(label)
+        ]
+        slow = [label for label in self.edge_types if label not in fast]
+
+        if regenerate_shards is not None:
+            fast = [
+                label
+                for label in fast
+                if writer.file_label(label) in regenerate_shards
+            ]
+            slow = []
 
-                reader = csv.reader(f)
-                prop_items = next(reader)
+        passed = True
+        self.filter_report = {}
+        self._reset_coercion_failures(fast + slow)
+
+        if slow:
+            passed = bc.write_edges(
+                self._get_edges(slow), batch_size=batch_size
+            )
+
+        if fast:
+
+            logger.info(
+                f"Writing {', '.join(fast)} edges directly as import files."
+            )
+
+            for batch in self._iter_edge_batches(
+                fast, read_batch_size, intern_ids=True, convert_numeric=False
+            ):
+                writer.write_batch(batch)
+
+            passed = writer.finish() and passed
+
+        return passed
+
+    def load(
+        self,
+        loader,
+        nodes: bool = True,
+        edges: bool = True,
+        replace_edges: bool = False,
+    ) -> dict:
+        """
+        Load the selected nodes and edges into a running Neo4j database
+        with a `Neo4jLoader`, nodes before edges, label by label.
+
+        To refresh a single label in a database that already holds the
+        rest of the graph, select only that edge type and pass
+        `nodes=False, replace_edges=True`.
 
-                if self.test_mode:
-                    reader = islice(reader, 0, 100)
+        Gene nodes are identified by their symbols, so edges whose sources
+        are translated to ENSG ids are loaded from the gene nodes of those
+        ids (under the `all` ENSG policy, once per ENSG id of a symbol).
 
-                for row in reader:
-                    _src = self._process_source_id(row[0], label)
-                    _tar = _process_target_id(row[1], label)
-                    _label = label
-                    _props = self._process_properties(
-                        dict(zip(prop_items[2:], row[2:]))
+        Args:
+            loader: `dmb._loader.Neo4jLoader`
+
+            nodes: load the selected node types
+
+            edges: load the selected edge types
+
+            replace_edges: delete the existing relationships of each edge
+                type before loading it
+
+        Returns:
+            per-label loading statistics (`loader.stats`)
+        """
+
+        if nodes:
+            for label, rows in groupby(self.get_nodes(), key=itemgetter(1)):
+                loader.load_nodes(label, rows)
+
+        if edges:
+            for label, rows in groupby(self.get_edges(), key=itemgetter(2)):
+
+                if label in self.ensg_edge_types:
+                    gene_ids = self._ensg_gene_ids()
+                    rows = (
+                        (gene_ids.get(_src, _src), _tar, _label, _props)
+                        for _src, _tar, _label, _props in rows
                     )
 
-                    if not _src and _tar:
-                        continue
+                loader.load_edges(
+                    label,
+                    rows,
+                    source_label=PREFIX_NODE_TYPES.get(
+                        EDGE_SOURCE_ID_PREFIXES[label]
+                    ),
+                    target_label=PREFIX_NODE_TYPES.get(
+                        EDGE_TARGET_ID_PREFIXES[label]
+                    ),
+                    replace=replace_edges,
+                )
 
-                    yield _src, _tar, _label, _props
+        return loader.stats
 
-    def _process_properties(self, _props):
+    def build_graph(self, path: Optional[str] = None):
         """
-        Process properties.
+        Build an in-memory graph of the selected nodes and edges for
+        neighbourhood queries without Neo4j (neighbours, degree, k-hop), in
+        one pass over `get_nodes` and `get_edges`: a `CsrGraph` with one
+        compressed sparse row layer per edge type. Numeric properties (see
+        `_numeric_edge_properties`) are stored as arrays of doubles, all
+        others as strings.
+
+        Args:
+            path: directory to save the graph in, to be opened later with
+                `CsrGraph.load` (memory-mapped .npy files)
+
+        Returns:
+            `dmb._graph.CsrGraph`
         """
 
-        for key, value in _props.items():
+        from dmb._graph import CsrGraph
 
-            if key not in self.node_fields and key not in self.edge_fields:
-                continue
+        graph = CsrGraph.build(
+            self.get_nodes(),
+            self.get_edges(),
+            numeric={
+                label: self._numeric_edge_properties(label)
+                for label in self.edge_types
+            },
+        )
 
-            if '"' in value:
-                _props[key] = value.replace('"', "")
+        if path:
+            graph.save(path)
 
-        #  generic source, version and licence
-        _props["source"] = self.data_source
-        _props["version"] = self.data_version
-        _props["licence"] = self.data_licence
+        return graph
 
-        return _props
+    def _numeric_edge_properties(self, label):
+        """
+        Edge properties of a label that are numbers: those declared `int`
+        or `float` in the schema config with `coerce_types`, else those in
+        `NUMERIC_EDGE_FIELDS`.
+        """
 
-    def _process_source_id(self, _id, _type):
+        if self.property_types is None:
+            return NUMERIC_EDGE_FIELDS
+
+        return {
+            key
+            for key, _type in self.property_types.get(label, {}).items()
+            if _type in ("int", "float")
+        }
+
+    def aget_nodes(
+        self,
+        batch_size: int = int(1e4),
+        queue_size: int = 4,
+        executor=None,
+    ):
         """
-        Process source ids.
+        Async version of `get_nodes` for use in an asyncio application.
+
+        Reading and parsing run in an executor thread (combine with
+        `workers` > 1 to move the parsing itself into worker processes), so
+        the event loop stays free for other I/O. Nodes are yielded in lists
+        of at most `batch_size`, with at most `queue_size` lists produced
+        ahead of the consumer. Closing the generator (`aclose`, e.g. via
+        `contextlib.aclosing`, or when it is garbage collected after the
+        loop was left or the task cancelled) stops the reading and waits
+        for its cleanup.
+
+        Args:
+            batch_size: number of nodes per list
+
+            queue_size: number of lists produced ahead of the consumer
+
+            executor: thread pool to read in (the loop's default executor
+                if not given)
+
+        Returns:
+            async generator of lists of tuples representing nodes
         """
 
-        if _type in [
-            DepMapEdgeType.GENE_TO_GENE.value,
-            DepMapEdgeType.GENE_TO_CELL_LINE.value,
-        ]:
+        # asyncio is only imported when needed
+        from dmb._async import aiter_batches
 
-            normalised_id = normalize_curie("hgnc.symbol:" + _id)
+        return aiter_batches(self.get_nodes, batch_size, queue_size, executor)
 
-        elif _type in [
-            DepMapEdgeType.SEQUENCE_VARIANT_TO_GENE.value,
-            DepMapEdgeType.SEQUENCE_VARIANT_TO_CELL_LINE.value,
-            DepMapEdgeType.CELL_LINE_TO_COMPOUND.value,
-        ]:
+    def aget_edges(
+        self,
+        batch_size: int = int(1e4),
+        queue_size: int = 4,
+        executor=None,
+    ):
+        """
+        Async version of `get_edges`, yielding lists of edges; see
+        `aget_nodes`.
 
-            normalised_id = "variant:" + _id
+        Returns:
+            async generator of lists of tuples representing edges
+        """
 
-        elif _type in [
-            DepMapEdgeType.COMPOUND_TO_COMPOUND.value,
-            DepMapEdgeType.COMPOUND_TO_GENE.value,
-        ]:
+        from dmb._async import aiter_batches
 
-            normalised_id = "compoundname:" + _id
+        return aiter_batches(self.get_edges, batch_size, queue_size, executor)
 
-        if (
-            DepMapGeneToCellLineEdgeField._TRANSLATE_SOURCE_ID_TO_ENSG.value
-            in self.edge_fields
-        ):
-            translated = self._get_ensg_from_symbol(_id)
-            if translated:
-                normalised_id = normalize_curie("ensembl:" + translated)
-            else:
-                normalised_id = None
+    def get_edge_batches(
+        self, batch_size: int = int(1e5), intern_ids: bool = False
+    ):
+        """
+        Get edges from CSV as column batches instead of one tuple per edge.
+
+        Each file is read in blocks of `batch_size` rows, which are turned
+        into columns at once. Source and target ids are processed once per
+        distinct id in the block, and the columns in `NUMERIC_EDGE_FIELDS`
+        (with `coerce_types`, the float columns of the schema config) are
+        converted to typed arrays of doubles. Edges are dropped by the
+        same rule as in `get_edges`; `EdgeBatch.rows` gives the equivalent
+        tuples (with floats for the numeric properties).
+
+        With `intern_ids`, source and target ids are integer handles of an
+        `IdRegistry` of the pass in compact arrays: raw ids are turned into
+        handles directly, building the CURIE of each once per label, and
+        the duplicate check works on the handles. They are only turned
+        back into CURIEs when the batch is written
+        (`EdgeBatch.source_curies` etc.).
+
+        With `check_references`, edges with unknown nodes are dropped as in
+        `get_edges`. With `deduplicate`, duplicate edges are dropped (or
+        kept, with the `keep` policy); the `merge` policy is not applied to
+        batches and drops them too.
+
+        Args:
+            batch_size: maximum number of edges per batch
 
-        return normalised_id
+            intern_ids: carry ids as registry handles instead of CURIEs
 
-    def _get_ensg_from_symbol(self, symbol):
+        Returns:
+            generator of `EdgeBatch` objects
         """
-        Get ensg from symbol.
+
+        self.filter_report = {}
+        self._reset_coercion_failures(self.edge_types)
+
+        yield from self._iter_edge_batches(
+            self.edge_types, batch_size, intern_ids
+        )
+
+    def _iter_edge_batches(
+        self, edge_types, batch_size, intern_ids=False, convert_numeric=True
+    ):
+        """
+        Yield the edges of the given edge types as column batches, with
+        ids interned in a registry of this pass if `intern_ids` is set.
         """
 
-        if symbol in self.symbol_to_ensg:
+        registry = IdRegistry() if intern_ids else None
 
-            return self.symbol_to_ensg[symbol]
+        for label in edge_types:
 
-        else:
+            # raw source and target ids of the label and their handles
+            memos = ({}, {})
 
-            return None
+            with self._read_csv(EDGE_FILES[label]) as reader:
 
-    def _set_up_types_and_fields(
-        self, node_types, node_fields, edge_types, edge_fields
+                prop_items = next(reader)
+
+                plan = self._compile_column_plan(
+                    label, EDGE_FIELD_ENUMS[label], prop_items, 2
+                )
+                row_filter = self._compile_row_filter(label, prop_items)
+                sample_filter = self._compile_sample_filter(label)
+
+                if sample_filter:
+                    reader = filter(sample_filter, reader)
+
+                if self._selects_top_k(label):
+                    reader = iter(
+                        self._select_top_k(
+                            label, prop_items, reader, row_filter
+                        )
+                    )
+                elif row_filter:
+                    reader = filter(row_filter, reader)
+
+                while True:
+
+                    rows = list(islice(reader, batch_size))
+
+                    if not rows:
+                        break
+
+                    yield self._process_edge_batch(
+                        label, plan, rows, registry, memos, convert_numeric
+                    )
+
+            if row_filter:
+                self._count_filtered(label, row_filter)
+                self._report_filters([label])
+
+            self._report_coercion([label])
+
+            if self.check_references:
+                self._report_dangling_edges([label])
+
+            if self.deduplicator:
+                self.deduplicator.forget(label)
+                self._report_duplicates([label], "edges")
+
+    def _process_edge_batch(
+        self,
+        label,
+        plan,
+        rows,
+        registry=None,
+        memos=None,
+        convert_numeric=True,
     ):
-        if node_types:
-            self.node_types = [field.value for field in node_types]
-        else:
-            self.node_types = [field.value for field in DepMapNodeType]
+        """
+        Turn a block of CSV rows of one edge label into an `EdgeBatch`,
+        with source and target ids as handles of `registry` if given (and
+        `memos` of the raw source and target ids of the label seen so far).
+        Without `convert_numeric`, numeric columns are kept as in
+        `get_edges` (strings, unless `coerce_types` is set).
+        """
 
-        if edge_types:
-            self.edge_types = [field.value for field in edge_types]
+        if label in self.ensg_edge_types:
+            _src, positions = expand_column(
+                translate_column(
+                    self.symbol_to_ensg, list(map(itemgetter(0), rows))
+                )
+            )
+            if positions is not None:
+                rows = [rows[i] for i in positions]
+            if registry is not None:
+                _src = registry.handles(_src)
+        elif registry is not None:
+            _src = registry.intern_column(
+                lambda _id: self._process_source_id(_id, label),
+                list(map(itemgetter(0), rows)),
+                memos[0],
+            )
         else:
-            self.edge_types = [field.value for field in DepMapEdgeType]
+            _src = map_column(
+                lambda _id: self._process_source_id(_id, label),
+                list(map(itemgetter(0), rows)),
+            )
 
-        if node_fields:
-            self.node_fields = [field.value for field in node_fields]
+        if registry is not None:
+            _tar = registry.intern_column(
+                lambda _id: self._process_target_id(_id, label),
+                list(map(itemgetter(1), rows)),
+                memos[1],
+            )
         else:
-            self.node_fields = [
-                field.value
-                for field in chain(
-                    DepMapGeneNodeField,
-                    DepMapCellLineNodeField,
-                    DepMapCompoundNodeField,
-                    DepMapSequenceVariantNodeField,
+            _tar = map_column(
+                lambda _id: self._process_target_id(_id, label),
+                list(map(itemgetter(1), rows)),
+            )
+
+        _props = {}
+        types = self.property_types
+        types = types.get(label, {}) if types is not None else None
+
+        for index, key, transform in plan:
+
+            column = map(itemgetter(index), rows)
+
+            if not convert_numeric:
+                _props[key] = list(map(transform, column))
+            elif types is not None and types.get(key) == "float":
+                _props[key] = coerce_float_column(
+                    column, key, self._coercion_failures(label)
                 )
+            elif types is None and key in NUMERIC_EDGE_FIELDS:
+                _props[key] = float_column(column)
+            else:
+                _props[key] = list(map(transform, column))
+
+        batch = EdgeBatch(
+            label,
+            _src,
+            _tar,
+            _props,
+            constants={
+                "source": self.data_source,
+                "version": self.data_version,
+                "licence": self.data_licence,
+            },
+            registry=registry,
+        )
+
+        if registry is not None:
+            keep = [
+                i
+                for i, (s, t) in enumerate(zip(_src, _tar))
+                if s != NO_HANDLE or t == NO_HANDLE
             ]
-        if edge_fields:
-            self.edge_fields = [field.value for field in edge_fields]
         else:
-            self.edge_fields = [
-                field.value
-                for field in chain(
-                    DepMapGeneToGeneEdgeField,
-                    DepMapGeneToCellLineEdgeField,
-                    DepMapSequenceVariantToGeneEdgeField,
-                    DepMapSequenceVariantToCellLineEdgeField,
-                    DepMapCellLineToCompoundEdgeField,
-                    DepMapCompoundToCompoundEdgeField,
-                    DepMapCompoundToGeneEdgeField,
-                )
+            keep = [
+                i for i, (s, t) in enumerate(zip(_src, _tar)) if s or not t
             ]
 
-        if (
-            DepMapGeneToCellLineEdgeField._TRANSLATE_SOURCE_ID_TO_ENSG.value
-            in self.edge_fields
-        ):
+        if self.check_references:
+            keep = self._filter_dangling_batch(
+                label, batch.source_curies(), batch.target_curies(), keep
+            )
 
-            logger.warning(
-                "Translating gene symbols to ensembl ids. "
-                "Information may be lost."
+        if self.deduplicator:
+            keep = self._deduplicate_batch(
+                label, _src, _tar, keep, interned=registry is not None
             )
-            self._translate_symbol_to_ensg()
 
-    def _translate_symbol_to_ensg(self):
+        if len(keep) < len(batch):
+            batch = batch.select(keep)
+
+        return batch
+
+    def _get_node_index(self):
         """
-        Translate symbol to ensg.
+        Build (once) the set of node ids of each node type, as `get_nodes`
+        would yield them for all node types.
         """
 
-        self.symbol_to_ensg = {}
+        if self._node_index is None:
 
-        with (open("data/v0.5/genes/gene_all.csv", "r")) as f:
+            self._node_index = {}
 
-            reader = csv.reader(f)
-            next(reader)
+            for _type, path in NODE_FILES.items():
 
-            for row in reader:
+                with self._read_csv(path) as reader:
 
-                self.symbol_to_ensg[row[0]] = row[1]
+                    next(reader)
 
+                    if self.sample and _type in self.sample:
+                        reader = self._sampled_nodes(_type, reader)
 
-def _process_node_id(_id, _type):
-    """
-    Add prefixes to avoid multiple assignment. Fix other small issues.
-    """
+                    self._node_index[_type] = frozenset(
+                        self._process_node_id(row[0], _type) for row in reader
+                    )
 
-    if '"' in _id:
-        _id = _id.replace('"', "")
+            logger.info(
+                "Built node id index: "
+                + ", ".join(
+                    f"{len(ids)} {_type}"
+                    for _type, ids in self._node_index.items()
+                )
+                + "."
+            )
 
-    if _type == DepMapNodeType.GENE.value:
-        _id = normalize_curie("hgnc.symbol:" + _id)
-    elif _type == DepMapNodeType.CELL_LINE.value:
-        _id = normalize_curie("cosmic.cell:" + _id)
-    elif _type == DepMapNodeType.COMPOUND.value:
-        _id = "compoundname:" + _id
-    elif _type == DepMapNodeType.SEQUENCE_VARIANT.value:
-        _id = "variant:" + _id
+        return self._node_index
 
-    return _id
+    def _endpoint_index(self, label):
+        """
+        Known source and target node ids of an edge label. Ids whose
+        prefix is not that of a node type (e.g. translated Ensembl ids) are
+        never known.
+        """
 
+        index = self._get_node_index()
+        empty = frozenset()
 
-def _process_target_id(_id, _type):
-    """
-    Process target ids.
-    """
+        return (
+            index.get(
+                PREFIX_NODE_TYPES.get(EDGE_SOURCE_ID_PREFIXES[label]), empty
+            ),
+            index.get(
+                PREFIX_NODE_TYPES.get(EDGE_TARGET_ID_PREFIXES[label]), empty
+            ),
+        )
+
+    def _filter_dangling_edges(self, edges):
+        """
+        Drop edges with an unknown source or target node, counting them in
+        `reference_report`.
+        """
+
+        label = None
+        labels = []
+
+        try:
+
+            for edge in edges:
+
+                if edge[2] != label:
+                    label = edge[2]
+                    labels.append(label)
+                    counts = self.reference_report.setdefault(label, Counter())
+                    sources, targets = self._endpoint_index(label)
+
+                counts["checked"] += 1
+
+                if edge[0] not in sources:
+                    counts["unknown_source"] += 1
+                    continue
+
+                if edge[1] not in targets:
+                    counts["unknown_target"] += 1
+                    continue
+
+                yield edge
+
+        finally:
+
+            self._report_dangling_edges(labels)
+
+    def _filter_dangling_batch(self, label, _src, _tar, keep):
+        """
+        Positions in `keep` of the edges of a batch whose source and target
+        nodes are known, counting the others in `reference_report`.
+        """
 
-    if _type in [
-        DepMapEdgeType.GENE_TO_GENE.value,
-        DepMapEdgeType.SEQUENCE_VARIANT_TO_GENE.value,
-        DepMapEdgeType.COMPOUND_TO_GENE.value,
-    ]:
+        counts = self.reference_report.setdefault(label, Counter())
+        sources, targets = self._endpoint_index(label)
 
-        _id = normalize_curie("hgnc.symbol:" + _id)
+        counts["checked"] += len(keep)
+        known = [i for i in keep if _src[i] in sources]
+        counts["unknown_source"] += len(keep) - len(known)
+        keep = [i for i in known if _tar[i] in targets]
+        counts["unknown_target"] += len(known) - len(keep)
 
-    elif _type in [
-        DepMapEdgeType.GENE_TO_CELL_LINE.value,
-        DepMapEdgeType.SEQUENCE_VARIANT_TO_CELL_LINE.value,
-    ]:
+        return keep
 
-        _id = normalize_curie("cosmic.cell:" + _id)
+    def _report_dangling_edges(self, labels):
+        """
+        Log the edges of `labels` dropped for unknown endpoints, and add
+        them to the metrics.
+        """
+
+        for label in labels:
+
+            counts = self.reference_report[label]
+            dropped = counts["unknown_source"] + counts["unknown_target"]
+
+            if dropped:
+                logger.warning(
+                    f"Dropped {dropped} of {counts['checked']} `{label}` "
+                    f"edges with unknown nodes ({counts['unknown_source']} "
+                    f"sources, {counts['unknown_target']} targets)."
+                )
+
+            if self.metrics:
+                metrics = self.metrics.label(label, "edges")
+                metrics.rows_emitted -= dropped
+                metrics.dropped["unknown_source_node"] += counts[
+                    "unknown_source"
+                ]
+                metrics.dropped["unknown_target_node"] += counts[
+                    "unknown_target"
+                ]
+
+    def _set_up_duplicate_policy(self, duplicate_policy):
+        """
+        Policy for duplicates per label (node and edge type values): `drop`
+        (default), `merge` (fill empty properties of the first row from its
+        duplicates) or `keep` (only count). Unlike the others, `merge` is
+        not bounded in memory: it holds every row of the label (not only
+        its keys) until the label is done, as a later duplicate may still
+        fill a property of any of them.
+        """
+
+        policy = {}
+
+        for _type, value in (duplicate_policy or {}).items():
+
+            if value not in DUPLICATE_POLICIES:
+                raise ValueError(
+                    f"Unknown duplicate policy `{value}` for `{_type}`; use "
+                    f"one of {', '.join(DUPLICATE_POLICIES)}."
+                )
+
+            if (
+                value == "merge"
+                and self.deduplicator
+                and self.deduplicator.mode != "exact"
+            ):
+                raise ValueError(
+                    "The `merge` duplicate policy requires exact "
+                    "deduplication."
+                )
+
+            policy[_type.value if isinstance(_type, Enum) else _type] = value
 
-    elif _type in [
-        DepMapEdgeType.CELL_LINE_TO_COMPOUND.value,
-        DepMapEdgeType.COMPOUND_TO_COMPOUND.value,
-    ]:
+        return policy
+
+    def _deduplicate(self, items, kind):
+        """
+        Handle rows whose ids were seen before in the same label, according
+        to the duplicate policy of the label, counting them in
+        `duplicate_report`.
+        """
+
+        # number of id columns; the label follows them, the properties last
+        width = 1 if kind == "nodes" else 2
+
+        label = None
+        labels = []
+        # rows of the current label with the `merge` policy, by key: grows
+        # with the label, unlike the keys of `self.deduplicator`
+        merged = {}
+
+        try:
+
+            for item in items:
+
+                if item[width] != label:
+
+                    yield from merged.values()
+                    merged.clear()
+
+                    if label is not None:
+                        self.deduplicator.forget(label)
+
+                    label = item[width]
+                    labels.append(label)
+                    counts = self.duplicate_report.setdefault(label, Counter())
+                    policy = self.duplicate_policy.get(label, "drop")
+
+                counts["checked"] += 1
+
+                if policy == "merge":
+
+                    key = item[:width]
+                    kept = merged.get(key)
+
+                    if kept is None:
+                        merged[key] = item
+                        continue
 
-        _id = "compoundname:" + _id
+                    counts["duplicates"] += 1
+                    properties = merge_properties(kept[-1], item[-1])
 
-    return _id
+                    if properties is not kept[-1]:
+                        merged[key] = kept[:-1] + (properties,)
 
+                    continue
+
+                if self.deduplicator.add(label, *item[:width]):
+                    yield item
+                    continue
+
+                counts["duplicates"] += 1
+
+                if policy == "keep":
+                    yield item
+
+            yield from merged.values()
+
+            if label is not None:
+                self.deduplicator.forget(label)
+
+        finally:
+
+            self._report_duplicates(labels, kind)
+
+    def _deduplicate_batch(self, label, _src, _tar, keep, interned=False):
+        """
+        Positions in `keep` of the edges of a batch that are not duplicates
+        (or all, with the `keep` policy), counting duplicates in
+        `duplicate_report`. With `interned`, ids are registry handles.
+        """
+
+        counts = self.duplicate_report.setdefault(label, Counter())
+        add = (
+            self.deduplicator.add_handles
+            if interned
+            else self.deduplicator.add
+        )
+        new = [i for i in keep if add(label, _src[i], _tar[i])]
+
+        counts["checked"] += len(keep)
+        counts["duplicates"] += len(keep) - len(new)
+
+        return keep if self.duplicate_policy.get(label) == "keep" else new
+
+    def _report_duplicates(self, labels, kind):
+        """
+        Log the duplicates of `labels`, and add the dropped ones to the
+        metrics.
+        """
+
+        for label in labels:
+
+            duplicates = self.duplicate_report[label]["duplicates"]
+
+            if not duplicates:
+                continue
+
+            policy = self.duplicate_policy.get(label, "drop")
+
+            logger.info(
+                f"Found {duplicates} duplicate `{label}` {kind} "
+                f"({_DUPLICATE_OUTCOMES[policy]})."
+            )
+
+            if self.metrics and policy != "keep":
+                metrics = self.metrics.label(label, kind)
+                metrics.rows_emitted -= duplicates
+                metrics.dropped["duplicate"] += duplicates
+
+    def get_metrics(self) -> dict:
+        """
+        Metrics of the labels read so far (if the adapter was created with
+        `metrics=True`): rows read, emitted and dropped by reason, time spent
+        parsing, normalising ids, processing properties and waiting for the
+        consumer, and id normalisation cache hits.
+
+        Returns:
+            dict of per-label metrics and the normaliser cache statistics
+        """
+
+        return {
+            "labels": self.metrics.as_dict() if self.metrics else {},
+            "normaliser": self.normaliser.cache_info(),
+        }
+
+    def write_metrics(self, path: str):
+        """
+        Write the metrics of `get_metrics` to a JSON file.
+        """
+
+        with (open(path, "w")) as f:
+            json.dump(self.get_metrics(), f, indent=2)
+
+    def skip_unchanged_labels(self, manifest_path: str, bc=None) -> dict:
+        """
+        Compare the input files and configuration of the selected labels to
+        the manifest of an earlier run, and remove the labels that have not
+        changed from `node_types` and `edge_types`, so that only the output
+        of the affected labels is regenerated. Call `write_manifest` after
+        the import to record the new state.
+
+        A label counts as changed if the content (size and hash) of its file
+        or of a file it depends on changed, if its selected fields or other
+        configuration changed, or if it is not in the manifest.
+
+        Without `bc`, the output only holds the changed labels, e.g. for a
+        loader that adds them to an existing database; the import call of
+        `bc.write_import_call()` does not include the skipped labels. With
+        an offline BioCypher instance with Neo4j CSV output writing to the
+        output folder of the earlier run (`output_directory`), the files
+        that skipped labels wrote there are added to its import call, and
+        the earlier files of the changed labels are removed before they are
+        written again (see `dmb._admin_import.reuse_output`). Skipped
+        labels without files in that folder are regenerated.
+
+        Args:
+            manifest_path: path to the JSON manifest, e.g. next to the
+                BioCypher output
+
+            bc: BioCypher instance to reuse the earlier output with
+
+        Returns:
+            dict of the skipped node and edge labels
+        """
+
+        previous = load_manifest(manifest_path)
+        self._manifest_entries = self._get_manifest_entries(previous)
+        skipped = {"nodes": [], "edges": []}
+
+        for kind in skipped:
+
+            for label, entry in self._manifest_entries[kind].items():
+
+                if _same_manifest_entry(
+                    previous.get(kind, {}).get(label), entry
+                ):
+                    skipped[kind].append(label)
+
+        if bc is not None:
+
+            from dmb._admin_import import reuse_output
+
+            skipped = reuse_output(
+                bc,
+                {"nodes": self.node_types, "edges": self.edge_types},
+                skipped,
+            )
+
+        self.node_types = [
+            label for label in self.node_types if label not in skipped["nodes"]
+        ]
+        self.edge_types = [
+            label for label in self.edge_types if label not in skipped["edges"]
+        ]
+
+        logger.info(
+            f"Skipping unchanged labels: {skipped['nodes'] + skipped['edges']}."
+        )
+
+        return skipped
+
+    def write_manifest(self, manifest_path: str):
+        """
+        Record the fingerprints and configuration of the selected labels in
+        the manifest, keeping the entries of all other labels.
+
+        Args:
+            manifest_path: path to the JSON manifest
+        """
+
+        manifest = load_manifest(manifest_path)
+        entries = getattr(self, "_manifest_entries", None)
+
+        if entries is None:
+            entries = self._get_manifest_entries(manifest)
+
+        for kind, labels in entries.items():
+            manifest.setdefault(kind, {}).update(labels)
+
+        save_manifest(manifest_path, manifest)
+
+    def _get_manifest_entries(self, previous):
+        """
+        Manifest entries (file fingerprints and configuration) of the
+        selected labels.
+        """
+
+        return {
+            kind: {
+                label: self._get_manifest_entry(
+                    kind, label, previous.get(kind, {}).get(label)
+                )
+                for label in labels
+            }
+            for kind, labels in [
+                ("nodes", self.node_types),
+                ("edges", self.edge_types),
+            ]
+        }
+
+    def _get_manifest_entry(self, kind, label, old=None):
+        """
+        Manifest entry of one label: fingerprints of the files its output
+        depends on, and the configuration that affects its output. File
+        hashes of the old entry are reused if size and mtime are unchanged.
+        """
+
+        translate = kind == "edges" and label in self.ensg_edge_types
+
+        if kind == "nodes":
+            dependencies = [resolve_input(NODE_FILES[label])]
+            enum = NODE_FIELD_ENUMS[label]
+        else:
+            dependencies = [resolve_input(EDGE_FILES[label])]
+            enum = EDGE_FIELD_ENUMS[label]
+
+            if translate:
+                dependencies.append(
+                    resolve_input(NODE_FILES[DepMapNodeType.GENE.value])
+                )
+
+        old_files = (old or {}).get("files", {})
+
+        entry = {
+            "files": {
+                path: file_fingerprint(path, old_files.get(path))
+                for path in dependencies
+            },
+            "config": {
+                "fields": sorted(
+                    field.value
+                    for field in enum
+                    if field in self._selected_fields
+                ),
+                "test_mode": self.test_mode,
+                "translate_to_ensg": translate,
+                "ensg_policy": self.ensg_policy if translate else None,
+                "deduplicate": self.deduplicator and self.deduplicator.mode,
+                "duplicate_policy": self.duplicate_policy.get(label, "drop"),
+                "data_version": self.data_version,
+            },
+        }
+
+        if self.property_types is not None:
+            entry["config"]["property_types"] = self.property_types.get(
+                label, {}
+            )
+
+        if self.sample is not None:
+            entry["config"]["sample"] = {
+                "fraction": self.sample_fraction,
+                "count": self.sample_count,
+                "seed": self.sample_seed,
+            }
+
+        if kind == "edges" and self._selects_top_k(label):
+            entry["config"]["top_k"] = self.similarity_top_k
+            entry["config"]["symmetric"] = self.symmetric_similarity
+
+        if kind == "edges" and label in self.edge_filters:
+            entry["config"]["filters"] = [
+                describe_filter(*_filter)
+                for _filter in self.edge_filters[label]
+            ]
+
+        return entry
+
+    def _read_csv(self, path):
+        """
+        Rows of an input file, read with the reader engine of the adapter;
+        in test mode only the header and the first `TEST_MODE_ROWS` rows.
+        """
+
+        return CsvRows(
+            path,
+            self.reader_engine,
+            rows=TEST_MODE_ROWS if self.test_mode else None,
+        )
+
+    def _cached(self, kind, label, produce):
+        """
+        Yield the output of a label from the parsed cache if it is still
+        valid for the input files and configuration, else from `produce()`,
+        writing it to the cache on the way.
+        """
+
+        if not self.cache:
+            yield from produce()
+            return
+
+        old = self.cache.key(label)
+        entry = self._get_manifest_entry(kind, label, old)
+
+        if _same_manifest_entry(old, entry):
+
+            if self.metrics:
+                metrics = self.metrics.label(label, kind)
+                metrics.from_cache = True
+
+                for item in self.cache.load(label):
+                    metrics.rows_emitted += 1
+                    yield item
+
+            else:
+                yield from self.cache.load(label)
+
+        else:
+            yield from self.cache.store(label, entry, produce())
+
+    def _is_large_edge_file(self, label):
+        """
+        Check whether the edge file of a label is split into chunks
+        (compressed files are always read as a stream).
+        """
+
+        path = resolve_input(EDGE_FILES[label])
+
+        # the top k of each compound are selected over the whole file
+        if is_compressed(path) or self._selects_top_k(label):
+            return False
+
+        return os.path.getsize(path) > self.file_chunk_size
+
+    def _iter_labels(self, method, labels):
+        """
+        Yield the output of a per-label generator method for all labels,
+        either sequentially or from a pool of worker processes.
+        """
+
+        if self.workers > 1 and len(labels) > 1:
+
+            yield from iter_parallel(
+                self,
+                method,
+                labels,
+                workers=self.workers,
+                chunk_size=self.worker_chunk_size,
+                queue_size=self.worker_queue_size,
+                export="_export_metrics",
+                merge="_merge_metrics",
+            )
+
+        else:
+
+            for label in labels:
+                yield from getattr(self, method)(label)
+
+    def _get_label_nodes(self, label):
+        """
+        Get the nodes of one label, from the parsed cache if possible.
+        """
+
+        return self._cached(
+            "nodes", label, lambda: self._read_label_nodes(label)
+        )
+
+    def _get_label_edges(self, label):
+        """
+        Get the edges of one label, from the parsed cache if possible.
+        """
+
+        return self._cached(
+            "edges", label, lambda: self._read_label_edges(label)
+        )
+
+    def _read_label_nodes(self, label):
+        """
+        Read the CSV of one node label.
+
+        Args:
+            label: input label of nodes to be read
+
+        Returns:
+            generator of tuples representing nodes
+        """
+
+        with self._read_csv(NODE_FILES[label]) as reader:
+
+            prop_items = next(reader)
+
+            if self.sample and label in self.sample:
+                reader = self._sampled_nodes(label, reader)
+
+            yield from self._process_node_rows(label, prop_items, reader)
+
+    def _process_node_rows(self, label, prop_items, rows):
+        """
+        Turn CSV rows of one node label into node tuples.
+
+        Args:
+            label: input label of the nodes
+
+            prop_items: header row of the node file
+
+            rows: iterable of CSV rows (without header)
+
+        Returns:
+            generator of tuples representing nodes
+        """
+
+        plan = self._compile_column_plan(
+            label, NODE_FIELD_ENUMS[label], prop_items, 1
+        )
+
+        if self.metrics:
+            yield from self._process_node_rows_measured(label, plan, rows)
+            return
+
+        for row in rows:
+            _id = self._process_node_id(row[0], label)
+            _label = label
+            _props = self._process_properties(row, plan)
+            yield _id, _label, _props
+
+    def _process_node_rows_measured(self, label, plan, rows):
+        """
+        `_process_node_rows` with counters and timings.
+        """
+
+        metrics = self.metrics.label(label, "nodes")
+        clock = time.perf_counter
+        hits, misses = self.normaliser.hits, self.normaliser.misses
+        rows = iter(rows)
+
+        try:
+
+            while True:
+
+                start = clock()
+                row = next(rows, None)
+
+                if row is None:
+                    break
+
+                parsed = clock()
+                _id = self._process_node_id(row[0], label)
+                normalised = clock()
+                _props = self._process_properties(row, plan)
+                processed = clock()
+
+                metrics.rows_read += 1
+                metrics.parse += parsed - start
+                metrics.normalise += normalised - parsed
+                metrics.properties += processed - normalised
+
+                if not _id:
+                    metrics.warnings["id_not_normalised"] += 1
+
+                metrics.rows_emitted += 1
+                yield _id, label, _props
+                metrics.consumer += clock() - processed
+
+                if not metrics.rows_read % PROGRESS_CHECK_ROWS:
+                    self.metrics.progress(metrics)
+
+        finally:
+
+            metrics.normaliser_hits += self.normaliser.hits - hits
+            metrics.normaliser_misses += self.normaliser.misses - misses
+
+    def _read_label_edges(self, label):
+        """
+        Read the CSV of one edge label.
+
+        Args:
+            label: input label of edges to be read
+
+        Returns:
+            generator of tuples representing edges
+        """
+
+        with self._read_csv(EDGE_FILES[label]) as reader:
+
+            prop_items = next(reader)
+
+            yield from self._process_edge_rows(label, prop_items, reader)
+
+    def _process_edge_rows(self, label, prop_items, rows):
+        """
+        Turn CSV rows of one edge label into edge tuples.
+
+        Args:
+            label: input label of the edges
+
+            prop_items: header row of the edge file
+
+            rows: iterable of CSV rows (without header)
+
+        Returns:
+            generator of tuples representing edges
+        """
+
+        plan = self._compile_column_plan(
+            label, EDGE_FIELD_ENUMS[label], prop_items, 2
+        )
+        row_filter = self._compile_row_filter(label, prop_items)
+        row_test = row_filter
+        sample_filter = self._compile_sample_filter(label)
+
+        if sample_filter:
+            rows = filter(sample_filter, rows)
+
+        try:
+
+            if self._selects_top_k(label):
+                # filtered on the way, so that the top k are those that
+                # pass the filters
+                rows = self._select_top_k(label, prop_items, rows, row_filter)
+                row_test = None
+
+            if self.metrics:
+                yield from self._process_edge_rows_measured(
+                    label, plan, rows, row_test
+                )
+                return
+
+            if row_test:
+                rows = filter(row_test, rows)
+
+            for row in rows:
+                _src = self._process_source_id(row[0], label)
+                _tar = self._process_target_id(row[1], label)
+                _label = label
+                _props = self._process_properties(row, plan)
+
+                if not _src and _tar:
+                    continue
+
+                if type(_src) is tuple:
+                    for _id in _src:
+                        yield _id, _tar, _label, dict(_props)
+                    continue
+
+                yield _src, _tar, _label, _props
+
+        finally:
+
+            if row_filter:
+                self._count_filtered(label, row_filter)
+
+    def _process_edge_rows_measured(self, label, plan, rows, row_filter=None):
+        """
+        `_process_edge_rows` with counters, timings and drop reasons.
+        """
+
+        metrics = self.metrics.label(label, "edges")
+        clock = time.perf_counter
+        hits, misses = self.normaliser.hits, self.normaliser.misses
+        rows = iter(rows)
+
+        try:
+
+            while True:
+
+                start = clock()
+                row = next(rows, None)
+
+                if row is None:
+                    break
+
+                parsed = clock()
+
+                if row_filter and not row_filter(row):
+                    metrics.rows_read += 1
+                    metrics.parse += parsed - start
+                    metrics.dropped["filtered"] += 1
+                    continue
+
+                _src = self._process_source_id(row[0], label)
+                _tar = self._process_target_id(row[1], label)
+                normalised = clock()
+                _props = self._process_properties(row, plan)
+                processed = clock()
+
+                metrics.rows_read += 1
+                metrics.parse += parsed - start
+                metrics.normalise += normalised - parsed
+                metrics.properties += processed - normalised
+
+                if not metrics.rows_read % PROGRESS_CHECK_ROWS:
+                    self.metrics.progress(metrics)
+
+                if not _src and _tar:
+                    metrics.dropped[
+                        self._source_drop_reason(row[0], label)
+                    ] += 1
+                    continue
+
+                if not _tar:
+                    metrics.warnings["target_id_not_normalised"] += 1
+
+                if type(_src) is tuple:
+                    metrics.rows_emitted += len(_src)
+                    for _id in _src:
+                        yield _id, _tar, label, dict(_props)
+                    metrics.consumer += clock() - processed
+                    continue
+
+                metrics.rows_emitted += 1
+                yield _src, _tar, label, _props
+                metrics.consumer += clock() - processed
+
+        finally:
+
+            metrics.normaliser_hits += self.normaliser.hits - hits
+            metrics.normaliser_misses += self.normaliser.misses - misses
+
+    def _source_drop_reason(self, _id, label):
+        """
+        Why the source id of an edge could not be processed.
+        """
+
+        if label in self.ensg_edge_types:
+
+            targets = self._ensg_table.mapping.get(_id)
+
+            if not targets:
+                return "source_not_in_ensg_table"
+
+            if len(targets) > 1 and self.ensg_policy == "drop":
+                return "source_ensg_ambiguous"
+
+            return "source_ensg_not_normalised"
+
+        return "source_id_not_normalised"
+
+    def _export_metrics(self, label):
+        """
+        Hand over the metrics, filter counts and conversion failures of a
+        label collected in a worker process.
+        """
+
+        return (
+            self.metrics.pop(label) if self.metrics else None,
+            label,
+            self.filter_report.pop(label, None),
+            self.coercion_failures.pop(label, None),
+        )
+
+    def _merge_metrics(self, state):
+        """
+        Merge metrics, filter counts and conversion failures handed over by
+        a worker process.
+        """
+
+        metrics, label, counts, failures = state
+
+        if self.metrics:
+            self.metrics.merge(metrics)
+
+        if counts:
+            self.filter_report[label] = add_filter_counts(
+                self.filter_report.get(label), counts
+            )
+
+        if failures:
+            self._coercion_failures(label).update(failures)
+
+    def _set_up_edge_filters(self, edge_filters):
+        """
+        Filters per edge type (values) from (field, operator, value)
+        tuples, e.g. `(DepMapGeneToCellLineEdgeField.DEPENDENCY_SCORE_BINARY,
+        "==", 1)`: the edge type is that of the field's enum, the column
+        that of the field. Values that are numbers compare numerically
+        (rows without a number in the column never pass); operators are
+        those of `FILTER_OPERATORS` (`in` takes a collection of values).
+        """
+
+        labels = {enum: label for label, enum in EDGE_FIELD_ENUMS.items()}
+        filters = {}
+
+        for field, op, value in edge_filters or []:
+
+            label = labels.get(type(field))
+
+            if label is None:
+                raise ValueError(f"`{field}` is not a field of edges.")
+
+            if op not in FILTER_OPERATORS:
+                raise ValueError(
+                    f"Unknown filter operator `{op}`; use one of "
+                    f"{', '.join(FILTER_OPERATORS)}."
+                )
+
+            filters.setdefault(label, []).append((field.value, op, value))
+
+        return filters
+
+    def _compile_row_filter(self, label, prop_items):
+        """
+        Compile the filters of a label against the header row of its file
+        (None without filters).
+        """
+
+        return compile_row_filter(
+            self.edge_filters.get(label), prop_items, label
+        )
+
+    def _count_filtered(self, label, row_filter):
+        """
+        Add the counts of a row filter to `filter_report`.
+        """
+
+        self.filter_report[label] = add_filter_counts(
+            self.filter_report.get(label), row_filter.counts
+        )
+
+    def get_filter_report(self) -> dict:
+        """
+        Selectivity of the edge filters in the last pass over the edges
+        (`get_edges`, `get_edge_batches` or `write_edges`): per label
+        and filter, the rows it was applied to (those that passed the
+        filters before it), the rows that passed, and their fraction.
+        """
+
+        return {
+            label: [
+                {
+                    "filter": describe_filter(*_filter),
+                    "rows": rows,
+                    "passed": passed,
+                    "selectivity": passed / rows if rows else None,
+                }
+                for _filter, (rows, passed) in zip(
+                    self.edge_filters[label], counts
+                )
+            ]
+            for label, counts in self.filter_report.items()
+        }
+
+    def _report_filters(self, labels):
+        """
+        Log the selectivity of the filters of `labels`.
+        """
+
+        report = self.get_filter_report()
+
+        for label in labels:
+            for entry in report.get(label, []):
+                logger.info(
+                    f"`{label}` filter `{entry['filter']}`: {entry['passed']} "
+                    f"of {entry['rows']} rows passed"
+                    + (
+                        f" ({entry['selectivity']:.1%})."
+                        if entry["rows"]
+                        else "."
+                    )
+                )
+
+    def _draw_sample(self):
+        """
+        Draw the sample of each node type in `SAMPLED_NODE_TYPES`: a seeded
+        random sample of the ids in its node file (independent of the order
+        of node types, so that changing one does not change the others).
+        """
+
+        self.sample = {}
+
+        for _type in SAMPLED_NODE_TYPES:
+
+            with CsvRows(NODE_FILES[_type], self.reader_engine) as reader:
+
+                next(reader)
+
+                self.sample[_type] = draw_sample(
+                    (row[0] for row in reader if row),
+                    f"{self.sample_seed}:{_type}",
+                    fraction=self.sample_fraction,
+                    count=self.sample_count,
+                )
+
+        logger.info(
+            "Sampled "
+            + ", ".join(
+                f"{len(ids)} {_type}" for _type, ids in self.sample.items()
+            )
+            + f" nodes (seed {self.sample_seed})."
+        )
+
+    def _sampled_nodes(self, _type, rows):
+        """
+        Node rows whose (raw) id is in the sample of their node type.
+        """
+
+        ids = self.sample[_type]
+
+        return (row for row in rows if row and row[0] in ids)
+
+    def _compile_sample_filter(self, label):
+        """
+        Test of the rows of an edge label whose endpoints are both among the
+        sampled nodes (None without sampling). Ids are compared as they are
+        in the files, before any processing.
+        """
+
+        if self.sample is None:
+            return None
+
+        source_type, target_type = EDGE_NODE_TYPES[label]
+
+        return compile_sample_filter(
+            self.sample.get(source_type), self.sample.get(target_type)
+        )
+
+    def _selects_top_k(self, label):
+        """
+        Check whether only the top k rows per compound of a label are kept.
+        """
+
+        return (
+            label == DepMapEdgeType.COMPOUND_TO_COMPOUND.value
+            and self.similarity_top_k is not None
+        )
+
+    def _select_top_k(self, label, prop_items, rows, row_filter=None):
+        """
+        Keep, of the compound similarity rows that pass the row filter, the
+        `similarity_top_k` most similar compounds of each compound (of
+        sources and targets with `symmetric_similarity`), see
+        `TopKSelection`; symmetric pairs are kept in both directions. Reads
+        all rows before returning the kept ones.
+        """
+
+        column = (
+            DepMapCompoundToCompoundEdgeField.TANIMOTO_SIMILARITY_SCORE.value
+        )
+
+        if column not in prop_items:
+            raise ValueError(
+                f"Cannot select the top k `{label}` edges on `{column}`: no "
+                "such column in the edge file."
+            )
+
+        selection = TopKSelection(
+            list(prop_items).index(column),
+            self.similarity_top_k,
+            self.symmetric_similarity,
+        )
+        start = time.perf_counter()
+
+        kept = selection.select(
+            filter(row_filter, rows) if row_filter else rows
+        )
+
+        logger.info(
+            f"Kept {selection.kept} of {selection.rows} `{label}` rows (top "
+            f"{self.similarity_top_k} per compound"
+            f"{', symmetric' if self.symmetric_similarity else ''})"
+            + (
+                f", and added {selection.mirrored} mirrored rows."
+                if selection.mirrored
+                else "."
+            )
+        )
+
+        if self.metrics:
+            metrics = self.metrics.label(label, "edges")
+            read = row_filter.counts[0][0] if row_filter else selection.rows
+            # kept and mirrored rows are counted as read where processed
+            metrics.rows_read += read - selection.kept - selection.mirrored
+            metrics.parse += time.perf_counter() - start
+            metrics.dropped["filtered"] += read - selection.rows
+            metrics.dropped["not_top_k"] += selection.rows - selection.kept
+
+        return kept
+
+    def _compile_column_plan(self, label, fields, prop_items, offset):
+        """
+        Compile the column plan of a file: the index, name and transform of
+        every column from `offset` on that is one of the selected fields of
+        the label's field enum. Columns that are not in the plan are never
+        read from the rows. With `coerce_types`, the transform of a column
+        with a type in the schema config converts its values to that type.
+
+        Args:
+            label: input label of the file
+
+            fields: field enum of the label
+
+            prop_items: header row of the file
+
+            offset: number of leading id columns
+
+        Returns:
+            tuple of (index, key, transform) triples
+        """
+
+        by_value = {field.value: field for field in fields}
+        types = (self.property_types or {}).get(label, {})
+
+        return tuple(
+            (
+                index,
+                key,
+                (
+                    compile_parser(
+                        types[key], key, self._coercion_failures(label)
+                    )
+                    if key in types
+                    else _strip_quotes
+                ),
+            )
+            for index, key in enumerate(prop_items)
+            if index >= offset and by_value.get(key) in self._selected_fields
+        )
+
+    def _coercion_failures(self, label):
+        """
+        Counter of the values of a label that could not be converted, per
+        column.
+        """
+
+        return self.coercion_failures.setdefault(label, Counter())
+
+    def _reset_coercion_failures(self, labels):
+        """
+        Forget the values of `labels` counted in an earlier pass, so that
+        the report covers the last pass only.
+        """
+
+        for label in labels:
+            self.coercion_failures.pop(label, None)
+
+    def get_coercion_report(self) -> dict:
+        """
+        Values that could not be converted to the type of their column in
+        the schema config (and were left empty), per label and column, in
+        the last pass over each label.
+        """
+
+        return {
+            label: dict(failures)
+            for label, failures in self.coercion_failures.items()
+            if failures
+        }
+
+    def _report_coercion(self, labels):
+        """
+        Log the values of `labels` that could not be converted.
+        """
+
+        report = self.get_coercion_report()
+
+        for label in labels:
+            for key, count in report.get(label, {}).items():
+                logger.warning(
+                    f"{count} `{label}` values of `{key}` could not be "
+                    f"converted to {self.property_types[label][key]} and "
+                    "were left empty."
+                )
+
+    def _process_properties(self, row, plan):
+        """
+        Project a row onto the properties of its column plan.
+        """
+
+        _props = {key: transform(row[index]) for index, key, transform in plan}
+
+        #  generic source, version and licence
+        _props["source"] = self.data_source
+        _props["version"] = self.data_version
+        _props["licence"] = self.data_licence
+
+        return _props
+
+    def _process_node_id(self, _id, _type):
+        """
+        Add prefixes to avoid multiple assignment. Fix other small issues.
+        """
+
+        if '"' in _id:
+            _id = _id.replace('"', "")
+
+        return self.normaliser.normalise(NODE_ID_PREFIXES[_type], _id)
+
+    def _process_source_id(self, _id, _type):
+        """
+        Process source ids.
+        """
+
+        if _type in self.ensg_edge_types:
+            return self.symbol_to_ensg.get(_id)
+
+        return self.normaliser.normalise(EDGE_SOURCE_ID_PREFIXES[_type], _id)
+
+    def _process_target_id(self, _id, _type):
+        """
+        Process target ids.
+        """
+
+        return self.normaliser.normalise(EDGE_TARGET_ID_PREFIXES[_type], _id)
+
+    @property
+    def symbol_to_ensg(self) -> dict:
+        """
+        Gene symbols and their normalised ENSG ids (a tuple of ids for
+        symbols with several under the `all` policy), compiled on first use
+        from the gene node file (or the parsed cache, if enabled and the
+        file is unchanged).
+        """
+
+        if self._symbol_to_ensg is None:
+            self._translate_symbol_to_ensg()
+
+        return self._symbol_to_ensg
+
+    def _ensg_gene_ids(self) -> dict:
+        """
+        Gene node ids of the ENSG ids that gene symbols are translated to.
+        """
+
+        gene_ids = {}
+
+        for symbol, ensg in self.symbol_to_ensg.items():
+
+            _id = self._process_node_id(symbol, DepMapNodeType.GENE.value)
+
+            for ensg_id in (ensg,) if isinstance(ensg, str) else ensg:
+                gene_ids.setdefault(ensg_id, _id)
+
+        return gene_ids
+
+    def _get_ensg_from_symbol(self, symbol):
+        """
+        Get ensg from symbol.
+        """
+
+        return self.symbol_to_ensg.get(symbol)
+
+    def _set_up_types_and_fields(
+        self, node_types, node_fields, edge_types, edge_fields
+    ):
+        if node_types:
+            self.node_types = [field.value for field in node_types]
+        else:
+            self.node_types = [field.value for field in DepMapNodeType]
+
+        if edge_types:
+            self.edge_types = [field.value for field in edge_types]
+        else:
+            self.edge_types = [field.value for field in DepMapEdgeType]
+
+        if not node_fields:
+            node_fields = list(chain(*NODE_FIELD_ENUMS.values()))
+
+        if not edge_fields:
+            edge_fields = list(chain(*EDGE_FIELD_ENUMS.values()))
+
+        self.node_fields = [field.value for field in node_fields]
+        self.edge_fields = [field.value for field in edge_fields]
+
+        # enum members, to tell apart equally named fields of different labels
+        self._selected_fields = set(node_fields) | set(edge_fields)
+
+    def _set_up_ensg_translation(self, ensg_edge_types, ensg_policy):
+        """
+        Edge types (values) whose source ids are translated from gene
+        symbols to ENSG ids: none unless the ENSG pseudo field is selected,
+        then the given ones or all selected edge types with gene symbol
+        sources.
+        """
+
+        if ensg_policy not in MULTI_MAPPING_POLICIES:
+            raise ValueError(
+                f"Unknown ENSG policy `{ensg_policy}`; use one of "
+                f"{', '.join(MULTI_MAPPING_POLICIES)}."
+            )
+
+        if (
+            DepMapGeneToCellLineEdgeField._TRANSLATE_SOURCE_ID_TO_ENSG.value
+            not in self.edge_fields
+        ):
+            return set()
+
+        if ensg_edge_types is None:
+            labels = {
+                label
+                for label in self.edge_types
+                if EDGE_SOURCE_ID_PREFIXES[label] == "hgnc.symbol"
+            }
+        else:
+            labels = {
+                _type.value if isinstance(_type, Enum) else _type
+                for _type in ensg_edge_types
+            }
+
+        for label in labels:
+            if EDGE_SOURCE_ID_PREFIXES.get(label) != "hgnc.symbol":
+                raise ValueError(
+                    f"Sources of `{label}` edges are not gene symbols and "
+                    "cannot be translated to ENSG ids."
+                )
+
+        if labels:
+            logger.warning(
+                "Translating gene symbols to ensembl ids "
+                f"({', '.join(sorted(labels))}). Information may be lost."
+            )
+
+        return labels
+
+    def _translate_symbol_to_ensg(self):
+        """
+        Translate symbol to ensg: build the table from the gene node file,
+        or load it from the parsed cache, where it is stored with the
+        fingerprint of the gene node file as key, and compile it with the
+        ENSG policy, normalising every ENSG id once.
+        """
+
+        self._ensg_table = self._read_ensg_table()
+
+        ambiguous = self._ensg_table.ambiguous()
+
+        if ambiguous:
+            logger.warning(
+                f"{ambiguous} gene symbols have more than one ENSG id "
+                f"(policy `{self.ensg_policy}`)."
+            )
+
+        self._symbol_to_ensg = self._ensg_table.resolve(
+            self.ensg_policy,
+            lambda ensg: self.normaliser.normalise("ensembl", ensg),
+        )
+
+    def _read_ensg_table(self) -> IdTable:
+        """
+        Table of gene symbols to all their ENSG ids.
+        """
+
+        path = resolve_input(NODE_FILES[DepMapNodeType.GENE.value])
+        key = None
+
+        if self.cache:
+
+            old = self.cache.key(ENSG_TABLE_NAME)
+            old_files = (old or {}).get("files", {})
+            key = {
+                "files": {path: file_fingerprint(path, old_files.get(path))},
+                "config": {
+                    "data_version": self.data_version,
+                    "table": "one_to_many",
+                },
+            }
+
+            if _same_manifest_entry(old, key):
+                return IdTable(self.cache.load_table(ENSG_TABLE_NAME))
+
+        with CsvRows(path, self.reader_engine) as reader:
+
+            next(reader)
+
+            table = IdTable.from_pairs((row[0], row[1]) for row in reader)
+
+        if key:
+            self.cache.store_table(ENSG_TABLE_NAME, key, table.mapping)
+
+        return table
+
+    def _prebuild_id_tables(self):
+        """
+        Normalise all gene, cell line and compound names of the node files
+        once, so that id processing in the row loops is a dict lookup.
+        """
+
+        for _type in [
+            DepMapNodeType.GENE.value,
+            DepMapNodeType.CELL_LINE.value,
+            DepMapNodeType.COMPOUND.value,
+        ]:
+
+            self.normaliser.prebuild_from_csv(
+                NODE_ID_PREFIXES[_type],
+                NODE_FILES[_type],
+                engine=self.reader_engine,
+            )
+
+
+def _same_manifest_entry(old, new):
+    """
+    Whether a label's inputs and configuration are unchanged.
+    """
+
+    if not old or old.get("config") != new["config"]:
+        return False
+
+    if set(old.get("files", {})) != set(new["files"]):
+        return False
+
+    return all(
+        same_content(old["files"][path], fingerprint)
+        for path, fingerprint in new["files"].items()
+    )
+
+
+def _strip_quotes(value):
+    """
+    Remove quote characters from a property value.
+    """
 
-# multi-line fields: only due to line 832 in cellModels_all.csv?
+    return value.replace('"', "")
@@ -0,0 +1,592 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BioCypher - Dependency Map adapter prototype
+
+Benchmark of the adapter on synthetic DepMap-shaped data.
+
+Generates CSV files with the headers of the `DepMap*Field` enums at a
+configurable scale, times `get_nodes` and `get_edges` per label and writes
+the results as JSON, so that runs can be compared across commits. Runs
+offline, e.g.:
+
+    python -m dmb.benchmark --genes 18000 --cell-lines 1000 --out bench.json
+
+The startup time of short runs (import, construction, first edge) is
+measured in fresh interpreters; `--max-import-seconds` turns a slow import
+into an error. With `--neo4j-uri`, the throughput of online loading (`Neo4jLoader`) into
+that database, e.g. a local Neo4j container, is measured as well.
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import product
+from typing import Optional
+
+from dmb._logger import logger
+from dmb._loader import Neo4jLoader
+from dmb._normalise import CurieNormaliser
+from dmb._readers import resolve_engine
+from dmb.adapter import (
+    EDGE_FILES,
+    NODE_FILES,
+    NODE_FIELD_ENUMS,
+    EDGE_FIELD_ENUMS,
+    DepMapAdapter,
+    DepMapEdgeType,
+    DepMapNodeType,
+    DepMapGeneToCellLineEdgeField,
+)
+
+logger.debug(f"Loading module {__name__}.")
+
+# run in a fresh interpreter by `run_startup`: a test mode refresh of the
+# gene to cell line edges, up to the first edge
+_STARTUP_SCRIPT = """
+import json, sys, time
+
+start = time.perf_counter()
+
+from dmb import adapter
+
+imported = time.perf_counter()
+
+options = json.loads(sys.argv[1])
+translate = options.pop("translate_to_ensg")
+fields = [
+    field
+    for field in adapter.DepMapGeneToCellLineEdgeField
+    if field.name != "_TRANSLATE_SOURCE_ID_TO_ENSG" or translate
+]
+instance = adapter.DepMapAdapter(
+    test_mode=True,
+    edge_types=[adapter.DepMapEdgeType.GENE_TO_CELL_LINE],
+    edge_fields=fields,
+    **options,
+)
+
+constructed = time.perf_counter()
+
+next(instance.get_edges(), None)
+
+print(
+    json.dumps(
+        {
+            "import_seconds": imported - start,
+            "construct_seconds": constructed - imported,
+            "first_edge_seconds": time.perf_counter() - constructed,
+        }
+    )
+)
+"""
+
+
+class TimedNormaliser(CurieNormaliser):
+    """
+    Normaliser that accumulates the time spent in `normalise`. Use `timed`
+    to switch an existing normaliser (keeping its prebuilt tables).
+    """
+
+    seconds = 0.0
+
+    @classmethod
+    def timed(cls, normaliser: CurieNormaliser) -> "TimedNormaliser":
+
+        normaliser.__class__ = cls
+        normaliser.seconds = 0.0
+
+        return normaliser
+
+    def normalise(self, prefix, _id):
+
+        start = time.perf_counter()
+        curie = super().normalise(prefix, _id)
+        self.seconds += time.perf_counter() - start
+
+        return curie
+
+
+def _header(fields) -> list:
+    """
+    Column names of a field enum (without aliases and pseudo fields).
+    """
+
+    return [
+        field.value
+        for name, field in fields.__members__.items()
+        if not name.startswith("_")
+    ]
+
+
+def _write_csv(path: str, header: list, rows):
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def generate(
+    data_dir: str,
+    genes: int = 18000,
+    cell_lines: int = 1000,
+    compounds: int = 500,
+    variants: int = 700,
+    density: float = 1.0,
+    seed: int = 0,
+):
+    """
+    Write synthetic versions of all DepMap input files below `data_dir`, at
+    the locations the adapter reads them from.
+
+    Args:
+        data_dir: folder to write the `data/v0.5` tree into
+
+        genes: number of genes
+
+        cell_lines: number of cell lines
+
+        compounds: number of compounds
+
+        variants: number of sequence variants (CFEs)
+
+        density: fraction of all gene × cell line pairs in CRISPRKO (the
+            real data is dense)
+
+        seed: random seed
+    """
+
+    rng = random.Random(seed)
+
+    ids = {
+        DepMapNodeType.GENE.value: [f"GENE{i}" for i in range(genes)],
+        DepMapNodeType.CELL_LINE.value: [f"CL{i}" for i in range(cell_lines)],
+        DepMapNodeType.COMPOUND.value: [f"CPD{i}" for i in range(compounds)],
+        DepMapNodeType.SEQUENCE_VARIANT.value: [
+            f"CFE{i}_mut" for i in range(variants)
+        ],
+    }
+    gene = ids[DepMapNodeType.GENE.value]
+    cell = ids[DepMapNodeType.CELL_LINE.value]
+    cpd = ids[DepMapNodeType.COMPOUND.value]
+    cfe = ids[DepMapNodeType.SEQUENCE_VARIANT.value]
+
+    def score():
+        return f"{rng.gauss(0, 1):.4f}"
+
+    def text(width):
+        return [f"v{rng.randrange(100)}" for _ in range(width)]
+
+    for label, fields in NODE_FIELD_ENUMS.items():
+
+        header = _header(fields)
+
+        def rows():
+            for i, _id in enumerate(ids[label]):
+                row = [_id] + text(len(header) - 1)
+                if label == DepMapNodeType.GENE.value:
+                    row[1] = f"ENSG{i:011d}"
+                if label == DepMapNodeType.CELL_LINE.value and i == 1:
+                    # multi-line quoted field, as in the real cellModels
+                    row[-1] = "multi\nline"
+                yield row
+
+        _write_csv(os.path.join(data_dir, NODE_FILES[label]), header, rows())
+
+    def pairs(sources, targets, fraction):
+        for source, target in product(sources, targets):
+            if fraction >= 1 or rng.random() < fraction:
+                yield source, target
+
+    edges = {
+        DepMapEdgeType.GENE_TO_GENE.value: lambda: (
+            (rng.choice(gene), rng.choice(gene)) for _ in range(genes * 10)
+        ),
+        DepMapEdgeType.GENE_TO_CELL_LINE.value: lambda: pairs(
+            gene, cell, density
+        ),
+        DepMapEdgeType.SEQUENCE_VARIANT_TO_GENE.value: lambda: (
+            (v, rng.choice(gene)) for v in cfe
+        ),
+        DepMapEdgeType.SEQUENCE_VARIANT_TO_CELL_LINE.value: lambda: pairs(
+            cfe, cell, 0.05
+        ),
+        DepMapEdgeType.CELL_LINE_TO_COMPOUND.value: lambda: pairs(
+            cell, cpd, 0.5
+        ),
+        DepMapEdgeType.COMPOUND_TO_COMPOUND.value: lambda: pairs(
+            cpd, cpd, 1.0
+        ),
+        DepMapEdgeType.COMPOUND_TO_GENE.value: lambda: (
+            (c, rng.choice(gene)) for c in cpd for _ in range(3)
+        ),
+    }
+
+    for label, fields in EDGE_FIELD_ENUMS.items():
+
+        header = _header(fields)
+
+        def rows():
+            for source, target in edges[label]():
+                row = [source, target] + text(len(header) - 2)
+                for i, key in enumerate(header):
+                    if key == "depScoreBin":
+                        row[i] = rng.choice("01")
+                    elif key in ("depScoreNorm", "ic50", "ic50Ratio"):
+                        row[i] = score()
+                    elif key == "tanimotoSim":
+                        row[i] = f"{rng.random():.4f}"
+                yield row
+
+        _write_csv(os.path.join(data_dir, EDGE_FILES[label]), header, rows())
+
+
+def _reset_peak_rss():
+    """
+    Reset the peak resident set size of the process (Linux only).
+    """
+
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> float:
+
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _commit() -> Optional[str]:
+
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(data_dir: str, **adapter_options) -> dict:
+    """
+    Time `get_nodes` and `get_edges` for each label on the data below
+    `data_dir`.
+
+    Returns:
+        dict of rows, seconds, rows per second, peak RSS and time spent in
+        ID normalisation per label (normalisation time is only measured in
+        the main process, i.e. not with `workers` > 1)
+    """
+
+    results = {}
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+
+    try:
+
+        for kind, types in [
+            ("nodes", DepMapNodeType),
+            ("edges", DepMapEdgeType),
+        ]:
+
+            for _type in types:
+
+                if kind == "nodes":
+                    adapter = DepMapAdapter(
+                        node_types=[_type], **adapter_options
+                    )
+                    items = adapter.get_nodes
+                else:
+                    adapter = DepMapAdapter(
+                        edge_types=[_type], **adapter_options
+                    )
+                    items = adapter.get_edges
+
+                TimedNormaliser.timed(adapter.normaliser)
+
+                _reset_peak_rss()
+                start = time.perf_counter()
+
+                rows = sum(1 for _ in items())
+
+                seconds = time.perf_counter() - start
+
+                results[_type.value] = {
+                    "kind": kind,
+                    "rows": rows,
+                    "seconds": seconds,
+                    "rows_per_second": rows / seconds if seconds else None,
+                    "peak_rss_mb": _peak_rss_mb(),
+                    "normalise_seconds": adapter.normaliser.seconds,
+                    "normaliser": adapter.normaliser.cache_info(),
+                }
+
+                logger.info(
+                    f"{_type.value}: {rows} rows in {seconds:.2f} s "
+                    f"({results[_type.value]['rows_per_second'] or 0:.0f} "
+                    "rows/s)."
+                )
+
+    finally:
+
+        os.chdir(cwd)
+
+    return results
+
+
+def run_startup(
+    data_dir: str,
+    repeat: int = 5,
+    translate_to_ensg: bool = False,
+    **adapter_options,
+) -> dict:
+    """
+    Time importing `dmb.adapter`, constructing an adapter and reading the
+    first edge of a short (test mode, single label) run, each in a fresh
+    interpreter, `repeat` times.
+
+    Returns:
+        dict of the fastest import, construction and first edge seconds
+    """
+
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [package_dir, env.get("PYTHONPATH")])
+    )
+    options = dict(adapter_options, translate_to_ensg=translate_to_ensg)
+
+    runs = [
+        json.loads(
+            subprocess.check_output(
+                [sys.executable, "-c", _STARTUP_SCRIPT, json.dumps(options)],
+                cwd=data_dir,
+                env=env,
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .splitlines()[-1]
+        )
+        for _ in range(repeat)
+    ]
+
+    results = {key: min(run[key] for run in runs) for key in runs[0]}
+
+    logger.info(
+        f"Startup: import {results['import_seconds']:.3f} s, construction "
+        f"{results['construct_seconds']:.3f} s, first edge "
+        f"{results['first_edge_seconds']:.3f} s."
+    )
+
+    return results
+
+
+def run_load(
+    data_dir: str,
+    uri: str,
+    auth: Optional[tuple] = None,
+    batch_size: int = int(1e4),
+    concurrency: int = 4,
+    **adapter_options,
+) -> dict:
+    """
+    Load all nodes and edges of the data below `data_dir` into the Neo4j
+    database at `uri`.
+
+    Returns:
+        dict of rows, batches, retries, seconds and rows per second per
+        label (`Neo4jLoader.stats`)
+    """
+
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+
+    try:
+
+        with Neo4jLoader(
+            uri, auth=auth, batch_size=batch_size, concurrency=concurrency
+        ) as loader:
+            return DepMapAdapter(**adapter_options).load(loader)
+
+    finally:
+
+        os.chdir(cwd)
+
+
+def main(argv=None):
+    """
+    Generate synthetic data (unless `--data-dir` already holds it), run the
+    benchmark and write the results as JSON.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--genes", type=int, default=18000)
+    parser.add_argument("--cell-lines", type=int, default=1000)
+    parser.add_argument("--compounds", type=int, default=500)
+    parser.add_argument("--variants", type=int, default=700)
+    parser.add_argument("--density", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--data-dir",
+        help="folder with (or for) the synthetic data; a temporary folder "
+        "is used if not given",
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--file-chunk-size", type=int, default=None)
+    parser.add_argument("--prebuild-id-tables", action="store_true")
+    parser.add_argument(
+        "--reader-engine",
+        default="stdlib",
+        help="CSV reader engine: stdlib, pyarrow, polars or pandas",
+    )
+    parser.add_argument(
+        "--translate-to-ensg",
+        action="store_true",
+        help="select the ENSG pseudo field (translate gene symbols)",
+    )
+    parser.add_argument(
+        "--ensg-policy",
+        default="first",
+        help="what to do with gene symbols of several ENSG ids: first, all "
+        "or drop",
+    )
+    parser.add_argument(
+        "--neo4j-uri",
+        help="also measure online loading into this database (which it "
+        "modifies), e.g. bolt://localhost:7687",
+    )
+    parser.add_argument("--neo4j-user", default="neo4j")
+    parser.add_argument("--neo4j-password", default="neo4j")
+    parser.add_argument("--load-batch-size", type=int, default=int(1e4))
+    parser.add_argument("--load-concurrency", type=int, default=4)
+    parser.add_argument(
+        "--max-import-seconds",
+        type=float,
+        help="exit with an error if importing `dmb.adapter` takes longer",
+    )
+    parser.add_argument("--out", default="benchmark.json")
+    args = parser.parse_args(argv)
+
+    scale = {
+        "genes": args.genes,
+        "cell_lines": args.cell_lines,
+        "compounds": args.compounds,
+        "variants": args.variants,
+        "density": args.density,
+        "seed": args.seed,
+    }
+    options = {
+        "workers": args.workers,
+        "file_chunk_size": args.file_chunk_size,
+        "prebuild_id_tables": args.prebuild_id_tables,
+        "translate_to_ensg": args.translate_to_ensg,
+        "reader_engine": resolve_engine(args.reader_engine),
+        "ensg_policy": args.ensg_policy,
+    }
+
+    ensg = DepMapGeneToCellLineEdgeField._TRANSLATE_SOURCE_ID_TO_ENSG
+    edge_fields = [
+        field
+        for fields in EDGE_FIELD_ENUMS.values()
+        for field in fields
+        if field is not ensg or args.translate_to_ensg
+    ]
+
+    with tempfile.TemporaryDirectory() as temporary:
+
+        data_dir = args.data_dir or temporary
+
+        if not os.path.exists(os.path.join(data_dir, "data")):
+            logger.info(f"Generating synthetic data in `{data_dir}`.")
+            generate(data_dir, **scale)
+
+        startup = run_startup(
+            data_dir,
+            translate_to_ensg=args.translate_to_ensg,
+            reader_engine=options["reader_engine"],
+            ensg_policy=args.ensg_policy,
+        )
+
+        labels = run(
+            data_dir,
+            workers=args.workers,
+            file_chunk_size=args.file_chunk_size,
+            prebuild_id_tables=args.prebuild_id_tables,
+            reader_engine=options["reader_engine"],
+            ensg_policy=args.ensg_policy,
+            edge_fields=edge_fields,
+        )
+
+        load = (
+            run_load(
+                data_dir,
+                args.neo4j_uri,
+                auth=(args.neo4j_user, args.neo4j_password),
+                batch_size=args.load_batch_size,
+                concurrency=args.load_concurrency,
+                workers=args.workers,
+                reader_engine=options["reader_engine"],
+                ensg_policy=args.ensg_policy,
+                edge_fields=edge_fields,
+            )
+            if args.neo4j_uri
+            else None
+        )
+
+    results = {
+        "commit": _commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "scale": scale,
+        "options": options,
+        "startup": startup,
+        "labels": labels,
+        "load": load,
+    }
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    logger.info(f"Wrote benchmark results to `{args.out}`.")
+
+    if (
+        args.max_import_seconds is not None
+        and startup["import_seconds"] > args.max_import_seconds
+    ):
+        logger.error(
+            f"Importing `dmb.adapter` took {startup['import_seconds']:.3f} "
+            f"s, more than {args.max_import_seconds} s."
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,24 @@ from biocypher import BioCypher
 
 PROFILE = False
 
+# path of the input manifest (e.g. next to the BioCypher output); if set,
+# only labels whose input files or configuration changed are regenerated,
+# and the import call includes the earlier output of the other labels in
+# OUTPUT_DIRECTORY
+MANIFEST = None
+
+# BioCypher output folder (None for a new folder per run); has to be set
+# with MANIFEST so that the output of unchanged labels can be reused
+OUTPUT_DIRECTORY = None
+
+# write edges directly as neo4j-admin import files (same output as the
+# BioCypher batch writer, without a tuple per edge)
+FAST_WRITE = False
+
+# build a small graph from a seeded sample of the genes, cell lines and
+# compounds and the edges between them (None for the full graph)
+SAMPLE_FRACTION = 0.01
+
 # Configure node types and fields
 node_types = [
     DepMapNodeType.GENE,
@@ -106,7 +124,7 @@ def main():
     ###############
 
     # start biocypher
-    bc = BioCypher()
+    bc = BioCypher(output_directory=OUTPUT_DIRECTORY)
 
     # check schema
     bc.show_ontology_structure()
@@ -117,18 +135,27 @@ def main():
         node_fields=node_fields,
         edge_types=edge_types,
         edge_fields=edge_fields,
-        test_mode=True,
+        sample_fraction=SAMPLE_FRACTION,
     )
 
+    if MANIFEST:
+        depmap.skip_unchanged_labels(MANIFEST, bc)
+
     # write nodes and edges to csv
     # driver.write_nodes(depmap.get_nodes())
-    bc.write_edges(depmap.get_edges())
+    if FAST_WRITE:
+        depmap.write_edges(bc)
+    else:
+        bc.write_edges(depmap.get_edges())
 
     # convenience and stats
     bc.write_import_call()
     bc.log_missing_bl_types()
     bc.log_duplicates()
 
+    if MANIFEST:
+        depmap.write_manifest(MANIFEST)
+
     ######################
     # END OF ACTUAL CODE #
     ######################
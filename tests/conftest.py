@@ -0,0 +1,128 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from dmb.benchmark import generate
+
+REPO = Path(__file__).resolve().parent.parent
+
+# the part of the Biolink hierarchy the schema config maps to, so that
+# BioCypher runs offline
+ONTOLOGY = """\
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix ex: <http://example.org/> .
+
+ex:entity a owl:Class ; rdfs:label "entity" .
+ex:named_thing a owl:Class ; rdfs:label "named thing" ;
+    rdfs:subClassOf ex:entity .
+ex:association a owl:Class ; rdfs:label "association" ;
+    rdfs:subClassOf ex:entity .
+""" + "".join(
+    f'ex:{name.replace(" ", "_")} a owl:Class ; rdfs:label "{name}" ; '
+    f"rdfs:subClassOf ex:{parent} .\n"
+    for name, parent in [
+        ("gene", "named_thing"),
+        ("small molecule", "named_thing"),
+        ("cell line", "named_thing"),
+        ("sequence variant", "named_thing"),
+        ("pairwise gene to gene interaction", "association"),
+        ("variant to gene association", "association"),
+        ("sequence variant modulates treatment association", "association"),
+        ("chemical to chemical association", "association"),
+        ("chemical to gene association", "association"),
+        ("gene to cell line association", "association"),
+    ]
+)
+
+CONFIG = """\
+biocypher:
+  offline: true
+  strict_mode: true
+  dbms: neo4j
+  schema_config_path: {schema}
+  head_ontology:
+    url: {ontology}
+    root_node: entity
+
+neo4j:
+  database_name: neo4j
+  quote_character: '"'
+  skip_duplicate_nodes: true
+  skip_bad_relationships: true
+  file_format: csv
+"""
+
+
+@pytest.fixture(scope="session")
+def synthetic_data(tmp_path_factory):
+    """
+    Small synthetic DepMap input tree with the schema config, shared by the
+    tests (which must not modify it).
+    """
+
+    path = tmp_path_factory.mktemp("depmap")
+    generate(
+        str(path),
+        genes=60,
+        cell_lines=20,
+        compounds=15,
+        variants=20,
+        density=0.5,
+        seed=1,
+    )
+    shutil.copytree(REPO / "config", path / "config")
+
+    return path
+
+
+@pytest.fixture
+def data_dir(synthetic_data, monkeypatch):
+    """
+    Run the test in the synthetic data tree, from which the adapter reads
+    its input files.
+    """
+
+    monkeypatch.chdir(synthetic_data)
+
+    return synthetic_data
+
+
+@pytest.fixture
+def biocypher_config(tmp_path):
+    """
+    Function that writes an offline BioCypher config (Neo4j, with the test
+    ontology) for a schema config and returns its path.
+    """
+
+    ontology = tmp_path / "ontology.ttl"
+    ontology.write_text(ONTOLOGY)
+
+    def write(schema):
+
+        config = tmp_path / "biocypher_config.yaml"
+        config.write_text(CONFIG.format(schema=schema, ontology=ontology))
+
+        return str(config)
+
+    return write
+
+
+@pytest.fixture
+def ensg_data(synthetic_data, tmp_path, monkeypatch):
+    """
+    Copy of the synthetic data in which `GENE1` has a second ENSG id and
+    `GENE0` is missing from the gene file (so it has none), run from as
+    `data_dir`.
+    """
+
+    path = tmp_path / "depmap"
+    shutil.copytree(synthetic_data, path)
+    genes = path / "data" / "v0.5" / "genes" / "gene_all.csv"
+    header, gene0, gene1, *rest = genes.read_text().splitlines()
+    second = gene1.replace("ENSG00000000001", "ENSG00000099999")
+    genes.write_text("\n".join([header, gene1, second, *rest]) + "\n")
+    monkeypatch.chdir(path)
+
+    return path
@@ -0,0 +1,174 @@
+import os
+
+import pytest
+
+from dmb import _admin_import
+from dmb.adapter import DepMapAdapter
+
+biocypher = pytest.importorskip("biocypher")
+
+IMPORT_CALL = "neo4j-admin-import-call.sh"
+
+
+@pytest.fixture(params=["strings", "coerced"])
+def setup(request, data_dir, tmp_path, biocypher_config):
+    """
+    BioCypher config and adapter arguments: the full schema config, or
+    with `coerce_types` and a binary dependency score declared `bool`.
+    """
+
+    schema = data_dir / "config" / "full_schema_config.yaml"
+    kwargs = {}
+
+    if request.param == "coerced":
+        text = schema.read_text().replace(
+            "depScoreBin: float", "depScoreBin: bool"
+        )
+        schema = tmp_path / "schema_config.yaml"
+        schema.write_text(text)
+        kwargs = {"coerce_types": True, "schema_config": str(schema)}
+
+    return biocypher_config(schema), kwargs
+
+
+def _write(config, out, kwargs, direct, **options):
+    bc = biocypher.BioCypher(
+        biocypher_config_path=config, output_directory=str(out)
+    )
+    adapter = DepMapAdapter(**kwargs)
+
+    if direct:
+        assert adapter.write_edges(bc, batch_size=200, **options)
+    else:
+        assert bc.write_edges(adapter.get_edges(), batch_size=200)
+
+    bc.write_import_call()
+
+    return _read(out)
+
+
+def _read(out):
+    files = {
+        name: (out / name).read_bytes().replace(str(out).encode(), b"OUT")
+        for name in sorted(os.listdir(out))
+    }
+    # the writer keeps the files of the import call in a set
+    call = files.pop(IMPORT_CALL)
+
+    return files, sorted(call.split())
+
+
+def test_direct_path_matches_biocypher_writer(setup, tmp_path):
+    config, kwargs = setup
+
+    expected, expected_call = _write(
+        config, tmp_path / "stock", kwargs, direct=False
+    )
+    written, call = _write(config, tmp_path / "direct", kwargs, direct=True)
+
+    assert any(name.endswith("-part001.csv") for name in expected)
+    assert written == expected
+    assert call == expected_call
+
+
+def test_missing_internals_fall_back_to_biocypher_writer(
+    setup, tmp_path, monkeypatch
+):
+    config, kwargs = setup
+    monkeypatch.setattr(
+        _admin_import,
+        "_WRITER_ATTRIBUTES",
+        _admin_import._WRITER_ATTRIBUTES + ("_removed_in_this_version",),
+    )
+
+    bc = biocypher.BioCypher(
+        biocypher_config_path=config, output_directory=str(tmp_path / "bc")
+    )
+    expected = _write(config, tmp_path / "stock", kwargs, direct=False)
+
+    assert _admin_import.AdminImportWriter(bc).writer is None
+    assert _write(config, tmp_path / "direct", kwargs, direct=True) == expected
+
+
+def test_unchanged_labels_reuse_earlier_output(setup, tmp_path):
+    config, kwargs = setup
+    out = tmp_path / "incremental"
+    manifest = str(tmp_path / "manifest.json")
+
+    def run(**options):
+        bc = biocypher.BioCypher(
+            biocypher_config_path=config, output_directory=str(out)
+        )
+        adapter = DepMapAdapter(**kwargs, **options)
+        skipped = adapter.skip_unchanged_labels(manifest, bc)
+
+        if adapter.edge_types:
+            assert bc.write_edges(adapter.get_edges(), batch_size=200)
+
+        bc.write_import_call()
+        adapter.write_manifest(manifest)
+
+        return skipped["edges"], _read(out)
+
+    labels = DepMapAdapter().edge_types
+    expected = _write(config, tmp_path / "full", kwargs, direct=False)
+
+    assert run() == ([], expected)
+    assert run() == (labels, expected)
+
+    # a changed label is written again, without its earlier part files
+    policy = {"duplicate_policy": {"CRISPRKO": "keep"}}
+    expected = _write(config, tmp_path / "keep", kwargs, False, **policy)
+    skipped, written = run(**policy)
+
+    assert "CRISPRKO" not in skipped
+    assert written == expected
+
+    # an unchanged label without earlier output is written again
+    (out / "VariantToGeneAssociation-header.csv").unlink()
+    skipped, written = run(**policy)
+
+    assert skipped == [label for label in labels if label != "CFEinv"]
+    assert written == expected
+
+
+def test_damaged_shards_are_regenerated(setup, tmp_path):
+    config, kwargs = setup
+    out = tmp_path / "out"
+
+    def write(**options):
+        bc = biocypher.BioCypher(
+            biocypher_config_path=config, output_directory=str(out)
+        )
+        assert DepMapAdapter(**kwargs).write_edges(
+            bc, batch_size=100, sharded=True, shard_bytes=4096, **options
+        )
+
+    def read():
+        return {path.name: path.read_bytes() for path in out.iterdir()}
+
+    write()
+    written = read()
+    shards = _admin_import.load_shard_manifest(str(out))
+    label = "GeneKnockoutToCellLineAssociation"
+    files = [shard["file"] for shard in shards[label]["shards"]]
+
+    assert len(files) > 2
+    assert _admin_import.verify_shards(str(out)) == {}
+
+    # one shard lost, one damaged
+    (out / files[0]).unlink()
+    damaged = out / files[2]
+    damaged.write_bytes(damaged.read_bytes().replace(b"1", b"0", 1))
+
+    failed = _admin_import.verify_shards(str(out))
+    intact = os.stat(out / files[1]).st_mtime_ns
+
+    assert failed == {label: [0, 2]}
+
+    write(regenerate_shards=failed)
+
+    assert _admin_import.verify_shards(str(out)) == {}
+    assert read() == written
+    # only the failed shards were written again
+    assert os.stat(out / files[1]).st_mtime_ns == intact
@@ -0,0 +1,118 @@
+import asyncio
+import multiprocessing
+import threading
+from contextlib import aclosing
+
+import pytest
+
+from dmb._async import aiter_batches
+from dmb.adapter import DepMapAdapter
+
+
+async def _collect(batches):
+    return [batch async for batch in batches]
+
+
+def test_batches_match_generators(data_dir):
+    adapter = DepMapAdapter()
+    nodes = asyncio.run(_collect(adapter.aget_nodes(batch_size=50)))
+    edges = asyncio.run(_collect(adapter.aget_edges(batch_size=64)))
+
+    assert all(0 < len(batch) <= 50 for batch in nodes)
+    assert all(0 < len(batch) <= 64 for batch in edges)
+    assert sum(nodes, []) == list(DepMapAdapter().get_nodes())
+    assert sum(edges, []) == list(DepMapAdapter().get_edges())
+
+
+class Source:
+    """
+    Generator of `count` integers that records how far it got, whether it
+    was closed and in which thread, and raises `error` at `fail_at`.
+    """
+
+    def __init__(self, count=1000, fail_at=None, error=None):
+        self.count = count
+        self.fail_at = fail_at
+        self.error = error
+        self.produced = 0
+        self.closed = threading.Event()
+        self.thread = None
+
+    def __call__(self):
+        self.thread = threading.current_thread()
+
+        try:
+            for i in range(self.count):
+                if i == self.fail_at:
+                    raise self.error
+                self.produced += 1
+                yield i
+        finally:
+            self.closed.set()
+
+
+def test_closing_early_stops_the_generator():
+    source = Source()
+
+    async def consume():
+        async with aclosing(aiter_batches(source, 10, 2)) as batches:
+            async for batch in batches:
+                assert batch == list(range(10))
+                break
+
+    asyncio.run(consume())
+
+    assert source.closed.is_set()
+    assert source.thread is not threading.main_thread()
+    # at most the queued batches (and the one in hand) were produced
+    assert source.produced <= 10 * 4
+
+
+def test_cancelling_stops_the_generator():
+    source = Source(count=10**9)
+    started = threading.Event()
+
+    async def consume():
+        async for _ in aiter_batches(source, 10, 2):
+            started.set()
+            await asyncio.sleep(10)
+
+    async def main():
+        task = asyncio.create_task(consume())
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+
+    assert source.closed.is_set()
+
+
+def test_errors_reach_the_consumer():
+    source = Source(fail_at=25, error=ValueError("bad row"))
+    received = []
+
+    async def consume():
+        async for batch in aiter_batches(source, 10, 2):
+            received.extend(batch)
+
+    with pytest.raises(ValueError, match="bad row"):
+        asyncio.run(consume())
+
+    assert received == list(range(20))
+    assert source.closed.is_set()
+
+
+def test_closing_stops_worker_processes(data_dir):
+    adapter = DepMapAdapter(workers=2, worker_chunk_size=5)
+
+    async def consume():
+        async with aclosing(adapter.aget_edges(batch_size=5)) as batches:
+            async for _ in batches:
+                break
+
+    asyncio.run(consume())
+
+    assert not multiprocessing.active_children()
@@ -0,0 +1,65 @@
+import csv
+
+import pytest
+
+from dmb._chunks import _read_records, find_record_boundaries
+
+# a stray quote in an unquoted field, followed by quoted fields with line
+# breaks, doubled quotes and delimiters
+TRICKY = (
+    "name,text,value\n"
+    'r0,"multi\nline 0",1\n'
+    "x,5'3\" tall,1\n"
+    'r1,"multi\nline 1",2\n'
+    'r2,"say ""hi"",\nthere",3\n'
+    "r3,plain,4\n"
+    'r4,"a,b",5\n'
+    'r5,"",6\n'
+)
+
+
+def _chunked_rows(path, chunk_size):
+
+    boundaries = find_record_boundaries(str(path), chunk_size)
+    rows = list(_read_records(str(path), 0, boundaries[0]))
+
+    for start, end in zip(boundaries, boundaries[1:]):
+        rows.extend(_read_records(str(path), start, end))
+
+    return rows
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 10, 20, 50, 1000])
+def test_chunks_match_csv_reader(tmp_path, chunk_size):
+
+    path = tmp_path / "tricky.csv"
+    path.write_text(TRICKY)
+
+    with open(path, newline="") as f:
+        expected = list(csv.reader(f))
+
+    assert len(expected) == 8
+    assert _chunked_rows(path, chunk_size) == expected
+
+
+def test_every_record_is_a_chunk(tmp_path):
+
+    path = tmp_path / "tricky.csv"
+    path.write_text(TRICKY)
+
+    boundaries = find_record_boundaries(str(path), 1)
+
+    # the header and 7 records, each in its own chunk
+    assert len(boundaries) == 8
+    assert boundaries[-1] == len(TRICKY.encode())
+
+    for start, end in zip(boundaries, boundaries[1:]):
+        assert len(list(_read_records(str(path), start, end))) == 1
+
+
+def test_empty_file(tmp_path):
+
+    path = tmp_path / "empty.csv"
+    path.write_text("")
+
+    assert find_record_boundaries(str(path), 10) == [0]
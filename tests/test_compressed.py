@@ -0,0 +1,80 @@
+import bz2
+import gzip
+import lzma
+import shutil
+
+import pytest
+
+from dmb import _io
+from dmb.adapter import EDGE_FILES, NODE_FILES, DepMapAdapter
+
+
+def _zstd():
+    try:
+        from compression import zstd
+    except ImportError:
+        try:
+            from backports import zstd
+        except ImportError:
+            zstd = pytest.importorskip("zstandard")
+
+    return zstd
+
+
+COMPRESSORS = {
+    ".gz": lambda: gzip,
+    ".bz2": lambda: bz2,
+    ".xz": lambda: lzma,
+    ".zst": _zstd,
+}
+
+
+def _output(adapter):
+    return list(adapter.get_nodes()), list(adapter.get_edges())
+
+
+@pytest.fixture
+def serial(data_dir):
+    return _output(DepMapAdapter())
+
+
+@pytest.fixture(params=_io.COMPRESSED_SUFFIXES)
+def compressed(request, synthetic_data, tmp_path, monkeypatch):
+    """
+    Copy of the synthetic data with every input file compressed (and the
+    uncompressed file removed).
+    """
+
+    module = COMPRESSORS[request.param]()
+    path = tmp_path / "depmap"
+    shutil.copytree(synthetic_data, path)
+
+    for name in [*NODE_FILES.values(), *EDGE_FILES.values()]:
+        plain = path / name
+        with module.open(str(plain) + request.param, "wb") as f:
+            f.write(plain.read_bytes())
+        plain.unlink()
+
+    monkeypatch.chdir(path)
+
+    return path
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"workers": 2, "file_chunk_size": 4096}],
+    ids=["serial", "parallel"],
+)
+def test_compressed_inputs_match_plain(serial, compressed, options):
+    assert _output(DepMapAdapter(**options)) == serial
+
+
+@pytest.mark.parametrize("threaded", [True, False])
+def test_open_input(synthetic_data, compressed, threaded):
+    name = EDGE_FILES["CRISPRKO"]
+    expected = (synthetic_data / name).read_text()
+
+    assert _io.resolve_input(name) != name
+
+    with _io.open_input(name, threaded=threaded) as f:
+        assert f.read() == expected
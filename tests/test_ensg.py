@@ -0,0 +1,74 @@
+from collections import Counter
+
+import pytest
+
+from dmb.adapter import (
+    EDGE_FILES,
+    DepMapAdapter,
+    DepMapEdgeType,
+    DepMapGeneToCellLineEdgeField,
+)
+
+FIELDS = [
+    DepMapGeneToCellLineEdgeField._TRANSLATE_SOURCE_ID_TO_ENSG,
+    DepMapGeneToCellLineEdgeField.DEPENDENCY_SCORE_BINARY,
+]
+
+# the ENSG ids of `GENE1` in `ensg_data`
+GENE1 = ["ensembl:ENSG00000000001", "ensembl:ENSG00000099999"]
+
+
+def _adapter(policy, **options):
+    return DepMapAdapter(
+        edge_types=[DepMapEdgeType.GENE_TO_CELL_LINE],
+        edge_fields=FIELDS,
+        ensg_policy=policy,
+        **options,
+    )
+
+
+@pytest.fixture
+def symbols(ensg_data):
+    with open(EDGE_FILES["CRISPRKO"]) as f:
+        next(f)
+        return Counter(line.split(",")[0] for line in f)
+
+
+@pytest.mark.parametrize(
+    "policy, ids",
+    [("first", GENE1[:1]), ("all", GENE1), ("drop", [])],
+)
+def test_policies(symbols, policy, ids):
+    adapter = _adapter(policy)
+    edges = list(adapter.get_edges())
+    sources = Counter(edge[0] for edge in edges)
+    others = sum(symbols.values()) - symbols["GENE0"] - symbols["GENE1"]
+
+    assert symbols["GENE0"] and symbols["GENE1"]
+    assert adapter._ensg_table.ambiguous() == 1
+    assert adapter.symbol_to_ensg.get("GENE1") == (
+        tuple(ids) if len(ids) > 1 else (ids[0] if ids else None)
+    )
+    assert "GENE0" not in adapter.symbol_to_ensg
+    assert {_id: sources[_id] for _id in GENE1 if sources[_id]} == {
+        _id: symbols["GENE1"] for _id in ids
+    }
+    assert len(edges) == others + len(ids) * symbols["GENE1"]
+
+
+@pytest.mark.parametrize("policy", ["first", "all", "drop"])
+def test_batches_and_workers_follow_policy(ensg_data, policy):
+    expected = list(_adapter(policy).get_edges())
+    rows = [
+        row[:3]
+        for batch in _adapter(policy).get_edge_batches(batch_size=7)
+        for row in batch.rows()
+    ]
+
+    assert rows == [edge[:3] for edge in expected]
+    assert list(_adapter(policy, workers=2).get_edges()) == expected
+
+
+def test_unknown_policy(data_dir):
+    with pytest.raises(ValueError, match="Unknown ENSG policy"):
+        _adapter("some")
@@ -0,0 +1,277 @@
+import math
+
+import pytest
+
+from dmb import _cache
+from dmb._columnar import float_column
+from dmb.adapter import DepMapAdapter, DepMapEdgeType
+
+
+def _output(adapter):
+    return list(adapter.get_nodes()), list(adapter.get_edges())
+
+
+def _number(value):
+    # batches carry the numeric columns as doubles (NaN if empty)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return value
+
+    return None if math.isnan(value) else value
+
+
+def _numbers(edges):
+    return [
+        (*edge[:3], {key: _number(value) for key, value in edge[3].items()})
+        for edge in edges
+    ]
+
+
+@pytest.fixture
+def serial(data_dir):
+    return _output(DepMapAdapter())
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"workers": 2},
+        {"workers": 3, "worker_chunk_size": 7},
+        {"workers": 2, "file_chunk_size": 4096},
+        {"workers": 2, "file_chunk_size": 300, "worker_chunk_size": 5},
+    ],
+    ids=["workers", "small-chunks", "file-chunks", "small-file-chunks"],
+)
+def test_parallel_matches_serial(serial, options):
+    assert _output(DepMapAdapter(**options)) == serial
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cache_matches_serial(serial, tmp_path, workers):
+    cache = str(tmp_path / "cache")
+
+    # the first pass fills the cache, the second reads from it
+    for _ in range(2):
+        assert _output(DepMapAdapter(cache_dir=cache, workers=workers)) == (
+            serial
+        )
+
+
+def test_cache_with_bounded_tables(serial, tmp_path, monkeypatch):
+    # values are forgotten (and stored again) after a few distinct ones,
+    # and offsets are flushed in small blocks
+    monkeypatch.setattr(_cache, "_TABLE_SIZE", 3)
+    monkeypatch.setattr(_cache, "_FLUSH_SIZE", 5)
+    cache = str(tmp_path / "cache")
+
+    for _ in range(2):
+        assert _output(DepMapAdapter(cache_dir=cache)) == serial
+
+
+def test_cache_keeps_coerced_types(data_dir, tmp_path):
+    expected = _output(DepMapAdapter(coerce_types=True))
+    cache = str(tmp_path / "cache")
+
+    for _ in range(2):
+        output = _output(DepMapAdapter(cache_dir=cache, coerce_types=True))
+        assert output == expected
+
+
+def test_cache_is_not_shared_between_configurations(serial, tmp_path):
+    cache = str(tmp_path / "cache")
+    _output(DepMapAdapter(cache_dir=cache))
+
+    assert _output(DepMapAdapter(cache_dir=cache, sample_count=5)) == (
+        _output(DepMapAdapter(sample_count=5))
+    )
+    assert _output(DepMapAdapter(cache_dir=cache)) == serial
+
+
+@pytest.mark.parametrize("coerce_types", [False, True])
+@pytest.mark.parametrize("batch_size", [1, 64, int(1e5)])
+def test_batches_match_edges(data_dir, batch_size, coerce_types):
+    expected = list(DepMapAdapter(coerce_types=coerce_types).get_edges())
+    adapter = DepMapAdapter(coerce_types=coerce_types)
+    rows = [
+        row
+        for batch in adapter.get_edge_batches(batch_size=batch_size)
+        for row in batch.rows()
+    ]
+
+    assert _numbers(rows) == _numbers(expected)
+
+
+def test_float_column_strips_quotes():
+    column = float_column(['"0.5"', "1", '"NA"', "", '"x"'])
+
+    assert list(column[:2]) == [0.5, 1.0]
+    assert all(math.isnan(value) for value in column[2:])
+
+
+def _keys(edges):
+    return [edge[:3] for edge in edges]
+
+
+@pytest.mark.parametrize("mode", ["exact", "bloom"])
+def test_deduplicate_drops_repeated_pairs(data_dir, mode):
+    edges = list(DepMapAdapter().get_edges())
+    adapter = DepMapAdapter(deduplicate=mode)
+    deduplicated = list(adapter.get_edges())
+
+    expected = list(dict.fromkeys(_keys(edges)))
+    report = adapter.duplicate_report
+
+    assert len(expected) < len(edges)
+    assert _keys(deduplicated) == expected
+    assert sum(counts["checked"] for counts in report.values()) == len(edges)
+    assert sum(counts["duplicates"] for counts in report.values()) == (
+        len(edges) - len(expected)
+    )
+
+
+def test_duplicate_policies(data_dir):
+    edges = list(DepMapAdapter().get_edges())
+    labels = {edge[2] for edge in edges}
+    dropping = DepMapAdapter(deduplicate="exact")
+    dropped = list(dropping.get_edges())
+
+    kept = DepMapAdapter(
+        deduplicate="exact",
+        duplicate_policy={label: "keep" for label in labels},
+    )
+    merged = DepMapAdapter(
+        deduplicate="exact",
+        duplicate_policy={label: "merge" for label in labels},
+    )
+
+    assert list(kept.get_edges()) == edges
+    assert kept.duplicate_report == dropping.duplicate_report
+
+    merged_edges = list(merged.get_edges())
+
+    assert _keys(merged_edges) == _keys(dropped)
+
+    # merged rows take the first non-empty value of each property
+    first = {}
+
+    for edge in edges:
+        properties = first.setdefault(edge[:3], dict(edge[3]))
+
+        for key, value in edge[3].items():
+            if properties.get(key) in (None, ""):
+                properties[key] = value
+
+    assert [edge[3] for edge in merged_edges] == [
+        first[edge[:3]] for edge in merged_edges
+    ]
+
+
+@pytest.mark.parametrize("intern_ids", [False, True])
+@pytest.mark.parametrize("mode", ["exact", "bloom"])
+def test_batches_deduplicate_as_edges(data_dir, mode, intern_ids):
+    expected = list(DepMapAdapter(deduplicate=mode).get_edges())
+    adapter = DepMapAdapter(deduplicate=mode)
+    rows = [
+        row
+        for batch in adapter.get_edge_batches(
+            batch_size=50, intern_ids=intern_ids
+        )
+        for row in batch.rows()
+    ]
+
+    assert _numbers(rows) == _numbers(expected)
+
+
+def test_interned_batches(data_dir):
+    expected = list(DepMapAdapter(check_references=True).get_edges())
+    adapter = DepMapAdapter(check_references=True)
+    registries = []
+
+    for _ in range(2):
+
+        batches = list(
+            adapter.get_edge_batches(batch_size=50, intern_ids=True)
+        )
+        rows = [row for batch in batches for row in batch.rows()]
+        registry = batches[0].registry
+
+        assert _numbers(rows) == _numbers(expected)
+        assert all(batch.registry is registry for batch in batches)
+        assert all(batch.source_ids.typecode == "i" for batch in batches)
+
+        registries.append(registry)
+
+    # every pass interns into a registry of its own
+    assert registries[0] is not registries[1]
+    assert len(registries[0]) == len(registries[1])
+
+
+def test_coercion(data_dir):
+    strings = list(DepMapAdapter().get_edges())
+    adapter = DepMapAdapter(coerce_types=True)
+    coerced = list(adapter.get_edges())
+
+    assert _keys(coerced) == _keys(strings)
+
+    checked = 0
+
+    for label, types in adapter.property_types.items():
+        for string, value in zip(strings, coerced):
+
+            if string[2] != label:
+                continue
+
+            for key, _type in types.items():
+
+                if key not in string[3]:
+                    continue
+
+                raw, converted = string[3][key], value[3][key]
+
+                if converted is None:
+                    continue
+
+                assert (
+                    type(converted)
+                    is {
+                        "int": int,
+                        "float": float,
+                        "bool": bool,
+                    }[_type]
+                )
+
+                if _type != "bool":
+                    assert converted == float(raw.replace('"', ""))
+
+                checked += 1
+
+    assert checked
+
+
+def test_coercion_report(data_dir, tmp_path):
+    schema = tmp_path / "schema_config.yaml"
+    schema.write_text(
+        (data_dir / "config" / "full_schema_config.yaml")
+        .read_text()
+        .replace("depScoreNorm: float", "depScoreNorm: bool")
+    )
+    adapter = DepMapAdapter(
+        coerce_types=True,
+        schema_config=str(schema),
+        edge_types=[DepMapEdgeType.GENE_TO_CELL_LINE],
+    )
+    edges = list(adapter.get_edges())
+    failed = adapter.get_coercion_report()["CRISPRKO"]["depScoreNorm"]
+
+    assert failed == sum(edge[3].get("depScoreNorm") is None for edge in edges)
+    assert failed > 0
+
+    # each pass reports its own failures
+    list(adapter.get_edges())
+    assert adapter.get_coercion_report()["CRISPRKO"]["depScoreNorm"] == failed
+
+    for batch in adapter.get_edge_batches(batch_size=50):
+        pass
+
+    assert adapter.get_coercion_report()["CRISPRKO"]["depScoreNorm"] == failed
@@ -0,0 +1,109 @@
+import pytest
+
+from dmb._filters import TopKSelection
+from dmb.adapter import (
+    DepMapAdapter,
+    DepMapEdgeType,
+    DepMapGeneToCellLineEdgeField,
+)
+
+ROWS = [
+    ["A", "B", "0.9"],
+    ["B", "A", "0.9"],
+    ["A", "C", "0.5"],
+    ["C", "A", "0.5"],
+    ["B", "C", "0.3"],
+    ["C", "B", "0.3"],
+]
+
+
+def _pairs(rows):
+    return [(row[0], row[1]) for row in rows]
+
+
+@pytest.mark.parametrize(
+    "k, symmetric, expected",
+    [
+        (1, False, [("A", "B"), ("B", "A"), ("C", "A")]),
+        (1, True, [("A", "B"), ("B", "A"), ("A", "C"), ("C", "A")]),
+        (2, False, _pairs(ROWS)),
+        (2, True, _pairs(ROWS)),
+    ],
+)
+def test_top_k(k, symmetric, expected):
+    selection = TopKSelection(2, k, symmetric)
+
+    assert _pairs(selection.select(ROWS)) == expected
+    assert selection.rows == len(ROWS)
+    assert selection.kept == len(expected)
+    assert selection.mirrored == 0
+
+
+def test_duplicate_pairs_take_one_place():
+    rows = [["A", "B", "0.2"], ["A", "B", "0.9"], ["A", "C", "0.5"]]
+
+    assert TopKSelection(2, 1).select(rows) == [["A", "B", "0.9"]]
+    assert TopKSelection(2, 2).select(rows) == rows[1:]
+
+
+def test_symmetric_mirrors_missing_direction():
+    rows = [["A", "B", "0.9"], ["C", "A", "0.5"], ["C", "B", "0.7"]]
+    selection = TopKSelection(2, 1, symmetric=True)
+
+    assert selection.select(rows) == [
+        ["A", "B", "0.9"],
+        ["B", "A", "0.9"],
+        ["C", "B", "0.7"],
+        ["B", "C", "0.7"],
+    ]
+    assert selection.kept == 2
+    assert selection.mirrored == 2
+
+
+def test_rows_without_score_are_dropped():
+    rows = [["A", "B", ""], ["A", "C", "nan"], ["A", "D", "0.1"]]
+
+    assert TopKSelection(2, 3).select(rows) == [["A", "D", "0.1"]]
+
+
+FILTER = (DepMapGeneToCellLineEdgeField.DEPENDENCY_SCORE_BINARY, "==", 1)
+
+
+def _crisprko(edges):
+    return [edge for edge in edges if edge[2] == "CRISPRKO"]
+
+
+def test_edge_filter(data_dir):
+    adapter = DepMapAdapter(
+        edge_types=[DepMapEdgeType.GENE_TO_CELL_LINE], edge_filters=[FILTER]
+    )
+    edges = _crisprko(adapter.get_edges())
+    everything = _crisprko(
+        DepMapAdapter(
+            edge_types=[DepMapEdgeType.GENE_TO_CELL_LINE]
+        ).get_edges()
+    )
+
+    assert edges
+    assert len(edges) < len(everything)
+    assert all(edge[3]["depScoreBin"] == "1" for edge in edges)
+
+    [entry] = adapter.get_filter_report()["CRISPRKO"]
+    assert entry["rows"] == len(everything)
+    assert entry["passed"] == len(edges)
+
+
+def test_filter_report_is_reset_per_pass(data_dir):
+    adapter = DepMapAdapter(
+        edge_types=[DepMapEdgeType.GENE_TO_CELL_LINE], edge_filters=[FILTER]
+    )
+
+    list(adapter.get_edges())
+    first = adapter.get_filter_report()
+    list(adapter.get_edges())
+
+    assert adapter.get_filter_report() == first
+
+    list(adapter.get_edge_batches())
+
+    assert adapter.get_filter_report() == first
@@ -0,0 +1,105 @@
+import math
+from collections import defaultdict
+
+import pytest
+
+from dmb._graph import CsrGraph, StringColumn
+from dmb.adapter import NUMERIC_EDGE_FIELDS, DepMapAdapter
+
+
+def _same(value, expected, numeric):
+    if not numeric:
+        return value == expected
+
+    if expected is None or expected == "":
+        return math.isnan(value)
+
+    return value == float(expected)
+
+
+@pytest.mark.parametrize("load", [None, False, True])
+def test_graph_matches_edges(data_dir, tmp_path, load):
+    adapter = DepMapAdapter()
+    path = str(tmp_path / "graph") if load is not None else None
+    graph = adapter.build_graph(path)
+
+    if load is not None:
+        graph = CsrGraph.load(path, use_numpy=load)
+
+    out_edges = defaultdict(list)
+    in_edges = defaultdict(list)
+
+    for source, target, label, properties in adapter.get_edges():
+        if source is not None and target is not None:
+            out_edges[source, label].append((target, properties))
+            in_edges[target, label].append(source)
+
+    assert sum(len(layer) for layer in graph.layers.values()) == sum(
+        map(len, out_edges.values())
+    )
+
+    for (source, label), expected in out_edges.items():
+
+        assert graph.neighbours(source, label) == [t for t, _ in expected]
+        assert graph.degree(source, label) == len(expected)
+
+        for name in expected[0][1]:
+            values = graph.edge_values(source, label, name)
+            numeric = name in NUMERIC_EDGE_FIELDS
+
+            assert all(
+                _same(value, properties[name], numeric)
+                for value, (_, properties) in zip(values, expected)
+            )
+
+    for (target, label), expected in in_edges.items():
+        assert sorted(graph.neighbours(target, label, "in")) == sorted(
+            expected
+        )
+
+
+def test_property_columns_follow_declared_types(data_dir):
+    graph = DepMapAdapter().build_graph()
+    layer = graph.layers["CRISPRKO"]
+
+    assert not isinstance(layer.properties["depScoreNorm"], StringColumn)
+    assert isinstance(layer.properties["source"], StringColumn)
+    assert layer.properties["source"].values == ["DepMap"]
+
+    # integers that are not among the numeric fields stay strings
+    assert isinstance(
+        graph.layers["gene_int"].properties["isDirected"], StringColumn
+    )
+
+
+def test_property_columns_with_coerced_types(data_dir):
+    adapter = DepMapAdapter(
+        coerce_types=True, schema_config="config/full_schema_config.yaml"
+    )
+    graph = adapter.build_graph()
+
+    # declared `int`, so numeric (and NaN where not a number)
+    column = graph.layers["gene_int"].properties["isDirected"]
+    assert not isinstance(column, StringColumn)
+    assert len(column) == len(graph.layers["gene_int"])
+
+
+def test_k_hop(data_dir):
+    adapter = DepMapAdapter()
+    graph = adapter.build_graph()
+    compound = next(
+        source
+        for source, _, label, _ in adapter.get_edges()
+        if label == "compoundTarget"
+    )
+
+    hops = graph.k_hop(compound, 2, "compoundTarget", direction="both")
+    targets = set(graph.neighbours(compound, "compoundTarget"))
+
+    assert {_id for _id, hop in hops.items() if hop == 1} == targets
+    assert all(
+        _id in hops
+        for target in targets
+        for _id in graph.neighbours(target, "compoundTarget", "in")
+        if _id != compound
+    )
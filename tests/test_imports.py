@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from dmb.adapter import (
+    DepMapAdapter,
+    DepMapEdgeType,
+    DepMapGeneToCellLineEdgeField,
+)
+
+REPO = Path(__file__).resolve().parent.parent
+
+# packages that are only imported when a feature needs them
+LAZY = ("bioregistry", "biocypher", "neo4j", "numpy", "pandas", "polars")
+
+
+def _imported(code):
+    """
+    Top-level packages imported by running `code` in a fresh interpreter.
+    """
+
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            code + "\nimport sys\nprint(' '.join(sys.modules))",
+        ],
+        check=True,
+        cwd=REPO,
+        env={**os.environ, "PYTHONPATH": str(REPO)},
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    return {name.split(".")[0] for name in output.split()}
+
+
+@pytest.mark.parametrize("module", ["dmb.adapter", "dmb.benchmark"])
+def test_import_is_light(module):
+    assert not _imported(f"import {module}") & set(LAZY)
+
+
+def test_ensg_table_is_built_on_first_use(data_dir):
+    adapter = DepMapAdapter(
+        edge_types=[DepMapEdgeType.GENE_TO_CELL_LINE],
+        edge_fields=[
+            DepMapGeneToCellLineEdgeField._TRANSLATE_SOURCE_ID_TO_ENSG,
+        ],
+    )
+
+    assert adapter.ensg_edge_types == {"CRISPRKO"}
+    assert adapter._ensg_table is None
+
+    edge = next(iter(adapter.get_edges()))
+
+    assert adapter._ensg_table is not None
+    assert edge[0].startswith("ensembl:")
@@ -0,0 +1,238 @@
+import csv
+import threading
+from collections import Counter
+
+import pytest
+
+from dmb import _loader
+from dmb._loader import Neo4jLoader, biocypher_labels
+from dmb.adapter import (
+    DepMapAdapter,
+    DepMapEdgeType,
+    DepMapNodeType,
+    DepMapGeneToCellLineEdgeField,
+)
+
+
+class Transient(Exception):
+    pass
+
+
+class Result:
+    def __init__(self, record=None):
+        self.record = record
+
+    def consume(self):
+        pass
+
+    def single(self):
+        return self.record
+
+
+class Transaction:
+    def __init__(self, driver):
+        self.driver = driver
+        self.runs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def run(self, query, rows):
+        with self.driver.lock:
+            self.driver.attempts += 1
+            if self.driver.attempts in self.driver.failing:
+                raise Transient(f"attempt {self.driver.attempts}")
+
+        self.runs.append((query, rows))
+
+        return Result()
+
+    def commit(self):
+        with self.driver.lock:
+            self.driver.committed.extend(self.runs)
+
+
+class Session:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def begin_transaction(self):
+        return Transaction(self.driver)
+
+    def run(self, query, **parameters):
+        with self.driver.lock:
+            self.driver.statements.append(query)
+
+        return Result({"deleted": 0})
+
+
+class Driver:
+    """
+    Driver that records committed batches and statements, and fails the
+    transactions of the given attempts with a transient error.
+    """
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.attempts = 0
+        self.committed = []
+        self.statements = []
+        self.lock = threading.Lock()
+
+    def session(self, database=None):
+        return Session(self)
+
+    def close(self):
+        pass
+
+    def rows(self, keyword):
+        return [
+            row
+            for query, rows in self.committed
+            if keyword in query
+            for row in rows
+        ]
+
+
+@pytest.fixture(autouse=True)
+def transient(monkeypatch):
+    monkeypatch.setattr(_loader, "_transient_errors", lambda: (Transient,))
+    monkeypatch.setattr(_loader.time, "sleep", lambda seconds: None)
+
+
+def _edges(count):
+    return [
+        (f"s{i % 7}", f"t{i % 5}", "CRISPRKO", {"i": i}) for i in range(count)
+    ]
+
+
+def test_transient_errors_are_retried(transient):
+    driver = Driver(failing={1, 4, 5, 9})
+    loader = Neo4jLoader(driver=driver, batch_size=10, concurrency=3)
+    edges = _edges(95)
+
+    assert loader.load_edges("CRISPRKO", iter(edges)) == len(edges)
+
+    sent = driver.rows("CREATE")
+    stats = loader.stats["CRISPRKO"]
+
+    assert sorted(row["properties"]["i"] for row in sent) == list(range(95))
+    assert stats["batches"] == 10
+    assert stats["retries"] == 4
+    assert stats["rows"] == len(edges)
+
+
+def test_retries_are_bounded(transient):
+    driver = Driver(failing=range(1, 100))
+    loader = Neo4jLoader(driver=driver, batch_size=10, max_retries=2)
+
+    with pytest.raises(Transient):
+        loader.load_edges("CRISPRKO", iter(_edges(10)))
+
+    assert driver.attempts == 3
+    assert not driver.committed
+
+
+def test_parallel_edges_are_kept(transient):
+    driver = Driver()
+    loader = Neo4jLoader(driver=driver, batch_size=10)
+    edges = [("s", "t", "CRISPRKO", {"screen": screen}) for screen in "ab"]
+
+    loader.load_edges("CRISPRKO", iter(edges), "gene", "cellModel")
+
+    ((query, rows),) = driver.committed
+
+    assert "CREATE (s)-[r:`CRISPRKO`]->(t)" in query
+    assert "MERGE" not in query
+    assert [row["properties"] for row in rows] == [
+        {"screen": "a"},
+        {"screen": "b"},
+    ]
+
+
+def test_replace_deletes_before_loading(transient):
+    driver = Driver()
+    loader = Neo4jLoader(driver=driver, labels={"CRISPRKO": "Knockout"})
+
+    loader.load_edges("CRISPRKO", iter(_edges(3)), replace=True)
+
+    (statement,) = driver.statements
+
+    assert "MATCH ()-[r:`Knockout`]->()" in statement
+    assert "DELETE r" in statement
+    assert len(driver.rows("CREATE")) == 3
+
+
+def test_nodes_get_all_labels(transient):
+    driver = Driver()
+    loader = Neo4jLoader(
+        driver=driver, labels={"gene": ["Gene", "NamedThing", "Entity"]}
+    )
+
+    loader.load_nodes("gene", iter([("g", "gene", {})]))
+    loader.load_edges("CRISPRKO", iter(_edges(1)), source_label="gene")
+
+    (index,) = driver.statements
+    (node_query, _), (edge_query, _) = driver.committed
+
+    assert "(n:`Gene`)" in index
+    assert "MERGE (n:`Gene` {id: row.id})" in node_query
+    assert "SET n:`NamedThing`:`Entity`" in node_query
+    assert "MATCH (s:`Gene` {id: row.source})" in edge_query
+
+
+def test_ensg_edges_are_loaded_from_gene_nodes(data_dir, transient):
+    adapter = DepMapAdapter(
+        node_types=[DepMapNodeType.GENE, DepMapNodeType.CELL_LINE],
+        edge_types=[DepMapEdgeType.GENE_TO_CELL_LINE],
+        edge_fields=[
+            DepMapGeneToCellLineEdgeField._TRANSLATE_SOURCE_ID_TO_ENSG,
+            DepMapGeneToCellLineEdgeField.DEPENDENCY_SCORE_BINARY,
+        ],
+    )
+    edges = list(adapter.get_edges())
+    driver = Driver()
+
+    adapter.load(Neo4jLoader(driver=driver))
+
+    genes = {row["id"] for row in driver.rows("MERGE (n:`gene`")}
+    loaded = driver.rows("CREATE")
+
+    assert all(edge[0].startswith("ensembl:") for edge in edges)
+    assert len(loaded) == len(edges)
+    assert {row["source"] for row in loaded} <= genes
+    assert Counter(row["target"] for row in loaded) == Counter(
+        edge[1] for edge in edges
+    )
+
+
+def test_node_labels_match_biocypher(data_dir, tmp_path, biocypher_config):
+    biocypher = pytest.importorskip("biocypher")
+    config = biocypher_config(data_dir / "config" / "full_schema_config.yaml")
+    out = tmp_path / "out"
+    bc = biocypher.BioCypher(
+        biocypher_config_path=config, output_directory=str(out)
+    )
+    adapter = DepMapAdapter(
+        node_types=[DepMapNodeType.GENE],
+        edge_types=[DepMapEdgeType.GENE_TO_CELL_LINE],
+    )
+
+    assert bc.write_nodes(adapter.get_nodes())
+
+    (part,) = out.glob("Gene-part*.csv")
+    written = {row[-1] for row in csv.reader(open(part))}
+    labels = biocypher_labels(bc, ["gene", "CRISPRKO"])
+
+    assert written == {";".join(labels["gene"])}
+    assert labels["gene"][0] == "Gene"
+    assert labels["CRISPRKO"] == "GeneKnockoutToCellLineAssociation"
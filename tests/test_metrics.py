@@ -0,0 +1,90 @@
+import csv
+from collections import Counter
+
+import pytest
+
+from dmb.adapter import (
+    EDGE_FILES,
+    DepMapAdapter,
+    DepMapEdgeType,
+    DepMapGeneToCellLineEdgeField,
+)
+
+ENSG_FIELDS = [
+    DepMapGeneToCellLineEdgeField._TRANSLATE_SOURCE_ID_TO_ENSG,
+    DepMapGeneToCellLineEdgeField.DEPENDENCY_SCORE_BINARY,
+]
+
+
+def _rows(label):
+    with open(EDGE_FILES[label], newline="") as f:
+        return list(csv.reader(f))[1:]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_counts_match_output(data_dir, workers):
+    adapter = DepMapAdapter(metrics=True, workers=workers)
+    emitted = Counter(edge[2] for edge in adapter.get_edges())
+    metrics = adapter.get_metrics()["labels"]
+
+    assert set(emitted) <= set(metrics)
+
+    for label in EDGE_FILES:
+        counts = metrics[label]
+        assert counts["kind"] == "edges"
+        assert counts["rows_read"] == len(_rows(label))
+        assert counts["rows_emitted"] == emitted[label]
+        assert counts["rows_read"] == counts["rows_emitted"] + sum(
+            counts["rows_dropped"].values()
+        )
+
+
+def test_filtered_and_duplicate_rows(data_dir):
+    adapter = DepMapAdapter(
+        metrics=True,
+        deduplicate="exact",
+        edge_types=[
+            DepMapEdgeType.GENE_TO_GENE,
+            DepMapEdgeType.GENE_TO_CELL_LINE,
+        ],
+        edge_filters=[
+            (DepMapGeneToCellLineEdgeField.DEPENDENCY_SCORE_BINARY, "==", 1)
+        ],
+    )
+    emitted = Counter(edge[2] for edge in adapter.get_edges())
+    metrics = adapter.get_metrics()["labels"]
+
+    rows = _rows("CRISPRKO")
+    passed = [row for row in rows if row[2] == "1"]
+    pairs = [tuple(row[:2]) for row in _rows("gene_int")]
+
+    assert metrics["CRISPRKO"]["rows_dropped"] == {
+        "filtered": len(rows) - len(passed)
+    }
+    assert metrics["gene_int"]["rows_dropped"] == {
+        "duplicate": len(pairs) - len(set(pairs))
+    }
+    assert emitted["CRISPRKO"] == len(passed)
+    assert emitted["gene_int"] == len(set(pairs))
+
+
+def test_ensg_drop_reasons(ensg_data):
+    adapter = DepMapAdapter(
+        metrics=True,
+        edge_types=[DepMapEdgeType.GENE_TO_CELL_LINE],
+        edge_fields=ENSG_FIELDS,
+        ensg_policy="drop",
+    )
+    edges = list(adapter.get_edges())
+    counts = adapter.get_metrics()["labels"]["CRISPRKO"]
+    sources = Counter(row[0] for row in _rows("CRISPRKO"))
+
+    assert sources["GENE0"] and sources["GENE1"]
+    assert counts["rows_dropped"] == {
+        "source_not_in_ensg_table": sources["GENE0"],
+        "source_ensg_ambiguous": sources["GENE1"],
+    }
+    assert counts["rows_emitted"] == len(edges)
+    assert len(edges) == sum(sources.values()) - sources["GENE0"] - (
+        sources["GENE1"]
+    )
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from dmb import _parallel
+from dmb._parallel import iter_parallel
+
+
+class _Producer:
+    """
+    Picklable stand-in for the adapter: yields the items of a label, and
+    fails or exits on the labels named so.
+    """
+
+    def items(self, label):
+
+        for i in range(25):
+            yield (label, i)
+
+            if i == 10 and label == "raise":
+                raise ValueError("failed")
+
+            if i == 10 and label == "exit":
+                os._exit(3)
+
+
+def _run(labels, workers=2):
+    return list(iter_parallel(_Producer(), "items", labels, workers, 4, 2))
+
+
+def test_output_in_label_order():
+    labels = ["a", "b", "c", "d", "e"]
+
+    assert _run(labels) == [
+        item for label in labels for item in _Producer().items(label)
+    ]
+
+
+def test_worker_exception_is_raised():
+    with pytest.raises(RuntimeError, match="`raise` failed"):
+        _run(["a", "raise", "b"])
+
+
+def test_dead_worker_is_detected(monkeypatch):
+    monkeypatch.setattr(_parallel, "_POLL_INTERVAL", 0.05)
+
+    with pytest.raises(RuntimeError, match="`exit` exited with code 3"):
+        _run(["a", "exit", "b"])
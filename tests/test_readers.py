@@ -0,0 +1,182 @@
+import bz2
+import csv
+import gzip
+import lzma
+
+import pytest
+
+from dmb import _readers
+from dmb._io import open_input
+from dmb._readers import READER_ENGINES, CsvRows, _installed
+
+ENGINES = [
+    pytest.param(
+        engine,
+        marks=pytest.mark.skipif(
+            not _installed(engine), reason=f"{engine} is not installed"
+        ),
+    )
+    for engine in READER_ENGINES
+]
+
+# unquoted rows of three fields
+PLAIN = "".join(f"id{i},{i},{'' if i % 3 else 'x'}\n" for i in range(200))
+
+# quoted fields with line breaks, delimiters and doubled quotes, and a stray
+# quote in an unquoted field
+QUOTED = (
+    "name,text,value\n"
+    'r0,"multi\nline 0",1\n'
+    "x,5'3\" tall,1\n"
+    'r2,"say ""hi"",\nthere",3\n'
+    'r3,"a,b",\n'
+    'r4,"",6\n'
+)
+
+# quoted fields only, as csv.reader and all block engines read them
+QUOTED_FIELDS = (
+    "name,text,value\n"
+    'r0,"multi\nline 0",1\n'
+    'r1,"say ""hi"",\nthere",""""\n'
+    '"r2","a,b",\n'
+    'r3,"",6\n'
+)
+
+FIXTURES = {
+    "plain": PLAIN,
+    "quoted": QUOTED,
+    "no_final_line_break": PLAIN.rstrip("\n"),
+    "blank_lines": PLAIN[:60] + "\n" + PLAIN[60:] + "\n",
+    "blank_line_in_quotes": QUOTED + '"r5","a\n\nb",7\n',
+    "short_row": PLAIN + "short,1\n" + PLAIN,
+    "long_row": PLAIN + "long,1,2,3\n" + PLAIN,
+    "short_quoted_row": QUOTED + '"short",1\n' + QUOTED,
+    "line_breaks_crlf": PLAIN.replace("\n", "\r\n"),
+    "blank_line_crlf": (PLAIN[:60] + "\n" + PLAIN[60:]).replace("\n", "\r\n"),
+    "quoted_crlf": QUOTED.replace("\n", "\r\n"),
+    "carriage_return": PLAIN[:60] + "\r" + PLAIN[60:],
+    "byte_order_mark": "﻿" + PLAIN,
+    "quoted_fields": QUOTED_FIELDS + PLAIN,
+    "quoted_fields_crlf": (PLAIN + '"r","a,b",""""\n').replace("\n", "\r\n"),
+    "quoted_line_break_crlf": QUOTED_FIELDS.replace("\n", "\r\n"),
+    "text_after_quote": PLAIN + 'r,"a"b,c\n',
+    "unterminated_quote": PLAIN + 'r,"a,b\n',
+}
+
+# fixtures that the engine reads itself, rather than falling back to stdlib
+NATIVE = {
+    "stdlib": set(FIXTURES),
+    "pyarrow": {
+        "plain",
+        "quoted",
+        "no_final_line_break",
+        "line_breaks_crlf",
+        "quoted_fields",
+        "text_after_quote",
+    },
+    "polars": {
+        "plain",
+        "no_final_line_break",
+        "line_breaks_crlf",
+        "quoted_fields",
+        "quoted_fields_crlf",
+    },
+    "pandas": {
+        "plain",
+        "no_final_line_break",
+        "line_breaks_crlf",
+        "quoted_fields",
+        "quoted_fields_crlf",
+    },
+}
+
+COMPRESSORS = {"": open, ".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+
+def _write(tmp_path, name, text, suffix=""):
+    path = tmp_path / f"{name}.csv"
+
+    with COMPRESSORS[suffix](str(path) + suffix, "wt", newline="") as f:
+        f.write(text)
+
+    return str(path)
+
+
+def _expected(path):
+    with open_input(path) as f:
+        return [list(row) for row in csv.reader(f)]
+
+
+@pytest.mark.parametrize("scan_block", [3, _readers.SCAN_BLOCK_BYTES])
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("name", FIXTURES)
+def test_engines_match_csv_reader(
+    tmp_path, monkeypatch, engine, name, scan_block
+):
+    monkeypatch.setattr(_readers, "SCAN_BLOCK_BYTES", scan_block)
+    path = _write(tmp_path, name, FIXTURES[name])
+
+    with CsvRows(path, engine) as reader:
+        rows = [list(row) for row in reader]
+        used = reader.engine
+
+    assert rows == _expected(path)
+    assert used == (engine if name in NATIVE[engine] else "stdlib")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("suffix", [".gz", ".bz2", ".xz"])
+def test_engines_match_csv_reader_compressed(tmp_path, engine, suffix):
+    path = _write(tmp_path, "quoted", QUOTED + PLAIN, suffix)
+
+    with CsvRows(path, engine) as reader:
+        rows = [list(row) for row in reader]
+
+    assert rows == _expected(path)
+
+
+@pytest.mark.skipif(not _installed("pyarrow"), reason="no pyarrow")
+def test_pyarrow_reads_on_with_stdlib(tmp_path, monkeypatch):
+    monkeypatch.setattr(_readers, "BLOCK_BYTES", 1024)
+    path = _write(tmp_path, "late", QUOTED + PLAIN * 5 + '"short",1\n' + PLAIN)
+
+    with CsvRows(path, "pyarrow") as reader:
+        first = next(reader)
+        assert reader.engine == "pyarrow"
+        rows = [list(first)] + [list(row) for row in reader]
+        assert reader.engine == "stdlib"
+
+    assert rows == _expected(path)
+
+
+@pytest.mark.parametrize("engine", ["pyarrow", "polars"])
+def test_other_locale_encodings_use_stdlib(tmp_path, monkeypatch, engine):
+    if not _installed(engine):
+        pytest.skip(f"{engine} is not installed")
+
+    monkeypatch.setattr(_readers, "_utf8_locale", lambda: False)
+    path = _write(tmp_path, "plain", PLAIN)
+
+    with CsvRows(path, engine) as reader:
+        assert reader.engine == "stdlib"
+
+
+def test_stdlib_is_the_default_engine():
+    assert _readers.resolve_engine() == "stdlib"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_prefix_is_read_without_checking_the_file(
+    tmp_path, monkeypatch, engine
+):
+    def scan(*args):
+        raise AssertionError("the file was checked")
+
+    monkeypatch.setattr(_readers, "_is_regular", scan)
+    path = _write(tmp_path, "plain", PLAIN)
+
+    with CsvRows(path, engine, rows=5) as reader:
+        rows = [list(row) for row in reader]
+        assert reader.engine == "stdlib"
+
+    assert rows == _expected(path)[:6]
@@ -0,0 +1,18 @@
+from dmb.adapter import EDGE_FILES, DepMapAdapter
+
+
+def test_edges_of_all_labels_reference_known_nodes(data_dir):
+    adapter = DepMapAdapter(check_references=True)
+    edges = list(adapter.get_edges())
+    labels = {edge[2] for edge in edges}
+
+    # sources of the Ensembl id labels are never known nodes
+    translated = {"gene_int", "CRISPRKO"}
+
+    assert labels == set(EDGE_FILES) - translated
+
+    for label in labels:
+        counts = adapter.reference_report[label]
+        assert counts["checked"] > 0
+        assert counts["unknown_source"] == 0
+        assert counts["unknown_target"] == 0
@@ -0,0 +1,39 @@
+import pytest
+
+from dmb.adapter import DepMapAdapter
+
+
+def _graph(adapter):
+    nodes = {node[0] for node in adapter.get_nodes()}
+    edges = list(adapter.get_edges())
+
+    return nodes, edges
+
+
+@pytest.mark.parametrize(
+    "sample", [{"sample_fraction": 0.3}, {"sample_count": 5}]
+)
+def test_sample_has_no_dangling_edges(data_dir, sample):
+    nodes, edges = _graph(DepMapAdapter(**sample))
+    all_nodes, all_edges = _graph(DepMapAdapter())
+
+    # sources of the Ensembl id labels are never nodes
+    edges = [e for e in edges if e[2] not in ("gene_int", "CRISPRKO")]
+
+    assert edges
+    assert len(nodes) < len(all_nodes)
+    assert len(edges) < len(all_edges)
+
+    for source, target, label, _ in edges:
+        assert source in nodes, label
+        assert target in nodes, label
+
+
+def test_sample_is_seeded(data_dir):
+    first = DepMapAdapter(sample_fraction=0.3, sample_seed=1)
+    second = DepMapAdapter(sample_fraction=0.3, sample_seed=1)
+    other = DepMapAdapter(sample_fraction=0.3, sample_seed=2)
+
+    assert first.sample == second.sample
+    assert first.sample != other.sample
+    assert list(first.get_edges()) == list(second.get_edges())